@@ -1,11 +1,11 @@
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, jsonify
 import os
 from flask_sqlalchemy import SQLAlchemy
-from flask_cors import CORS
 from config import app_config # Import the configuration we created
+from .read_replicas import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 def create_app(config_name=None):
     """
@@ -26,9 +26,38 @@ def create_app(config_name=None):
         
     app.config.from_object(current_config)
 
+    from .log_pipeline import init_logging
+    init_logging(app)
+
     # Initialize extensions with the app
+    from .db_pool import init_db_pool
+    init_db_pool(app, db)
+    from .read_replicas import init_read_replicas
+    init_read_replicas(app)
+    from .sharding import init_sharding
+    init_sharding(app)
     db.init_app(app)
-    CORS(app, origins="*")
+
+    from .transport import init_transport
+    init_transport(app)
+
+    from .change_broker import init_change_broker
+    init_change_broker(app, db)
+
+    from .request_timing import init_request_timing
+    init_request_timing(app)
+
+    from .query_budget import init_query_budget
+    init_query_budget(app)
+
+    from .slow_query_log import init_slow_query_log
+    init_slow_query_log(app)
+
+    from .profiler import init_profiler
+    init_profiler(app)
+
+    from .template_catalog import init_template_catalog
+    init_template_catalog(app)
 
     # Import and register blueprints here
     from .routes.auth_routes import auth_bp
@@ -44,6 +73,12 @@ def create_app(config_name=None):
     from .routes.project_templates_routes import project_templates_bp
     app.register_blueprint(project_templates_bp, url_prefix='/api/v1')
 
+    from .routes.events_routes import events_bp
+    app.register_blueprint(events_bp, url_prefix='/api/v1')
+
+    from .routes.admin_routes import admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/api/v1')
+
     # from .routes.user_routes import user_bp # Example for user specific routes
     # app.register_blueprint(user_bp, url_prefix='/api/v1/users')
 
@@ -52,6 +87,22 @@ def create_app(config_name=None):
     def health_check():
         return "API is healthy!", 200
 
+    from .utils import metrics_auth_required
+
+    @app.route('/metrics')
+    @metrics_auth_required
+    def request_metrics():
+        # Prometheus text format; histograms are per worker process
+        body = app.extensions['request_metrics'].render() + app.extensions['db_pool_metrics']()
+        return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+    @app.route('/metrics/single-flight')
+    @metrics_auth_required
+    def single_flight_metrics():
+        # How many identical in-flight reads were served from another request's computation
+        from .single_flight import all_stats
+        return jsonify(all_stats()), 200
+
     @app.route('/images/<filename>')
     def serve_image(filename):
         return send_from_directory(os.path.join(app.root_path, '..', 'images'), filename)
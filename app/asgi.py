@@ -0,0 +1,240 @@
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import request, request_started
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from .db_pool import pool_engine_options
+
+# Async driver used in place of each backend's sync driver
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+
+def async_database_url(url):
+    """The same database URL with the backend's async driver, e.g. mysql+pymysql -> mysql+aiomysql."""
+    url = make_url(url)
+    if url.get_dialect().is_async:
+        return url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for '{backend}'; set ASYNC_DATABASE_URL.")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+class AsyncDatabase:
+    """
+    Async engines mirroring the Flask-SQLAlchemy ones: the primary plus every bind (read
+    replicas, shards), keyed the same way, with the same pool profile. Engines are created on
+    first use, inside the running event loop.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.urls = {None: config.get('ASYNC_DATABASE_URL') or config['SQLALCHEMY_DATABASE_URI']}
+        for key, bind in (config.get('SQLALCHEMY_BINDS') or {}).items():
+            self.urls[key] = bind['url'] if isinstance(bind, dict) else bind
+        self._engines = {}
+
+    def engine(self, key=None):
+        engine = self._engines.get(key)
+        if engine is None:
+            url = self.urls[key]
+            # Async engines bring their own queue pool; TimedQueuePool is sync only
+            options = {name: value for name, value in pool_engine_options(self.config, url).items() if name != 'poolclass'}
+            engine = self._engines[key] = create_async_engine(async_database_url(url), **options)
+        return engine
+
+    def session(self, key=None):
+        return AsyncSession(self.engine(key), expire_on_commit=False)
+
+    async def dispose(self):
+        for engine in self._engines.values():
+            await engine.dispose()
+        self._engines.clear()
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope, so Flask can build its request context from it."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'asgi.scope': scope,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    # The body has been read in full, so its length is known even for chunked uploads
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ.pop('HTTP_TRANSFER_ENCODING', None)
+    return environ
+
+
+class AsgiApp:
+    """
+    Serves a Flask app over ASGI. Endpoints with an async twin in async_views run on the event
+    loop with async DB sessions, so a slow Google or DB call holds no thread; every other
+    endpoint runs the regular Flask view in a thread pool of ASYNC_THREADPOOL_SIZE. Both go
+    through the app's before/after request hooks and error handlers. Streamed bodies (change
+    streams) are pulled in a separate pool of SSE_MAX_STREAMS threads, so open streams never
+    take threads from requests.
+
+        uvicorn asgi:app --host 0.0.0.0 --port 8080 --workers 4
+    """
+
+    def __init__(self, flask_app, views=None):
+        if views is None:
+            from .async_views import ASYNC_VIEWS as views
+        self.flask_app = flask_app
+        self.views = {endpoint: view for endpoint, view in views.items() if endpoint in flask_app.view_functions}
+        self.database = flask_app.extensions['async_db'] = AsyncDatabase(flask_app.config)
+        self._executor_loop = None
+        self._stream_executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            await send({'type': 'websocket.close'})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._ensure_executor()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.database.dispose()
+                if self._stream_executor is not None:
+                    self._stream_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _ensure_executor(self):
+        loop = asyncio.get_running_loop()
+        if self._executor_loop is not loop:
+            size = self.flask_app.config.get('ASYNC_THREADPOOL_SIZE', 32)
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=size, thread_name_prefix='asgi-sync'))
+            # The broker admits at most SSE_MAX_STREAMS streams per worker, so this pool never queues them
+            self._stream_executor = ThreadPoolExecutor(max_workers=self.flask_app.config.get('SSE_MAX_STREAMS', 4),
+                                                       thread_name_prefix='asgi-stream')
+            self._executor_loop = loop
+
+    async def _http(self, scope, receive, send):
+        self._ensure_executor()
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        app = self.flask_app
+        environ = _environ(scope, bytes(body))
+        transport = app.extensions.get('transport')
+        preflight = transport.preflight_headers(environ) if transport else None
+        if preflight is not None:
+            await send({'type': 'http.response.start', 'status': 204,
+                        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in preflight]})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                rule = request.url_rule
+                # Automatic OPTIONS responses and routing errors stay with Flask
+                view = self.views.get(rule.endpoint) if rule is not None and request.method != 'OPTIONS' else None
+                if view is not None:
+                    response = await self._dispatch(view)
+                else:
+                    response = await asyncio.to_thread(app.full_dispatch_request)
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            await self._send_response(response, environ, receive, send)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            ctx.pop(error)
+
+    async def _dispatch(self, view):
+        """Flask's full_dispatch_request, awaiting the async view on the event loop."""
+        app = self.flask_app
+        app._got_first_request = True
+        try:
+            request_started.send(app, _async_wrapper=app.ensure_sync)
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = await view(**request.view_args)
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        return app.finalize_request(rv)
+
+    async def _send_response(self, response, environ, receive, send):
+        app_iter, status, headers = response.get_wsgi_response(environ)
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        if not response.is_streamed:
+            try:
+                await send({'type': 'http.response.body', 'body': b''.join(app_iter)})
+            finally:
+                app_iter.close()
+            return
+        try:
+            # Streamed bodies (e.g. Server-Sent Events) may block between chunks: pull each chunk
+            # in the stream pool, always in the same context, and stop once the client is gone.
+            # Using the default pool would let a few dozen idle streams starve every other request.
+            context = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            iterator = iter(app_iter)
+            disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+            try:
+                while not disconnected.done():
+                    chunk = await loop.run_in_executor(self._stream_executor, context.run, next, iterator, None)
+                    if chunk is None:
+                        break
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                disconnected.cancel()
+        finally:
+            await asyncio.get_running_loop().run_in_executor(self._stream_executor, app_iter.close)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
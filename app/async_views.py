@@ -0,0 +1,363 @@
+import asyncio
+from flask import current_app, g, jsonify, request
+from sqlalchemy import exc, select
+from sqlalchemy.orm import lazyload, selectinload
+from .models import User, UserAccount, Project, ProjectChangeSequence, Task, task_dependencies, ProjectTemplate, TaskTemplate, task_template_dependencies
+from .google_auth_service import GoogleAuthService
+from .read_replicas import PRIMARY
+from .sharding import DEFAULT_SHARD
+from .utils import decode_token, generate_token
+from .routes.projects_routes import _encode_project, _project_summary_json, _task_list_json, project_reads
+from .routes.project_templates_routes import _template_details_json
+from .template_catalog import template_catalog
+
+# Flask endpoint -> async twin of its view, used by AsgiApp (see asgi.py). Each twin answers
+# with the same JSON as the Flask view; the Flask views keep serving WSGI deployments.
+ASYNC_VIEWS = {}
+
+
+def async_view(endpoint):
+    def register(f):
+        ASYNC_VIEWS[endpoint] = f
+        return f
+    return register
+
+
+def _database():
+    return current_app.extensions['async_db']
+
+
+def _replica_key():
+    """Bind key for reads from the default database: a replica, unless the user wrote recently."""
+    router = current_app.extensions.get('read_replicas')
+    if router is None:
+        return None
+    target = router.choose(g.get('_token_subject'))
+    return None if target == PRIMARY else target
+
+
+async def read(query, shard=DEFAULT_SHARD):
+    """
+    Returns `await query(session)` from the given shard or, for the default database, from a
+    read replica when one is configured. A failing replica is marked down and the query is
+    run again on the primary.
+    """
+    key = _replica_key() if shard == DEFAULT_SHARD else shard
+    try:
+        async with _database().session(key) as session:
+            return await query(session)
+    except (exc.OperationalError, exc.InterfaceError):
+        if key is None or shard != DEFAULT_SHARD:
+            raise
+        current_app.extensions['read_replicas'].mark_down(key)
+        current_app.logger.warning("Read replica %s failed; retrying %s on the primary", key, request.path,
+                                   extra={'log_key': f'read_replicas.failover:{key}'})
+    async with _database().session() as session:
+        return await query(session)
+
+
+async def shard_of(account_id):
+    directory = current_app.extensions.get('shards')
+    if directory is None:
+        return DEFAULT_SHARD
+    # The directory reloads from the database once per SHARD_DIRECTORY_TTL; keep that off the loop
+    shard, _ = await asyncio.to_thread(directory.lookup, account_id)
+    return shard
+
+
+def _remember_writer(user_id):
+    """Keeps the user's reads on the primary for a while, as read_replicas does after a WSGI write."""
+    g._token_subject = str(user_id)
+    router = current_app.extensions.get('read_replicas')
+    if router is not None:
+        router.mark_write(g._token_subject)
+
+
+async def run_sync_view():
+    """Runs the Flask view of the current endpoint in the thread pool."""
+    return await asyncio.to_thread(current_app.view_functions[request.endpoint], **request.view_args)
+
+
+async def authenticate():
+    """
+    Async counterpart of @token_required. Returns (user, None) with the user's accounts loaded,
+    or (None, error response).
+    """
+    token = None
+    if 'Authorization' in request.headers:
+        try:
+            token = request.headers['Authorization'].split(" ")[1]
+        except IndexError:
+            return None, (jsonify({'message': 'Bearer token malformed!'}), 401)
+    if not token:
+        token = request.headers.get('x-access-token')
+    if not token:
+        return None, (jsonify({'message': 'Token is missing!'}), 401)
+
+    try:
+        data = decode_token(token, current_app.config.get('SECRET_KEY'))
+        if isinstance(data, str): # Error message returned from decode_token
+            return None, (jsonify({'message': data}), 401)
+        g._token_subject = str(data['sub'])
+
+        statement = select(User).options(selectinload(User.accounts).selectinload(UserAccount.account)).where(
+            User.id == int(data['sub']))
+        current_user = await read(lambda session: session.scalar(statement))
+        if current_user is None and 'read_replicas' in current_app.extensions:
+            # A user created moments ago may not have reached the replica yet
+            async with _database().session() as session:
+                current_user = await session.scalar(statement)
+        if current_user is None:
+            current_app.logger.warning("User with id %s was not found in the database.", data['sub'],
+                                       extra={'log_key': 'auth.user_not_found'})
+            return None, (jsonify({'message': 'User not found!'}), 401)
+        g.current_user = current_user
+        return current_user, None
+    except Exception as e:
+        current_app.logger.error("Token processing error: %s", e, extra={'log_key': 'auth.token_error'})
+        return None, (jsonify({'message': 'Token is invalid or expired!'}), 401)
+
+
+async def _all(session, statement):
+    return (await session.execute(statement)).all()
+
+
+async def _all_scalars(session, statement):
+    return (await session.scalars(statement)).all()
+
+
+# --- Auth ---
+
+@async_view('auth_bp.google_auth')
+async def google_auth():
+    data = request.get_json()
+    google_token = data.get('token')
+
+    if not google_token:
+        return jsonify({'message': 'Google token is missing!'}), 400
+
+    try:
+        # On a certificate cache miss google-auth fetches them with a blocking HTTP client
+        user_info = await asyncio.to_thread(GoogleAuthService.verify_token, google_token)
+
+        newuser_flag = False
+        async with _database().session() as session:
+            user = await session.scalar(select(User).where(User.email == user_info['email']))
+            if not user:
+                current_app.logger.info("Creating new user for email: %s", user_info['email'])
+                user = User(email=user_info['email'], auth_source='GOOGLE', name=user_info.get('name', ''),
+                            organization_id=1, password_hash=None)
+                session.add(user)
+                await session.commit()
+                newuser_flag = True
+                _remember_writer(user.id)
+
+        internal_token = generate_token(user.id, user.email, current_app.config.get('SECRET_KEY'))
+        current_app.logger.info("User %s authenticated via Google successfully.", user.email)
+        return jsonify({
+            'message': 'Authentication successful!',
+            'token': internal_token,
+            'user': {'id': user.id, 'email': user.email, 'newuser': newuser_flag}
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 401
+    except Exception as e:
+        current_app.logger.error("An unexpected error occurred in Google auth: %s", e, exc_info=True)
+        return jsonify({'message': 'An internal error occurred.'}), 500
+
+
+@async_view('auth_bp.login')
+async def login():
+    data = request.get_json()
+    if not data or not data.get('email') or not data.get('password'):
+        return jsonify({'message': 'Email and password are required!'}), 400
+
+    async with _database().session() as session:
+        user = await session.scalar(select(User).where(User.email == data['email']))
+
+    if not user:
+        current_app.logger.info("Login attempt for non-existent user: %s", data['email'])
+        return jsonify({'message': 'Invalid credentials!'}), 401
+
+    # Password hashing is CPU-bound; keep it off the event loop
+    if await asyncio.to_thread(user.check_password, data['password']):
+        try:
+            token = generate_token(user.id, user.email, current_app.config.get('SECRET_KEY'))
+            current_app.logger.info("User %s logged in successfully.", user.email)
+            return jsonify({'message': 'Login successful!', 'token': token}), 200
+        except Exception as e:
+            current_app.logger.error("Token generation error for user %s: %s", user.email, e)
+            return jsonify({'message': 'Could not generate token, login failed.'}), 500
+    current_app.logger.warning("Failed login attempt for user: %s", data['email'])
+    return jsonify({'message': 'Invalid credentials!'}), 401
+
+
+@async_view('auth_bp.get_current_user')
+async def get_current_user():
+    current_user, error = await authenticate()
+    if error:
+        return error
+
+    accounts_data = [{
+        'account_id': user_account.account.id,
+        'account_name': user_account.account.name,
+        'role': user_account.role
+    } for user_account in current_user.accounts if user_account.account]
+
+    return jsonify({
+        'id': current_user.id,
+        'email': current_user.email,
+        'accounts': accounts_data
+    }), 200
+
+
+# --- Projects ---
+
+@async_view('projects_bp.get_projects')
+async def get_projects():
+    current_user, error = await authenticate()
+    if error:
+        return error
+
+    account_id_str = request.args.get('account_id')
+    if not account_id_str:
+        return jsonify({'message': 'Account ID is required as a query parameter'}), 400
+    try:
+        account_id = int(account_id_str)
+    except ValueError:
+        return jsonify({'message': 'Invalid Account ID format. Must be an integer.'}), 400
+
+    if account_id not in [user_account.account_id for user_account in current_user.accounts]:
+        return jsonify({'message': 'User not authorized for this account'}), 403
+
+    try:
+        statement = select(Project).where(Project.account_id == account_id)
+        projects = await read(lambda session: _all_scalars(session, statement), await shard_of(account_id))
+        return jsonify([_project_summary_json(project) for project in projects]), 200
+    except Exception as e:
+        current_app.logger.error("Error fetching projects: %s", e)
+        return jsonify({'message': 'Error fetching projects', 'error': str(e)}), 500
+
+
+async def _load_project_version(session, project_id):
+    """(project, change sequence); the sequence is part of the single-flight key of get_project."""
+    project = await session.get(Project, project_id)
+    if project is None:
+        return None, 0
+    seq = await session.scalar(select(ProjectChangeSequence.seq).where(ProjectChangeSequence.project_id == project_id))
+    return project, seq or 0
+
+
+async def _load_project_tasks(session, project_id):
+    tasks = await _all_scalars(session, select(Task).where(Task.project_id == project_id))
+    dependency_rows = await _all(session, select(task_dependencies.c.task_id, task_dependencies.c.depends_on_task_id)
+                                 .join(Task, Task.id == task_dependencies.c.task_id).where(Task.project_id == project_id))
+    return tasks, dependency_rows
+
+
+async def _render_project(project, shard):
+    """Async counterpart of the full-payload branch of projects_routes._render_project."""
+    tasks, dependency_rows = await read(lambda session: _load_project_tasks(session, project.id), shard)
+    dependency_map = {}
+    for task_id, depends_on_task_id in dependency_rows:
+        dependency_map.setdefault(task_id, []).append(depends_on_task_id)
+    return _encode_project(project, _task_list_json(tasks, dependency_map)), 200
+
+
+@async_view('projects_bp.get_project')
+async def get_project(project_id):
+    if request.args.get('lod') or request.args.get('depth'):
+        # Level-of-detail and depth-limited payloads are built by the regular view
+        return await run_sync_view()
+
+    current_user, error = await authenticate()
+    if error:
+        return error
+
+    try:
+        account_ids = [user_account.account_id for user_account in current_user.accounts]
+        shards = []
+        for account_id in account_ids:
+            shard = await shard_of(account_id)
+            if shard not in shards:
+                shards.append(shard)
+
+        project = None
+        for shard in shards or [DEFAULT_SHARD]:
+            project, seq = await read(lambda session: _load_project_version(session, project_id), shard)
+            if project is not None:
+                break
+
+        if not project:
+            return jsonify({'message': 'Project not found'}), 404
+        if project.account_id not in account_ids:
+            return jsonify({'message': 'User not authorized to view this project'}), 403
+
+        # Same key as the Flask view, so reads are coalesced whichever path serves them
+        key = ('project', project.id, seq, request.query_string)
+        body, status = await project_reads.do_async(key, lambda: _render_project(project, shard))
+        return current_app.response_class(body, status=status, mimetype='application/json')
+
+    except Exception as e:
+        current_app.logger.error("Error fetching project by ID: %s", e)
+        return jsonify({'message': 'Error fetching project', 'error': str(e)}), 500
+
+
+# --- Project templates ---
+
+@async_view('project_templates_bp.get_project_template_list')
+async def get_project_template_list():
+    current_user, error = await authenticate()
+    if error:
+        return error
+
+    try:
+        catalog = template_catalog()
+        templates_data = catalog.get('list') if catalog else None
+        if templates_data is None:
+            statement = select(ProjectTemplate.id, ProjectTemplate.name, ProjectTemplate.description)
+            rows = await read(lambda session: _all(session, statement))
+            templates_data = [{'id': row.id, 'name': row.name, 'description': row.description} for row in rows]
+            if catalog:
+                catalog.put('list', templates_data)
+        return jsonify(templates_data), 200
+    except Exception as e:
+        current_app.logger.error("Error fetching project template list: %s", e)
+        return jsonify({'message': 'Error fetching project templates', 'error': str(e)}), 500
+
+
+async def _load_template(session, template_id):
+    template = await session.scalar(select(ProjectTemplate).options(lazyload(ProjectTemplate.tasks))
+                                    .where(ProjectTemplate.id == template_id))
+    if template is None:
+        return None, None, None
+    task_templates = await _all_scalars(session, select(TaskTemplate).where(TaskTemplate.project_template_id == template_id)
+                                        .order_by(TaskTemplate.id))
+    dependency_rows = await _all(session, select(
+        task_template_dependencies.c.task_template_id, task_template_dependencies.c.depends_on_task_template_id
+    ).join(TaskTemplate, TaskTemplate.id == task_template_dependencies.c.task_template_id).where(
+        TaskTemplate.project_template_id == template_id))
+    return template, task_templates, dependency_rows
+
+
+@async_view('project_templates_bp.get_project_template_details')
+async def get_project_template_details(template_id):
+    current_user, error = await authenticate()
+    if error:
+        return error
+
+    try:
+        catalog = template_catalog()
+        template_details = catalog.get(('details', template_id)) if catalog else None
+        if template_details is None:
+            template, task_templates, dependency_rows = await read(lambda session: _load_template(session, template_id))
+            if not template:
+                return jsonify({'message': 'Project template not found'}), 404
+            template_details = _template_details_json(template, task_templates, dependency_rows)
+            if catalog:
+                catalog.put(('details', template_id), template_details)
+        return jsonify(template_details), 200
+    except Exception as e:
+        current_app.logger.error("Error fetching project template details for ID %s: %s", template_id, e)
+        return jsonify({'message': 'Error fetching project template details', 'error': str(e)}), 500
@@ -0,0 +1,224 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+
+# Key in session.info under which record_changes() parks events until the transaction commits
+PENDING_EVENTS_KEY = 'pending_change_events'
+
+
+class SubscriptionLimitReached(Exception):
+    """Raised by ChangeBroker.subscribe when this worker already holds max_subscriptions streams."""
+
+
+def project_topic(project_id):
+    return f'project:{project_id}'
+
+
+def account_topic(account_id):
+    return f'account:{account_id}'
+
+
+class Subscription:
+    """A subscriber's view of the broker: a bounded queue fed with events for its topics."""
+
+    def __init__(self, topics, maxsize):
+        self.topics = tuple(topics)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBackend:
+    """Delivers events to subscribers of this process only. Suitable for a single worker."""
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, change_event):
+        self._dispatch(change_event)
+
+
+class SQLiteBackend:
+    """
+    Cross-worker stand-in for a real message bus: every worker appends events to a shared
+    SQLite file and a background thread in each worker tails it and dispatches locally.
+    Good enough for several gunicorn workers on one host; use a proper bus across hosts.
+    """
+
+    def __init__(self, path, poll_interval=0.25, retention_seconds=300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._thread = None
+        self._pid = None
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS change_events '
+            '(id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, payload TEXT NOT NULL)'
+        )
+        return connection
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+        self._local = threading.local()
+        # Threads do not survive fork, so each worker starts its own tailer.
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        connection = self._connect()
+        last_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM change_events').fetchone()[0]
+        connection.close()
+        self._thread = threading.Thread(target=self._tail, args=(last_id,), name='change-broker-sqlite', daemon=True)
+        self._thread.start()
+
+    def publish(self, change_event):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        now = time.time()
+        connection.execute('INSERT INTO change_events (created, payload) VALUES (?, ?)', (now, json.dumps(change_event)))
+        connection.execute('DELETE FROM change_events WHERE created < ?', (now - self.retention_seconds,))
+
+    def _tail(self, last_id):
+        connection = self._connect()
+        while True:
+            try:
+                rows = connection.execute(
+                    'SELECT id, payload FROM change_events WHERE id > ? ORDER BY id', (last_id,)
+                ).fetchall()
+                for row_id, payload in rows:
+                    last_id = row_id
+                    self._dispatch(json.loads(payload))
+            except sqlite3.Error:
+                # Transient lock contention; try again on the next poll.
+                pass
+            time.sleep(self.poll_interval)
+
+
+class ChangeBroker:
+    """
+    In-process fan-out of project change events to SSE subscribers.
+    Publishing goes through the backend so that other workers see the event too;
+    the backend calls dispatch() in every worker to reach its local subscribers.
+    Each open stream holds a serving thread, so at most max_subscriptions are open per worker.
+    """
+
+    def __init__(self, backend=None, queue_size=100, max_subscriptions=None):
+        self.backend = backend or LocalBackend()
+        self.queue_size = queue_size
+        self.max_subscriptions = max_subscriptions
+        self._subscribers = {}
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._started_pid = None
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) so no backend thread is created in the master.
+        if self._started_pid != os.getpid():
+            with self._lock:
+                if self._started_pid != os.getpid():
+                    self.backend.start(self.dispatch)
+                    self._started_pid = os.getpid()
+
+    def subscribe(self, topics):
+        self._ensure_started()
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            if self.max_subscriptions is not None and len(self._subscriptions) >= self.max_subscriptions:
+                raise SubscriptionLimitReached(f'{len(self._subscriptions)} change streams are already open.')
+            self._subscriptions.add(subscription)
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        # Idempotent: a stream is released both when its generator ends and when its response closes
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, change_event):
+        self._ensure_started()
+        self.backend.publish(change_event)
+
+    def dispatch(self, change_event):
+        with self._lock:
+            targets = set()
+            for topic in change_event['topics']:
+                targets.update(self._subscribers.get(topic, ()))
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(change_event)
+            except queue.Full:
+                # Slow consumer: it will catch up through /changes?since= on reconnect.
+                subscription.dropped += 1
+
+
+def _create_backend(app):
+    backend_name = app.config.get('CHANGE_BROKER_BACKEND', 'local')
+    if backend_name == 'sqlite':
+        return SQLiteBackend(app.config.get('CHANGE_BROKER_SQLITE_PATH'))
+    if backend_name == 'local':
+        return LocalBackend()
+    raise ValueError(f"Unknown CHANGE_BROKER_BACKEND '{backend_name}'. Use 'local' or 'sqlite'.")
+
+
+def init_change_broker(app, db):
+    """Creates the app's change broker and publishes parked change events once their transaction commits."""
+    app.extensions['change_broker'] = ChangeBroker(
+        _create_backend(app),
+        queue_size=app.config.get('SSE_QUEUE_SIZE', 100),
+        max_subscriptions=app.config.get('SSE_MAX_STREAMS', 4)
+    )
+    if not event.contains(db.session, 'after_commit', _publish_pending_events):
+        event.listen(db.session, 'after_commit', _publish_pending_events)
+        event.listen(db.session, 'after_rollback', _discard_pending_events)
+
+
+def get_change_broker():
+    return current_app.extensions['change_broker']
+
+
+def queue_change_event(session, project_id, account_id, seq, counts):
+    """Parks a change notification on the session; it is published only if the write commits."""
+    session.info.setdefault(PENDING_EVENTS_KEY, []).append({
+        'topics': [project_topic(project_id)] + ([account_topic(account_id)] if account_id else []),
+        'event': 'change',
+        'id': seq,
+        'data': dict(counts, project_id=project_id, account_id=account_id, seq=seq),
+    })
+
+
+def _publish_pending_events(session):
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if not pending:
+        return
+    try:
+        broker = get_change_broker()
+        for change_event in pending:
+            broker.publish(change_event)
+    except Exception as e:
+        # The write is already committed; a lost notification only delays clients until their next sync.
+        current_app.logger.error(f"Failed to publish change events: {e}")
+
+
+def _discard_pending_events(session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
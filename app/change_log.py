@@ -0,0 +1,138 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import ProjectChangeSequence, ProjectChange, ChangeEntityEnum, ChangeOpEnum
+from .change_broker import queue_change_event
+
+
+def record_changes(project_id, task_upserts=(), task_deletes=(), edge_upserts=(), edge_deletes=(), account_id=None):
+    """
+    Stamps a write with the next change sequence of the project and appends it to the change log.
+    Must be called inside the transaction of the write, before it is committed; the SSE
+    notification for the write is published once that transaction commits.
+    Deltas are only as small as the writes: PUT /projects/<id> recreates every task, so it
+    records the whole project (see update_project).
+
+    :param task_upserts / task_deletes: iterables of task ids
+    :param edge_upserts / edge_deletes: iterables of (task_id, depends_on_task_id) pairs
+    :param account_id: the project's account, so account-wide subscribers are notified too
+    :return: the sequence number assigned to this write
+    """
+    if not _sequence_exists(project_id):
+        # No row yet (e.g. a project seeded before it had a change log). It is inserted before
+        # any locking read: on MySQL a SELECT ... FOR UPDATE of a missing row takes a gap lock,
+        # and two first writers holding it would deadlock on their INSERTs. Concurrent first
+        # writers may both insert; the loser's savepoint fails and it locks the winner's row.
+        try:
+            with db.session.begin_nested():
+                db.session.add(ProjectChangeSequence(project_id=project_id, seq=0, compacted_seq=0))
+        except IntegrityError:
+            pass
+    sequence = _locked_sequence(project_id)
+    sequence.seq += 1
+    seq = sequence.seq
+
+    task_upserts, task_deletes = list(task_upserts), list(task_deletes)
+    edge_upserts, edge_deletes = list(edge_upserts), list(edge_deletes)
+
+    rows = []
+    # Deletes first so that an id that is deleted and re-created in one write ends up as an upsert.
+    for task_id in task_deletes:
+        rows.append(_change_row(project_id, seq, ChangeEntityEnum.TASK, ChangeOpEnum.DELETE, task_id))
+    for task_id, depends_on_task_id in edge_deletes:
+        rows.append(_change_row(project_id, seq, ChangeEntityEnum.EDGE, ChangeOpEnum.DELETE, task_id, depends_on_task_id))
+    for task_id in task_upserts:
+        rows.append(_change_row(project_id, seq, ChangeEntityEnum.TASK, ChangeOpEnum.UPSERT, task_id))
+    for task_id, depends_on_task_id in edge_upserts:
+        rows.append(_change_row(project_id, seq, ChangeEntityEnum.EDGE, ChangeOpEnum.UPSERT, task_id, depends_on_task_id))
+    if rows:
+        db.session.execute(ProjectChange.__table__.insert(), rows)
+
+    retention = current_app.config.get('CHANGE_LOG_RETENTION', 500)
+    if seq - retention > sequence.compacted_seq:
+        compact_changes(sequence, seq - retention)
+
+    queue_change_event(db.session, project_id, account_id, seq, {
+        'tasks_upserted': len(task_upserts),
+        'tasks_deleted': len(task_deletes),
+        'edges_upserted': len(edge_upserts),
+        'edges_deleted': len(edge_deletes),
+    })
+    return seq
+
+
+def _sequence_exists(project_id):
+    # Plain (non-locking) read
+    return db.session.query(ProjectChangeSequence.project_id).filter_by(project_id=project_id).first() is not None
+
+
+def _locked_sequence(project_id):
+    # Row lock so that concurrent writers to the same project get distinct, ordered sequences.
+    return ProjectChangeSequence.query.filter_by(project_id=project_id).with_for_update().populate_existing().first()
+
+
+def _change_row(project_id, seq, entity, op, task_id, depends_on_task_id=None):
+    return {
+        'project_id': project_id,
+        'seq': seq,
+        'entity': entity,
+        'op': op,
+        'task_id': task_id,
+        'depends_on_task_id': depends_on_task_id,
+    }
+
+
+def compact_changes(sequence, upto_seq):
+    """
+    Drops change log entries at or below upto_seq. Clients that last synced before
+    that point get a full resync from get_changes_since.
+    """
+    ProjectChange.query.filter(
+        ProjectChange.project_id == sequence.project_id,
+        ProjectChange.seq <= upto_seq
+    ).delete(synchronize_session=False)
+    sequence.compacted_seq = upto_seq
+
+
+def current_seq(project_id):
+    sequence = db.session.get(ProjectChangeSequence, project_id)
+    return sequence.seq if sequence else 0
+
+
+def get_changes_since(project_id, since):
+    """
+    Collapses the change log after `since` into the net set of changed entities.
+
+    :return: dictionary with 'seq', 'full_resync' and, unless a resync is needed,
+             task ids and edge pairs split into 'upserted'/'deleted'
+    """
+    sequence = db.session.get(ProjectChangeSequence, project_id)
+    seq = sequence.seq if sequence else 0
+    compacted_seq = sequence.compacted_seq if sequence else 0
+
+    # A client behind the compaction point, or ahead of the server, cannot be patched up.
+    if since < compacted_seq or since > seq:
+        return {'seq': seq, 'full_resync': True}
+
+    changes = ProjectChange.query.filter(
+        ProjectChange.project_id == project_id,
+        ProjectChange.seq > since
+    ).order_by(ProjectChange.seq, ProjectChange.id).all()
+
+    # Last operation wins for each entity.
+    task_ops = {}
+    edge_ops = {}
+    for change in changes:
+        if change.entity == ChangeEntityEnum.TASK:
+            task_ops[change.task_id] = change.op
+        else:
+            edge_ops[(change.task_id, change.depends_on_task_id)] = change.op
+
+    return {
+        'seq': seq,
+        'full_resync': False,
+        'task_upserts': [task_id for task_id, op in task_ops.items() if op == ChangeOpEnum.UPSERT],
+        'task_deletes': [task_id for task_id, op in task_ops.items() if op == ChangeOpEnum.DELETE],
+        'edge_upserts': [edge for edge, op in edge_ops.items() if op == ChangeOpEnum.UPSERT],
+        'edge_deletes': [edge for edge, op in edge_ops.items() if op == ChangeOpEnum.DELETE],
+    }
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# pool_recycle stays below the idle timeout of managed MySQL (often 300s), so recycled
+# connections are replaced before the server drops them; pre-ping catches the rest.
+# LIFO reuses the most recent connections, letting surplus idle ones age out and be recycled.
+POOL_PROFILES = {
+    'default': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 1800,
+                'pool_pre_ping': True, 'pool_use_lifo': False},
+    'web': {'pool_size': 10, 'max_overflow': 5, 'pool_timeout': 10, 'pool_recycle': 280,
+            'pool_pre_ping': True, 'pool_use_lifo': True},
+    'batch': {'pool_size': 2, 'max_overflow': 0, 'pool_timeout': 60, 'pool_recycle': 280,
+              'pool_pre_ping': True, 'pool_use_lifo': False},
+}
+
+# Config keys overriding single values of the selected profile
+_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_POOL_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+    'DB_POOL_PRE_PING': 'pool_pre_ping',
+    'DB_POOL_USE_LIFO': 'pool_use_lifo',
+}
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited (including connecting and the
+    pre-ping) and how many checkouts timed out. Counters live on the pool, so they restart
+    when an engine is disposed, like any per-process Prometheus counter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_buckets = [0] * len(CHECKOUT_WAIT_BUCKETS)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.timeouts = 0
+        self._stats_lock = threading.Lock()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                for position, bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+                    if waited <= bound:
+                        self.wait_buckets[position] += 1
+                self.wait_sum += waited
+                self.wait_count += 1
+
+
+# SQLAlchemy names pool loggers after the pool class, which puts this one under app.logger;
+# keep its per-checkout INFO lines out of the application log (echo_pool still enables them)
+logging.getLogger(f'{__name__}.{TimedQueuePool.__name__}').setLevel(logging.WARNING)
+
+
+def pool_engine_options(config, url=None):
+    """
+    Engine options for the pool profile named by DB_POOL_PROFILE, with DB_POOL_* overrides.
+    In-memory SQLite keeps Flask-SQLAlchemy's single static connection.
+    """
+    url = url or config.get('SQLALCHEMY_DATABASE_URI')
+    if url:
+        parsed = make_url(url)
+        if parsed.drivername.startswith('sqlite') and parsed.database in (None, '', ':memory:'):
+            return {}
+
+    profile_name = config.get('DB_POOL_PROFILE') or 'default'
+    if profile_name not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE '{profile_name}'; expected one of {', '.join(POOL_PROFILES)}.")
+    options = dict(POOL_PROFILES[profile_name])
+    for key, option in _OVERRIDES.items():
+        if config.get(key) is not None:
+            options[option] = config[key]
+    options['poolclass'] = TimedQueuePool
+    return options
+
+
+def _bind_pools(app, db):
+    with app.app_context():
+        return [(key or 'default', engine.pool) for key, engine in db.engines.items()]
+
+
+def render_pool_metrics(app, db):
+    """Prometheus text for the pools of this worker's engines, labelled by bind key."""
+    pools = [(bind, pool) for bind, pool in _bind_pools(app, db) if isinstance(pool, QueuePool)]
+    gauges = (
+        ('db_pool_size', 'Configured number of persistent connections.', lambda pool: pool.size()),
+        ('db_pool_checked_in', 'Idle connections in the pool.', lambda pool: pool.checkedin()),
+        ('db_pool_in_use', 'Connections checked out by requests.', lambda pool: pool.checkedout()),
+        ('db_pool_overflow', 'Connections open beyond pool_size.', lambda pool: max(pool.overflow(), 0)),
+    )
+    lines = []
+    for name, help_text, read in gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        lines += [f'{name}{{bind="{bind}"}} {read(pool)}' for bind, pool in pools]
+
+    timed = [(bind, pool) for bind, pool in pools if isinstance(pool, TimedQueuePool)]
+    lines += ['# HELP db_pool_checkout_timeouts_total Checkouts that gave up after pool_timeout.',
+              '# TYPE db_pool_checkout_timeouts_total counter']
+    lines += [f'db_pool_checkout_timeouts_total{{bind="{bind}"}} {pool.timeouts}' for bind, pool in timed]
+    name = 'db_pool_checkout_wait_seconds'
+    lines += [f'# HELP {name} Time spent obtaining a connection from the pool.', f'# TYPE {name} histogram']
+    for bind, pool in timed:
+        with pool._stats_lock:
+            buckets, wait_sum, wait_count = list(pool.wait_buckets), pool.wait_sum, pool.wait_count
+        for bound, count in zip(CHECKOUT_WAIT_BUCKETS, buckets):
+            lines.append(f'{name}_bucket{{bind="{bind}",le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{bind="{bind}",le="+Inf"}} {wait_count}')
+        lines.append(f'{name}_sum{{bind="{bind}"}} {wait_sum}')
+        lines.append(f'{name}_count{{bind="{bind}"}} {wait_count}')
+    return '\n'.join(lines) + '\n'
+
+
+_apps = weakref.WeakKeyDictionary()
+
+
+def dispose_engines_after_fork():
+    """
+    Gives a freshly forked worker new, empty pools. close=False leaves the parent's sockets
+    alone: closing them from the child would end the parent's MySQL sessions too.
+    """
+    for app, db in list(_apps.items()):
+        if 'sqlalchemy' not in app.extensions:
+            continue
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_engines_after_fork)
+
+
+def init_db_pool(app, db):
+    """
+    Applies the pool profile to SQLALCHEMY_ENGINE_OPTIONS (explicitly configured options
+    win) and disposes pools inherited across fork(). Call it before db.init_app(app).
+    """
+    options = pool_engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    _apps[app] = db
+    app.extensions['db_pool_metrics'] = lambda: render_pool_metrics(app, db)
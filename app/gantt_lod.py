@@ -0,0 +1,195 @@
+import datetime
+import numpy as np
+from . import db
+from .models import Task, TaskStatusEnum
+
+# Time granularities understood by the LOD overview, ordered from finest to coarsest.
+# When an overview would exceed the bucket budget we step up this list.
+GRANULARITIES = ['day', 'week', 'month', 'quarter', 'year']
+
+STATUS_NAMES = [status.name for status in TaskStatusEnum]
+_STATUS_CODES = {status: code for code, status in enumerate(TaskStatusEnum)}
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _to_epoch_seconds(value):
+    # MySQL hands back naive datetimes even for timezone=True columns; treat them as UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int((value - _EPOCH).total_seconds())
+
+
+def _bucket_index(starts, granularity):
+    """
+    Maps epoch-second start times to integer time buckets for the given granularity.
+    Returns (bucket_index_array, function converting a bucket index back to its start datetime).
+    """
+    seconds = starts.astype('datetime64[s]')
+    if granularity == 'day':
+        index = seconds.astype('datetime64[D]').astype(np.int64)
+        to_start = lambda i: np.datetime64(int(i), 'D')
+    elif granularity == 'week':
+        # Day 0 of the epoch is a Thursday; shift by 3 so weeks start on Monday.
+        index = (seconds.astype('datetime64[D]').astype(np.int64) + 3) // 7
+        to_start = lambda i: np.datetime64(int(i) * 7 - 3, 'D')
+    elif granularity == 'month':
+        index = seconds.astype('datetime64[M]').astype(np.int64)
+        to_start = lambda i: np.datetime64(int(i), 'M')
+    elif granularity == 'quarter':
+        index = seconds.astype('datetime64[M]').astype(np.int64) // 3
+        to_start = lambda i: np.datetime64(int(i) * 3, 'M')
+    elif granularity == 'year':
+        index = seconds.astype('datetime64[Y]').astype(np.int64)
+        to_start = lambda i: np.datetime64(int(i), 'Y')
+    else:
+        raise ValueError(f"Unknown granularity '{granularity}'. Use one of: {', '.join(GRANULARITIES)}.")
+    return index, to_start
+
+
+def _hierarchy_groups(ids, parent_ids, depth):
+    """
+    Rolls every task up to its ancestor at the requested hierarchy depth.
+    depth=0 collapses the whole project into one group, depth=1 groups by top-level task, etc.
+    Returns an array of row indexes (-1 for the project-wide group).
+    """
+    count = len(ids)
+    if depth <= 0 or count == 0:
+        return np.full(count, -1, dtype=np.int64)
+
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+    # Resolve parent ids to row indexes; parents outside the project are treated as roots.
+    positions = np.searchsorted(sorted_ids, parent_ids)
+    positions = np.clip(positions, 0, count - 1)
+    found = (parent_ids >= 0) & (sorted_ids[positions] == parent_ids)
+    parent_index = np.where(found, order[positions], -1)
+
+    # Level of every task (roots are level 0), computed one hierarchy level per pass.
+    levels = np.zeros(count, dtype=np.int64)
+    cursor = parent_index.copy()
+    for _ in range(count):
+        active = cursor >= 0
+        if not active.any():
+            break
+        levels[active] += 1
+        cursor[active] = parent_index[cursor[active]]
+
+    group = np.arange(count, dtype=np.int64)
+    group_levels = levels.copy()
+    while True:
+        deeper = group_levels > depth - 1
+        if not deeper.any():
+            break
+        group[deeper] = parent_index[group[deeper]]
+        group_levels[deeper] -= 1
+    return group
+
+
+def aggregate_tasks(ids, parent_ids, starts, durations, statuses, granularity, depth):
+    """
+    Aggregates task columns into (hierarchy group, time bucket) cells.
+
+    :param ids: int array of task ids
+    :param parent_ids: int array of parent task ids, -1 for top-level tasks
+    :param starts: int array of start times in epoch seconds
+    :param durations: int array of durations in seconds
+    :param statuses: int array of indexes into STATUS_NAMES
+    :return: list of bucket dictionaries, sorted by group and then time
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) == 0:
+        return []
+    parent_ids = np.asarray(parent_ids, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = starts + np.asarray(durations, dtype=np.int64)
+    statuses = np.asarray(statuses, dtype=np.int64)
+
+    group = _hierarchy_groups(ids, parent_ids, depth)
+    time_index, to_start = _bucket_index(starts, granularity)
+
+    # Dense cell key over (group, time bucket); np.unique gives one row per occupied cell.
+    time_offset = time_index - time_index.min()
+    time_span = int(time_offset.max()) + 1
+    keys = (group + 1) * time_span + time_offset
+    cells, inverse = np.unique(keys, return_inverse=True)
+    cell_count = len(cells)
+
+    counts = np.bincount(inverse, minlength=cell_count)
+    span_start = np.full(cell_count, np.iinfo(np.int64).max, dtype=np.int64)
+    span_end = np.full(cell_count, np.iinfo(np.int64).min, dtype=np.int64)
+    np.minimum.at(span_start, inverse, starts)
+    np.maximum.at(span_end, inverse, ends)
+    status_mix = np.bincount(
+        inverse * len(STATUS_NAMES) + statuses,
+        minlength=cell_count * len(STATUS_NAMES)
+    ).reshape(cell_count, len(STATUS_NAMES))
+
+    cell_group = cells // time_span - 1
+    cell_time = cells % time_span + time_index.min()
+
+    buckets = []
+    for cell in range(cell_count):
+        group_row = int(cell_group[cell])
+        buckets.append({
+            'groupId': int(ids[group_row]) if group_row >= 0 else None,
+            'bucketStart': str(to_start(cell_time[cell]).astype('datetime64[D]')),
+            'startDate': _from_epoch_seconds(span_start[cell]),
+            'endDate': _from_epoch_seconds(span_end[cell]),
+            'count': int(counts[cell]),
+            'statusMix': {
+                STATUS_NAMES[code]: int(n) for code, n in enumerate(status_mix[cell]) if n
+            },
+        })
+    return buckets
+
+
+def _from_epoch_seconds(value):
+    return (_EPOCH + datetime.timedelta(seconds=int(value))).isoformat()
+
+
+def build_lod_overview(project_id, granularity='month', depth=1, max_buckets=2000):
+    """
+    Builds the level-of-detail overview of a project's tasks for zoomed-out Gantt views.
+    If the requested granularity/depth would produce more than max_buckets cells, the
+    granularity is coarsened first and then the depth is reduced, so the payload stays bounded.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}'. Use one of: {', '.join(GRANULARITIES)}.")
+    if depth < 0:
+        raise ValueError('lod_depth must be at least 0.')
+
+    # Only the columns the aggregation needs; no ORM objects are built.
+    rows = db.session.query(
+        Task.id, Task.parent_id, Task.start_date, Task.duration, Task.status
+    ).filter(Task.project_id == project_id).all()
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    parent_ids = np.fromiter((row[1] if row[1] is not None else -1 for row in rows), dtype=np.int64, count=len(rows))
+    starts = np.fromiter((_to_epoch_seconds(row[2]) for row in rows), dtype=np.int64, count=len(rows))
+    durations = np.fromiter((row[3] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    statuses = np.fromiter((_STATUS_CODES[row[4]] for row in rows), dtype=np.int64, count=len(rows))
+
+    level = GRANULARITIES.index(granularity)
+    while True:
+        buckets = aggregate_tasks(ids, parent_ids, starts, durations, statuses, GRANULARITIES[level], depth)
+        if len(buckets) <= max_buckets or (level == len(GRANULARITIES) - 1 and depth <= 0):
+            break
+        if level < len(GRANULARITIES) - 1:
+            level += 1
+        else:
+            depth -= 1
+
+    group_ids = {bucket['groupId'] for bucket in buckets if bucket['groupId'] is not None}
+    names = dict(
+        db.session.query(Task.id, Task.name).filter(Task.id.in_(group_ids)).all()
+    ) if group_ids else {}
+    for bucket in buckets:
+        bucket['groupName'] = names.get(bucket['groupId'])
+
+    return {
+        'granularity': GRANULARITIES[level],
+        'depth': depth,
+        'taskCount': len(rows),
+        'buckets': buckets,
+    }
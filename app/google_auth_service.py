@@ -1,9 +1,54 @@
 # yourapp/google_auth_service.py
 
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import re
+import threading
+import time
 from flask import current_app
 
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+
+
+class CachingRequest:
+    """
+    google-auth transport that keeps successful GET responses (Google's signing certificates)
+    for the max-age they are served with, instead of fetching them for every token.
+    The underlying requests-based transport is created on first use, keeping google-auth
+    and requests out of app start-up.
+    """
+
+    def __init__(self, request=None, default_max_age=3600):
+        self._request = request
+        self.default_max_age = default_max_age
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if self._request is None:
+            from google.auth.transport import requests
+            self._request = requests.Request()
+        if method != 'GET' or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+        with self._lock: # Concurrent verifications wait for one fetch
+            cached = self._cache.get(url)
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0]
+            response = self._request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+            if response.status == 200:
+                self._cache[url] = (response, time.monotonic() + self._max_age(response.headers))
+            return response
+
+    def _max_age(self, headers):
+        match = re.search(r'max-age=(\d+)', (headers or {}).get('cache-control', '') or '')
+        return int(match.group(1)) if match else self.default_max_age
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_google_request = CachingRequest()
+
+
 class GoogleAuthService:
     @staticmethod
     def verify_token(token):
@@ -12,14 +57,23 @@ class GoogleAuthService:
         :param token: The ID token sent from the client.
         :return: A dictionary with user info if valid, otherwise raises an error.
         """
+        from google.auth import exceptions
+        from google.oauth2 import id_token
         try:
             # Specify the CLIENT_ID of the app that accesses the backend.
             # This is a crucial security step.
             client_id = current_app.config['GOOGLE_CLIENT_ID']
-            
-            # The 'requests.Request()' object is used to make the verification request.
-            id_info = id_token.verify_oauth2_token(token, requests.Request(), client_id, clock_skew_in_seconds=10)
-            
+
+            # Google's certificates come from _google_request's cache while they are fresh.
+            try:
+                id_info = id_token.verify_oauth2_token(token, _google_request, client_id, clock_skew_in_seconds=10)
+            except exceptions.MalformedError as e:
+                if 'Certificate for key id' not in str(e):
+                    raise
+                # Signed with a key published after our copy of the certificates was cached
+                _google_request.invalidate()
+                id_info = id_token.verify_oauth2_token(token, _google_request, client_id, clock_skew_in_seconds=10)
+
             # The id_info dictionary contains the decoded JWT payload from Google.
             # Example: {'iss': '...', 'azp': '...', 'aud': '...', 'sub': '...', 'email': '...', 'name': '...', ...}
             return id_info
@@ -30,4 +84,12 @@ class GoogleAuthService:
             raise ValueError("Invalid Google token.")
         except Exception as e:
             current_app.logger.error(f"An unexpected error occurred during Google token verification: {e}")
-            raise Exception("Could not verify Google token.")
\ No newline at end of file
+            raise Exception("Could not verify Google token.")
+
+    @staticmethod
+    def warm():
+        """Fetches Google's signing certificates into the cache ahead of the first sign-in."""
+        from google.auth import exceptions
+        response = _google_request(GOOGLE_CERTS_URL, method='GET')
+        if response.status != 200:
+            raise exceptions.TransportError(f'Fetching Google certificates failed with status {response.status}.')
@@ -0,0 +1,284 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from flask import request, has_request_context
+
+_REDACTIONS = (
+    # JSON web tokens (header.payload.signature, header always starts with '{"')
+    (re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]*'), '[REDACTED_JWT]'),
+    (re.compile(r'(?i)\b(bearer\s+)[\w\-.~+/]+=*'), r'\1[REDACTED]'),
+    (re.compile(r'(?i)\b(password|passwd|secret(?:_key)?|client_secret|api[_-]?key|access[_-]?token|'
+                r'refresh[_-]?token|id[_-]?token|authorization|aws_secret_access_key)'
+                r'(["\']?\s*[:=]\s*["\']?)[^\s"\',;}]+'), r'\1\2[REDACTED]'),
+)
+
+
+class RedactionFilter(logging.Filter):
+    """
+    Masks tokens, credentials and the configured secret values in the final message.
+    Runs on the writer thread, on records whose arguments the queue handler already merged.
+    """
+
+    def __init__(self, secrets=()):
+        super().__init__()
+        # Very short values would mask unrelated text
+        self.secrets = sorted({secret for secret in secrets if secret and len(secret) >= 8}, key=len, reverse=True)
+
+    def redact(self, text):
+        for secret in self.secrets:
+            text = text.replace(secret, '[REDACTED]')
+        for pattern, replacement in _REDACTIONS:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        if record.exc_text:
+            record.exc_text = self.redact(record.exc_text)
+        return True
+
+
+def message_key(record):
+    """Sampling/rate-limit key: extra={'log_key': ...} if given, else logger and message template."""
+    return getattr(record, 'log_key', None) or f'{record.name}:{record.msg}'
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Runs on the request thread, before a record is queued. Records below WARNING are kept
+    1 in N per message key (N = 1/rate from LOG_SAMPLE_RATES, else the default rate), and
+    every key may emit at most rate_limit records per window seconds. The first record
+    after a throttled window carries the number it stands for in record.suppressed.
+    """
+
+    MAX_KEYS = 2000
+
+    def __init__(self, sample_rate=1.0, sample_rates=None, rate_limit=0, window=10.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.sample_rates = dict(sample_rates or {})
+        self.rate_limit = rate_limit
+        self.window = window
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self._seen = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _keep_one_in(self, key):
+        rate = self.sample_rates.get(key, self.sample_rate)
+        if rate >= 1:
+            return 1
+        return int(round(1 / rate)) if rate > 0 else 0
+
+    def filter(self, record):
+        key = message_key(record)
+        with self._lock:
+            if len(self._seen) > self.MAX_KEYS or len(self._windows) > self.MAX_KEYS:
+                # Messages built with f-strings give every record its own key
+                self._seen.clear()
+                self._windows.clear()
+
+            if record.levelno < logging.WARNING:
+                one_in = self._keep_one_in(key)
+                if one_in != 1:
+                    seen = self._seen[key] = self._seen.get(key, 0) + 1
+                    if one_in == 0 or (seen - 1) % one_in:
+                        self.sampled_out += 1
+                        return False
+
+            if self.rate_limit:
+                now = time.monotonic()
+                started, emitted, suppressed = self._windows.get(key, (now, 0, 0))
+                if now - started >= self.window:
+                    started, emitted = now, 0
+                if emitted >= self.rate_limit:
+                    self._windows[key] = (started, emitted, suppressed + 1)
+                    self.rate_limited += 1
+                    return False
+                self._windows[key] = (started, emitted + 1, 0)
+                if suppressed:
+                    record.suppressed = suppressed
+        return True
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the method and URL rule of the active request, captured on the request thread."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.endpoint = request.url_rule.rule if request.url_rule else request.path
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without ever waiting: when the writer falls behind, records are dropped and counted."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for attribute in ('method', 'endpoint', 'log_key', 'suppressed'):
+            value = getattr(record, attribute, None)
+            if value is not None:
+                entry[attribute] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        entry['pid'] = record.process
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', None)
+        return f'{text} ({suppressed} similar messages suppressed)' if suppressed else text
+
+
+class LogPipeline:
+    """
+    Request threads only filter a record and put it on a bounded queue; a background
+    QueueListener thread redacts, formats and writes it. Forked workers restart the
+    listener, and pending records are flushed at exit.
+    """
+
+    def __init__(self, handlers, queue_size=10000, sampling=None):
+        self.handlers = handlers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = NonBlockingQueueHandler(self.queue)
+        self.queue_handler.addFilter(RequestContextFilter())
+        self.sampling = sampling
+        if sampling is not None:
+            self.queue_handler.addFilter(sampling)
+        self.listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.listener is None:
+                self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+                self.listener.start()
+
+    def stop(self):
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop() # Drains the queue before returning
+                self.listener = None
+
+    def flush(self, timeout=5.0):
+        """Waits until every queued record was written (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        for handler in self.handlers:
+            handler.flush()
+
+    def _after_fork(self):
+        # The listener thread does not survive fork(); give the child its own queue and thread
+        self.listener = None
+        self._lock = threading.Lock()
+        self.queue = self.queue_handler.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.start()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'dropped_queue_full': self.queue_handler.dropped,
+            'sampled_out': self.sampling.sampled_out if self.sampling else 0,
+            'rate_limited': self.sampling.rate_limited if self.sampling else 0,
+        }
+
+
+def _parse_sample_rates(value):
+    """'auth.token_user=0.01,rules.applied=0.1' -> {'auth.token_user': 0.01, 'rules.applied': 0.1}"""
+    rates = {}
+    for item in (value or '').split(','):
+        key, _, rate = item.rpartition('=')
+        if key.strip():
+            rates[key.strip()] = float(rate)
+    return rates
+
+
+_pipeline = None
+
+
+def _after_fork_in_child():
+    if _pipeline is not None and _pipeline.listener is not None:
+        _pipeline._after_fork()
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(_stop_pipeline)
+
+
+def init_logging(app):
+    """
+    Routes app.logger through the asynchronous pipeline: lazy %-style messages are filtered
+    by level, sampled and rate limited on the request thread, then redacted and written
+    (JSON lines or text, to stderr) by a background thread.
+    """
+    global _pipeline
+    level = logging.getLevelName(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    app.logger.setLevel(level if isinstance(level, int) else logging.INFO)
+    if not app.config.get('LOG_ASYNC', True):
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter() if app.config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter())
+    handler.addFilter(RedactionFilter(secrets=[app.config.get('SECRET_KEY'), os.environ.get('AWS_SECRET_ACCESS_KEY')]))
+    sampling = SamplingFilter(
+        sample_rate=app.config.get('LOG_SAMPLE_RATE', 1.0),
+        sample_rates=_parse_sample_rates(app.config.get('LOG_SAMPLE_RATES', '')),
+        rate_limit=app.config.get('LOG_RATE_LIMIT', 50),
+        window=app.config.get('LOG_RATE_LIMIT_WINDOW', 10.0),
+    )
+
+    # Several apps in one process (tests) share the logger; the newest pipeline replaces the previous one
+    if _pipeline is not None:
+        app.logger.removeHandler(_pipeline.queue_handler)
+        _pipeline.stop()
+    _pipeline = app.extensions['log_pipeline'] = LogPipeline([handler], app.config.get('LOG_QUEUE_SIZE', 10000), sampling)
+    _pipeline.start()
+
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(_pipeline.queue_handler)
+    app.logger.propagate = False
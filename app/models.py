@@ -19,6 +19,14 @@ class TaskStatusEnum(enum.Enum):
     ON_HOLD = 'ON_HOLD'
     CANCELLED = 'CANCELLED'
 
+class ChangeEntityEnum(enum.Enum):
+    TASK = 'TASK'
+    EDGE = 'EDGE'
+
+class ChangeOpEnum(enum.Enum):
+    UPSERT = 'UPSERT'
+    DELETE = 'DELETE'
+
 class Organization(db.Model):
     __tablename__ = 'organizations'
     id = db.Column(db.Integer, primary_key=True)
@@ -180,6 +188,34 @@ task_dependencies = db.Table('task_dependencies',
     db.Column('depends_on_task_id', db.Integer, db.ForeignKey('tasks.id'), primary_key=True)
 )
 
+# --- DELTA SYNC MODELS ---
+
+# One row per project holding its monotonically increasing change sequence.
+# Kept in its own table so existing databases only need create_all, not an ALTER.
+class ProjectChangeSequence(db.Model):
+    __tablename__ = 'project_change_sequences'
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    seq = db.Column(db.Integer, nullable=False, default=0)
+    # Changes at or below this sequence have been compacted away; older clients must resync.
+    compacted_seq = db.Column(db.Integer, nullable=False, default=0)
+
+# Change log of task and edge writes, stamped with the project sequence of the write.
+# task_id/depends_on_task_id are plain integers because the tasks may since have been deleted.
+class ProjectChange(db.Model):
+    __tablename__ = 'project_changes'
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.Enum(ChangeEntityEnum), nullable=False)
+    op = db.Column(db.Enum(ChangeOpEnum), nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)
+    depends_on_task_id = db.Column(db.Integer, nullable=True) # Only set for EDGE changes
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_project_changes_project_seq', 'project_id', 'seq'),
+    )
+
 # --- The rest of your models were mostly correct, just added back_populates for consistency ---
 
 class UserCommunicationPreferences(db.Model):
@@ -218,6 +254,19 @@ class AuthCode(db.Model):
     def __repr__(self):
         return f'<AuthCode {self.authcode}>'
 
+# --- SHARD DIRECTORY ---
+
+# Which database holds the tenant rows (projects, tasks, task dependencies, auth codes and the
+# project change log) of an account; accounts without a row live on the default database.
+# Kept on the default database, see app/sharding.py and run_shard_migration.py.
+class AccountShard(db.Model):
+    __tablename__ = 'account_shards'
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), primary_key=True)
+    shard = db.Column(db.String(64), nullable=False, default='default')
+    # Set while the account is being moved; writes to its tenant rows are refused meanwhile
+    read_only = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
+
 # ... (at the end of your models.py file)
 
 # --- TEMPLATE MODELS ---
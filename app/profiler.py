@@ -0,0 +1,289 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from flask import g, request
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProfilingError(Exception):
+    """Raised when a profiling session cannot be started; carries the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(_APP_ROOT):
+        filename = os.path.relpath(filename, _APP_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame):
+    """Root-to-leaf 'a;b;c' stack of a frame, the input format of flamegraph.pl and speedscope."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class ProfilingSession:
+    """
+    Profiles either the next `count` requests matching endpoint/method, or every matching
+    request during `seconds`. With the 'sampling' profiler a background thread samples the
+    stacks of the threads serving those requests; with 'cprofile' each request runs under
+    cProfile and the results are merged. With memory=True, tracemalloc snapshots taken at
+    the start and the end of the session are diffed.
+
+    Every session ends after max_seconds at the latest: a count session that does not see
+    enough matching requests by then ends as 'expired', and cancel() ends it as 'cancelled'.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, profiler='sampling', endpoint=None, method=None, count=None, seconds=None,
+                 memory=False, sample_interval=0.005, max_seconds=120):
+        self.id = next(self._ids)
+        self.profiler = profiler
+        self.endpoint = endpoint
+        self.method = method.upper() if method else None
+        self.count = count
+        self.seconds = seconds
+        self.memory = memory
+        self.sample_interval = sample_interval
+        self.status = 'running'
+        self.started_at = time.time()
+        self.finished_at = None
+        self.deadline = time.monotonic() + (seconds or max_seconds)
+        self.claimed = 0
+        self.completed = 0
+        self.stacks = Counter()
+        self.samples = 0
+        self.memory_diff = None
+        self._stats = None
+        self._active_threads = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._memory_started = False
+        self._memory_snapshot = None
+
+    def start(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._memory_started = True
+            self._memory_snapshot = tracemalloc.take_snapshot()
+        # The sampler also enforces the deadline when no matching request arrives.
+        threading.Thread(target=self._sample_loop, name=f'profiler-{self.id}', daemon=True).start()
+
+    def matches(self, rule, method):
+        return (self.endpoint is None or self.endpoint == rule) and (self.method is None or self.method == method)
+
+    def claim(self):
+        """Reserves a slot for the current request; False once the session is full or over."""
+        with self._lock:
+            if self.status != 'running' or (self.count is not None and self.claimed >= self.count):
+                return False
+            if time.monotonic() >= self.deadline:
+                return False
+            self.claimed += 1
+            return True
+
+    def enter_request(self):
+        if self.profiler == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        with self._lock:
+            self._active_threads.add(threading.get_ident())
+        return None
+
+    def exit_request(self, profile):
+        if profile is not None:
+            profile.disable()
+        with self._lock:
+            self._active_threads.discard(threading.get_ident())
+            if profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            self.completed += 1
+            reached = self.count is not None and self.completed >= self.count
+        if reached:
+            self.finish()
+
+    def _sample_loop(self):
+        # cProfile sessions only need the thread to end them at the deadline
+        while not self._done.wait(self.sample_interval if self.profiler == 'sampling' else self.deadline - time.monotonic()):
+            if time.monotonic() >= self.deadline:
+                self.finish('finished' if self.seconds else 'expired')
+                return
+            if self.profiler != 'sampling':
+                continue
+            with self._lock:
+                thread_ids = list(self._active_threads)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            sampled = [collapse_stack(frames[thread_id]) for thread_id in thread_ids if thread_id in frames]
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += len(sampled)
+
+    def finish(self, status='finished'):
+        with self._lock:
+            if self.status != 'running':
+                return
+            self.status = status
+        self._done.set()
+        if self.memory and self._memory_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            self.memory_diff = snapshot.compare_to(self._memory_snapshot, 'lineno')
+            if self._memory_started:
+                tracemalloc.stop()
+        self.finished_at = time.time()
+
+    def cancel(self):
+        """Ends the session early; whatever was collected so far is kept."""
+        self.finish('cancelled')
+
+    def collapsed(self):
+        """Collapsed stacks, one 'stack count' line each (sampling profiler only)."""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def pstats_text(self, limit=50):
+        if self._stats is None:
+            return ''
+        output = io.StringIO()
+        self._stats.stream = output
+        self._stats.sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def to_dict(self, top=20):
+        summary = {
+            'id': self.id,
+            'status': self.status,
+            'profiler': self.profiler,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'count': self.count,
+            'seconds': self.seconds,
+            'memory': self.memory,
+            'requests_profiled': self.completed,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.profiler == 'sampling':
+            leaves = Counter()
+            with self._lock:
+                stacks = list(self.stacks.items())
+            for stack, count in stacks:
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            summary['samples'] = self.samples
+            summary['top_frames'] = [{'frame': frame, 'samples': count} for frame, count in leaves.most_common(top)]
+        if self.memory_diff is not None:
+            summary['memory_top'] = [{
+                'location': str(stat.traceback[0]) if stat.traceback else None,
+                'size_diff_bytes': stat.size_diff,
+                'count_diff': stat.count_diff,
+            } for stat in self.memory_diff[:top]]
+        return summary
+
+
+class Profiler:
+    """
+    Per-worker registry: at most one running session, a minimum gap between sessions, recent history.
+    max_seconds bounds time-window sessions and is also how long a count session may wait for its requests.
+    """
+
+    def __init__(self, min_interval=60, max_requests=50, max_seconds=120, sample_interval=0.005, history=10):
+        self.min_interval = min_interval
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.sample_interval = sample_interval
+        self.sessions = deque(maxlen=history)
+        self.active = None
+        self._last_started = None
+        self._lock = threading.Lock()
+
+    def start(self, profiler='sampling', endpoint=None, method=None, count=None, seconds=None, memory=False):
+        if profiler not in ('sampling', 'cprofile'):
+            raise ProfilingError("profiler must be 'sampling' or 'cprofile'.")
+        if (count is None) == (seconds is None):
+            raise ProfilingError('Give exactly one of count (next N requests) or seconds (time window).')
+        if count is not None and not 1 <= count <= self.max_requests:
+            raise ProfilingError(f'count must be between 1 and {self.max_requests}.')
+        if seconds is not None and not 0 < seconds <= self.max_seconds:
+            raise ProfilingError(f'seconds must be between 0 and {self.max_seconds}.')
+
+        with self._lock:
+            if self.active is not None and self.active.status == 'running':
+                raise ProfilingError(f'Profiling session {self.active.id} is still running.', status=409)
+            now = time.monotonic()
+            if self._last_started is not None and now - self._last_started < self.min_interval:
+                wait = int(self.min_interval - (now - self._last_started)) + 1
+                raise ProfilingError(f'Profiling is rate limited; try again in {wait}s.', status=429)
+            self._last_started = now
+            session = ProfilingSession(profiler, endpoint, method, count, seconds, memory, self.sample_interval,
+                                       self.max_seconds)
+            self.sessions.append(session)
+            self.active = session
+        session.start()
+        return session
+
+    def get(self, session_id):
+        for session in self.sessions:
+            if session.id == session_id:
+                return session
+        return None
+
+    def cancel(self, session_id):
+        session = self.get(session_id)
+        if session is not None:
+            session.cancel()
+        return session
+
+
+def init_profiler(app):
+    """Hooks on-demand profiling sessions (see /api/v1/admin/profiles) into request handling."""
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+    profiler = app.extensions['profiler'] = Profiler(
+        min_interval=app.config.get('PROFILING_MIN_INTERVAL', 60),
+        max_requests=app.config.get('PROFILING_MAX_REQUESTS', 50),
+        max_seconds=app.config.get('PROFILING_MAX_SECONDS', 120),
+        sample_interval=app.config.get('PROFILING_SAMPLE_INTERVAL_MS', 5) / 1000.0,
+    )
+
+    @app.before_request
+    def _start_profiling_request():
+        session = profiler.active
+        if session is None or session.status != 'running':
+            return
+        rule = request.url_rule.rule if request.url_rule else None
+        if rule and rule.startswith('/api/v1/admin/'):
+            return
+        if session.matches(rule, request.method) and session.claim():
+            g._profiling = (session, session.enter_request())
+
+    @app.teardown_request
+    def _finish_profiling_request(exc):
+        profiling = g.pop('_profiling', None)
+        if profiling is not None:
+            session, profile = profiling
+            session.exit_request(profile)
@@ -0,0 +1,134 @@
+import os
+import re
+import sys
+from collections import Counter
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in test mode when an endpoint runs more SQL statements than its declared budget."""
+
+
+def query_budget(max_queries):
+    """
+    Declares the most SQL statements one request to the decorated endpoint may execute.
+    Exceeding it is logged, and fails the request when TESTING or QUERY_BUDGET_ENFORCE is set.
+    Place it above @token_required so it is set on the registered view function.
+    """
+    def decorator(f):
+        f._query_budget = max_queries
+        return f
+    return decorator
+
+
+def fingerprint(statement):
+    """Normalizes a SQL statement so executions differing only in literals or IN-list length compare equal."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+def _call_site():
+    """The innermost frame inside the app package (outside this module) that issued the query."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            return f'{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'outside app'
+
+
+class QueryLog:
+    """Statements executed by one request, grouped by fingerprint, with the call sites that issued them."""
+
+    def __init__(self):
+        self.count = 0
+        self.by_fingerprint = Counter()
+        self.sites = {}
+
+    def record(self, statement):
+        key = fingerprint(statement)
+        self.count += 1
+        self.by_fingerprint[key] += 1
+        self.sites.setdefault(key, Counter())[_call_site()] += 1
+
+    def repeated(self, threshold):
+        """[(fingerprint, executions, {site: executions})] for shapes executed at least `threshold` times."""
+        return [
+            (key, executions, dict(self.sites[key]))
+            for key, executions in self.by_fingerprint.most_common()
+            if executions >= threshold
+        ]
+
+
+def current_query_log():
+    return g.get('_query_log') if has_request_context() else None
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    query_log = current_query_log()
+    if query_log is not None:
+        query_log.record(statement)
+
+
+def _view_budget(view):
+    while view is not None:
+        budget = getattr(view, '_query_budget', None)
+        if budget is not None:
+            return budget
+        view = getattr(view, '__wrapped__', None)
+    return None
+
+
+def init_query_budget(app):
+    """
+    Opt-in N+1 detection and per-endpoint query budgets. Active when N_PLUS_ONE_DETECTION or
+    TESTING is set: every statement is fingerprinted per request, shapes repeated at least
+    N_PLUS_ONE_THRESHOLD times are logged with their call sites, and endpoints declared with
+    @query_budget are checked against their budget.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _record_statement):
+        event.listen(Engine, 'before_cursor_execute', _record_statement)
+
+    def active():
+        return app.config.get('N_PLUS_ONE_DETECTION') or app.config.get('TESTING')
+
+    @app.before_request
+    def _start_query_log():
+        if active():
+            g._query_log = QueryLog()
+
+    @app.after_request
+    def _check_query_log(response):
+        query_log = g.pop('_query_log', None)
+        if query_log is None:
+            return response
+        endpoint = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+
+        for key, executions, sites in query_log.repeated(app.config.get('N_PLUS_ONE_THRESHOLD', 5)):
+            site_text = '; '.join(f'{site} (x{count})' for site, count in sorted(sites.items(), key=lambda item: -item[1]))
+            current_app.logger.warning("N+1 suspected on %s: %dx %s -- from %s", endpoint, executions, key[:200], site_text,
+                                       extra={'log_key': f'query_budget.n_plus_one:{endpoint}'})
+
+        budget = _view_budget(app.view_functions.get(request.endpoint))
+        if budget is not None and query_log.count > budget:
+            message = (f"{endpoint} executed {query_log.count} SQL statements, over its budget of {budget}. "
+                       f"Most repeated: {', '.join(f'{count}x {key[:120]}' for key, count in query_log.by_fingerprint.most_common(3))}")
+            if app.config.get('TESTING') or app.config.get('QUERY_BUDGET_ENFORCE'):
+                raise QueryBudgetExceeded(message)
+            current_app.logger.warning(message, extra={'log_key': f'query_budget.exceeded:{endpoint}'})
+        return response
@@ -0,0 +1,133 @@
+import threading
+import time
+import numpy as np
+from flask import current_app
+from . import db
+from .models import *
+
+
+def _group_indexes(keys):
+    """Splits row indexes into a dict of key -> int array of the rows holding that key."""
+    if len(keys) == 0:
+        return {}
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    return {int(key): rows for key, rows in zip(unique_keys, np.split(order, starts[1:]))}
+
+
+class QuestionPool:
+    """
+    Precomputed, read-only index of the question bank held as compact numpy arrays.
+    Pools are arrays of row indexes grouped by module, concept, problem category slug
+    and (module, slug), so building a test never scans TestQuestion.
+    """
+
+    def __init__(self, ids, module_ids, concept_ids, slugs):
+        order = np.argsort(np.asarray(ids, dtype=np.int64))
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.module_ids = np.asarray(module_ids, dtype=np.int64)[order]
+        self.concept_ids = np.asarray(concept_ids, dtype=np.int64)[order]
+        slug_names, slug_codes = np.unique(np.asarray(slugs, dtype=object)[order].astype(str), return_inverse=True)
+        self.slug_codes = {slug: code for code, slug in enumerate(slug_names)}
+        self.slug_code_of_row = slug_codes.astype(np.int64)
+
+        self.by_module = _group_indexes(self.module_ids)
+        self.by_concept = _group_indexes(self.concept_ids)
+        self.by_slug = _group_indexes(self.slug_code_of_row)
+        self.by_module_slug = _group_indexes(self.module_ids * max(len(slug_names), 1) + self.slug_code_of_row)
+        self.built_at = time.time()
+
+    @classmethod
+    def from_db(cls):
+        # Only the four columns needed for pooling; question text is loaded per test by id.
+        rows = db.session.query(
+            TestQuestion.id, TestQuestion.modules_id, TestQuestion.concepts_id, TestQuestion.problem_category_slug
+        ).all()
+        return cls(
+            [row[0] for row in rows],
+            [row[1] if row[1] is not None else -1 for row in rows],
+            [row[2] if row[2] is not None else -1 for row in rows],
+            [row[3] or '' for row in rows],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _empty(self):
+        return np.empty(0, dtype=np.int64)
+
+    def rows_for(self, module_id=None, slug=None):
+        """Row indexes of the questions in a module and/or problem category."""
+        if slug is not None and slug not in self.slug_codes:
+            return self._empty()
+        if module_id is not None and slug is not None:
+            key = module_id * max(len(self.slug_codes), 1) + self.slug_codes[slug]
+            return self.by_module_slug.get(key, self._empty())
+        if module_id is not None:
+            return self.by_module.get(module_id, self._empty())
+        if slug is not None:
+            return self.by_slug.get(self.slug_codes[slug], self._empty())
+        return np.arange(len(self.ids))
+
+    def rows_for_concepts(self, concept_ids):
+        pools = [self.by_concept[int(c)] for c in np.unique(concept_ids) if int(c) in self.by_concept]
+        return np.concatenate(pools) if pools else self._empty()
+
+    def rows_of_ids(self, question_ids):
+        """Row indexes of the given question ids; ids no longer in the pool are dropped."""
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        if len(self.ids) == 0 or len(question_ids) == 0:
+            return self._empty()
+        positions = np.clip(np.searchsorted(self.ids, question_ids), 0, len(self.ids) - 1)
+        return positions[self.ids[positions] == question_ids]
+
+    def sample(self, rows, count, weights=None, rng=None):
+        """
+        Draws `count` distinct question ids from the given rows, without replacement.
+        With weights, uses Efraimidis-Spirakis keys (u ** (1 / w)) and a partial sort,
+        so the whole draw is a handful of vector operations.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        rows = np.asarray(rows, dtype=np.int64)
+        if count <= 0 or len(rows) == 0:
+            return self._empty()
+        if weights is None:
+            picked = rng.permutation(rows)[:count]
+            return self.ids[picked]
+
+        weights = np.asarray(weights, dtype=np.float64)
+        positive = weights > 0
+        rows, weights = rows[positive], weights[positive]
+        if len(rows) == 0:
+            return self._empty()
+        keys = rng.random(len(rows)) ** (1.0 / weights)
+        if count >= len(rows):
+            picked = np.argsort(-keys)
+        else:
+            top = np.argpartition(-keys, count - 1)[:count]
+            picked = top[np.argsort(-keys[top])]
+        return self.ids[rows[picked]]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_question_pool():
+    """Returns the process-wide question pool, rebuilding it once it is older than QUESTION_POOL_TTL."""
+    global _pool
+    ttl = current_app.config.get('QUESTION_POOL_TTL', 600)
+    pool = _pool
+    if pool is None or time.time() - pool.built_at > ttl:
+        with _pool_lock:
+            if _pool is None or time.time() - _pool.built_at > ttl:
+                _pool = QuestionPool.from_db()
+            pool = _pool
+    return pool
+
+
+def invalidate_question_pool():
+    """Drops the cached pool, e.g. after the question bank has been reseeded."""
+    global _pool
+    with _pool_lock:
+        _pool = None
@@ -0,0 +1,196 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from .db_pool import pool_engine_options
+from .sharding import DEFAULT_SHARD, is_tenant_statement, request_shard, sharding_enabled
+
+PRIMARY = 'primary'
+
+
+class ReplicaRouter:
+    """
+    Picks a healthy replica bind for each read-only request, round robin. A replica whose
+    connection fails is skipped for retry_seconds. Users who wrote within sticky_seconds
+    read from the primary so they see their own writes; this is tracked per worker process.
+    """
+
+    def __init__(self, bind_keys, sticky_seconds=5, retry_seconds=30, max_sticky=10000):
+        self.bind_keys = list(bind_keys)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self.max_sticky = max_sticky
+        self.routed = {PRIMARY: 0, **{key: 0 for key in self.bind_keys}}
+        self.failovers = 0
+        self._down_until = {}
+        self._sticky = OrderedDict()
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, subject=None):
+        """Bind key of the replica to read from, or PRIMARY."""
+        now = time.monotonic()
+        with self._lock:
+            target = PRIMARY
+            if not (subject is not None and self._sticky.get(subject, 0) > now):
+                healthy = [key for key in self.bind_keys if self._down_until.get(key, 0) <= now]
+                if healthy:
+                    target = healthy[next(self._turn) % len(healthy)]
+            self.routed[target] += 1
+        return target
+
+    def mark_write(self, subject):
+        with self._lock:
+            self._sticky.pop(subject, None)
+            self._sticky[subject] = time.monotonic() + self.sticky_seconds
+            while len(self._sticky) > self.max_sticky:
+                self._sticky.popitem(last=False)
+
+    def mark_down(self, bind_key):
+        with self._lock:
+            self._down_until[bind_key] = time.monotonic() + self.retry_seconds
+            self.failovers += 1
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'routed': dict(self.routed),
+                'failovers': self.failovers,
+                'down': sorted(key for key, until in self._down_until.items() if until > now),
+            }
+
+
+def request_target():
+    """The bind the current request reads from; decided at its first statement, then fixed."""
+    if not has_request_context():
+        return PRIMARY
+    target = g.get('_db_target')
+    if target is None:
+        target = PRIMARY
+        router = current_app.extensions.get('read_replicas')
+        if router is not None and g.get('_read_replica') and not g.get('_db_wrote'):
+            target = router.choose(g.get('_token_subject'))
+        g._db_target = target
+    return target
+
+
+def use_primary():
+    """Sends the remaining statements of this request to the primary, e.g. after a replica miss."""
+    if has_request_context():
+        g._db_target = PRIMARY
+
+
+def _mark_write():
+    if has_request_context():
+        g._db_wrote = True
+        g._db_target = PRIMARY
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session that sends tenant tables to the shard of the account in scope
+    (see sharding.py) and the remaining reads of @read_replica requests to a replica bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        if bind is not None or engine is not engines.get(None):
+            return engine
+        writing = self._flushing or getattr(clause, 'is_dml', False)
+        if sharding_enabled() and is_tenant_statement(mapper, clause):
+            shard = request_shard(writing)
+            if shard != DEFAULT_SHARD:
+                if writing:
+                    _mark_write()
+                return engines[shard]
+        if writing:
+            _mark_write()
+            return engine
+        target = request_target()
+        return engines.get(target, engine) if target != PRIMARY else engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    _mark_write()
+
+
+def _on_db_error(exception_context):
+    if not has_request_context():
+        return
+    target = g.get('_db_target')
+    if target in (None, PRIMARY) or g.get('_replica_failed'):
+        return
+    sqlalchemy = current_app.extensions.get('sqlalchemy')
+    if sqlalchemy is None or exception_context.engine is not sqlalchemy.engines.get(target):
+        return
+    if exception_context.is_disconnect or isinstance(exception_context.sqlalchemy_exception,
+                                                     (exc.OperationalError, exc.InterfaceError)):
+        g._replica_failed = target
+        current_app.extensions['read_replicas'].mark_down(target)
+
+
+def read_replica(f):
+    """
+    Lets the decorated read-only endpoint read from a replica. If the replica fails during the
+    request, the endpoint is run again on the primary. Place it above @token_required.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g._read_replica = True
+        try:
+            response = f(*args, **kwargs)
+        except exc.DBAPIError:
+            if not g.get('_replica_failed'):
+                raise
+            response = None
+        failed = g.pop('_replica_failed', None)
+        if failed is None:
+            return response
+        current_app.logger.warning("Read replica %s failed; retrying %s on the primary", failed, request.path,
+                                   extra={'log_key': f'read_replicas.failover:{failed}'})
+        current_app.extensions['sqlalchemy'].session.remove()
+        use_primary()
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def init_read_replicas(app):
+    """
+    Adds one bind per READ_REPLICA_URLS entry, with the primary's pool profile, and routes
+    @read_replica endpoints to them. Call it before db.init_app(app). Without replicas
+    configured everything reads from the primary.
+    """
+    urls = [url.strip() for url in (app.config.get('READ_REPLICA_URLS') or '').split(',') if url.strip()]
+    if not urls:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    bind_keys = []
+    for position, url in enumerate(urls):
+        key = f'replica_{position}'
+        binds[key] = {'url': url, **pool_engine_options(app.config, url)}
+        bind_keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    router = app.extensions['read_replicas'] = ReplicaRouter(
+        bind_keys,
+        sticky_seconds=app.config.get('READ_YOUR_WRITES_SECONDS', 5),
+        retry_seconds=app.config.get('READ_REPLICA_RETRY_SECONDS', 30),
+    )
+    if not event.contains(Engine, 'handle_error', _on_db_error):
+        event.listen(Engine, 'handle_error', _on_db_error)
+
+    @app.after_request
+    def _remember_writer(response):
+        subject = g.get('_token_subject')
+        if g.get('_db_wrote') and subject is not None:
+            router.mark_write(subject)
+        return response
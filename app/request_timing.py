@@ -0,0 +1,159 @@
+import threading
+import time
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+
+
+class RequestTiming:
+    """Per-request counters, kept on flask.g while the request runs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.serialization_seconds = 0.0
+
+
+def current_timing():
+    """The RequestTiming of the active request, or None outside a request (or when disabled)."""
+    return g.get('_request_timing') if has_request_context() else None
+
+
+class Histogram:
+    """A Prometheus-style cumulative histogram with one series per label set."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][position] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{label_text}}} {series["sum"]}')
+                lines.append(f'{self.name}_count{{{label_text}}} {series["count"]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """Histograms per endpoint (URL rule) and method. Values are per process/worker."""
+
+    LABELS = ('endpoint', 'method')
+
+    def __init__(self):
+        self.duration = Histogram('http_request_duration_seconds', 'Wall time spent handling the request.', DURATION_BUCKETS)
+        self.db_time = Histogram('http_request_db_seconds', 'Time spent executing SQL statements.', DURATION_BUCKETS)
+        self.queries = Histogram('http_request_queries', 'Number of SQL statements executed.', QUERY_COUNT_BUCKETS)
+        self.serialization = Histogram('http_request_serialization_seconds', 'Time spent encoding JSON.', DURATION_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Size of non-streamed response bodies.', SIZE_BUCKETS)
+
+    def render(self):
+        lines = []
+        for histogram in (self.duration, self.db_time, self.queries, self.serialization, self.response_size):
+            lines.extend(histogram.render(self.LABELS))
+        return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, adding the time spent in dumps() to the current request."""
+
+    def dumps(self, obj, **kwargs):
+        timing = current_timing()
+        if timing is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            timing.serialization_seconds += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the execution context, so a failed statement cannot skew the next one.
+    if context is not None and current_timing() is not None:
+        context._request_timing_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    started = getattr(context, '_request_timing_started', None)
+    if timing is None or started is None:
+        return
+    timing.db_seconds += time.perf_counter() - started
+    timing.queries += 1
+
+
+def init_request_timing(app):
+    """
+    Records wall time, SQL time and count, JSON serialization time and response size for
+    every request. Results are sent back in a Server-Timing header and aggregated into the
+    histograms served by /metrics.
+    """
+    metrics = app.extensions['request_metrics'] = RequestMetrics()
+    if not app.config.get('REQUEST_TIMING_ENABLED', True):
+        return
+    server_timing_header = app.config.get('SERVER_TIMING_HEADER', True)
+
+    json_provider = TimedJSONProvider(app)
+    json_provider.sort_keys = app.json.sort_keys
+    json_provider.ensure_ascii = app.json.ensure_ascii
+    json_provider.compact = app.json.compact
+    app.json = json_provider
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_request_timing():
+        g._request_timing = RequestTiming()
+
+    @app.after_request
+    def _finish_request_timing(response):
+        timing = g.pop('_request_timing', None)
+        if timing is None:
+            return response
+        wall_seconds = time.perf_counter() - timing.started
+        labels = (request.url_rule.rule if request.url_rule else 'unmatched', request.method)
+        metrics.duration.observe(labels, wall_seconds)
+        metrics.db_time.observe(labels, timing.db_seconds)
+        metrics.queries.observe(labels, timing.queries)
+        metrics.serialization.observe(labels, timing.serialization_seconds)
+        if not response.is_streamed:
+            metrics.response_size.observe(labels, response.calculate_content_length() or 0)
+
+        if server_timing_header:
+            response.headers['Server-Timing'] = (
+                f'app;dur={wall_seconds * 1000:.2f}, '
+                f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.queries} queries", '
+                f'serialize;dur={timing.serialization_seconds * 1000:.2f}'
+            )
+        return response
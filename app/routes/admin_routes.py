@@ -0,0 +1,122 @@
+from flask import Blueprint, request, jsonify, current_app
+from ..utils import token_required, admin_required
+from ..profiler import ProfilingError
+
+admin_bp = Blueprint('admin_bp', __name__)
+
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@token_required
+@admin_required
+def get_slow_queries(current_user):
+    """
+    Lists the most recent slow SQL statements recorded by this worker, newest first, with
+    normalized SQL, parameter types, originating endpoint and EXPLAIN plan.
+    Optional ?limit=N.
+    """
+    slow_query_log = current_app.extensions.get('slow_query_log')
+    if slow_query_log is None:
+        return jsonify({'message': 'Slow query log is disabled.'}), 404
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'message': 'Invalid limit format. Must be an integer.'}), 400
+    return jsonify({
+        'threshold_ms': slow_query_log.threshold * 1000,
+        'queries': slow_query_log.records(limit),
+    }), 200
+
+
+@admin_bp.route('/admin/slow-queries', methods=['DELETE'])
+@token_required
+@admin_required
+def clear_slow_queries(current_user):
+    slow_query_log = current_app.extensions.get('slow_query_log')
+    if slow_query_log is None:
+        return jsonify({'message': 'Slow query log is disabled.'}), 404
+    slow_query_log.clear()
+    return jsonify({'message': 'Slow query log cleared.'}), 200
+
+
+@admin_bp.route('/admin/profiles', methods=['POST'])
+@token_required
+@admin_required
+def start_profile(current_user):
+    """
+    Starts profiling this worker. Body:
+      {"profiler": "sampling" | "cprofile", "memory": bool,
+       "endpoint": "/api/v1/projects/<int:project_id>", "method": "GET",
+       "count": N}            -- the next N matching requests, or
+       "seconds": S}          -- every matching request for S seconds
+    endpoint/method are optional filters on the URL rule. Sessions are rate limited, and a
+    count session ends as 'expired' after PROFILING_MAX_SECONDS; DELETE cancels one early.
+    """
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return jsonify({'message': 'Profiling is disabled.'}), 404
+    data = request.get_json() or {}
+    try:
+        session = profiler.start(
+            profiler=data.get('profiler', 'sampling'),
+            endpoint=data.get('endpoint'),
+            method=data.get('method'),
+            count=int(data['count']) if data.get('count') is not None else None,
+            seconds=float(data['seconds']) if data.get('seconds') is not None else None,
+            memory=bool(data.get('memory', False)),
+        )
+    except ProfilingError as e:
+        return jsonify({'message': str(e)}), e.status
+    except (TypeError, ValueError):
+        return jsonify({'message': 'count and seconds must be numbers.'}), 400
+    return jsonify(session.to_dict()), 202
+
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@admin_required
+def list_profiles(current_user):
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return jsonify({'message': 'Profiling is disabled.'}), 404
+    return jsonify([session.to_dict(top=5) for session in reversed(profiler.sessions)]), 200
+
+
+@admin_bp.route('/admin/profiles/<int:session_id>', methods=['DELETE'])
+@token_required
+@admin_required
+def cancel_profile(current_user, session_id):
+    """Cancels a running profiling session, keeping what it collected, so a new one can start."""
+    profiler = current_app.extensions.get('profiler')
+    session = profiler.get(session_id) if profiler else None
+    if session is None:
+        return jsonify({'message': 'Profiling session not found'}), 404
+    if session.status != 'running':
+        return jsonify({'message': f'Profiling session {session.id} is already {session.status}.'}), 409
+    profiler.cancel(session_id)
+    return jsonify(session.to_dict()), 200
+
+
+@admin_bp.route('/admin/profiles/<int:session_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_profile(current_user, session_id):
+    """
+    Returns a profiling session. ?format=json (default) gives the summary, top frames and
+    tracemalloc diff; ?format=collapsed gives flamegraph-ready collapsed stacks (sampling);
+    ?format=pstats gives the merged cProfile report (cprofile).
+    """
+    profiler = current_app.extensions.get('profiler')
+    session = profiler.get(session_id) if profiler else None
+    if session is None:
+        return jsonify({'message': 'Profiling session not found'}), 404
+
+    output_format = request.args.get('format', 'json')
+    if output_format == 'json':
+        return jsonify(session.to_dict()), 200
+    if output_format == 'collapsed':
+        return current_app.response_class(session.collapsed(), mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename=profile-{session.id}.collapsed'
+        })
+    if output_format == 'pstats':
+        return current_app.response_class(session.pstats_text(), mimetype='text/plain')
+    return jsonify({'message': 'format must be json, collapsed or pstats.'}), 400
@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from ..models import User, UserProfile, UserCommunicationPreferences, AuthCode, Account, UserAccount
 from datetime import datetime, timezone
 from .. import db # Import db instance from app/__init__.py
 from ..utils import generate_token, token_required
 from ..google_auth_service import GoogleAuthService # Our new service
+from ..read_replicas import read_replica
+from ..sharding import use_auth_code
 
 
 auth_bp = Blueprint('auth_bp', __name__)
@@ -46,6 +48,7 @@ def google_auth():
             db.session.commit()
             user = new_user
             newuser_flag = True
+            g._token_subject = str(user.id) # Read-your-writes: the new user's next reads go to the primary
         # 4. Generate our OWN internal JWT for the user
         secret_key = current_app.config.get('SECRET_KEY')
         internal_token = generate_token(user.id, user.email, secret_key)
@@ -86,7 +89,7 @@ def login():
     if user.check_password(data['password']):
         # Password matches, generate token
         try:
-            token = generate_token(user.id, user.email)
+            token = generate_token(user.id, user.email, current_app.config.get('SECRET_KEY'))
             current_app.logger.info(f"User {user.email} logged in successfully.")
             return jsonify({'message': 'Login successful!', 'token': token}), 200
         except Exception as e:
@@ -104,6 +107,7 @@ def login():
 #     return jsonify({'message': f'Hello {current_user.email}! This is a protected route.'}), 200
 
 @auth_bp.route('/me', methods=['GET'])
+@read_replica
 @token_required
 def get_current_user(current_user):
     """
@@ -192,6 +196,7 @@ def activate_account(current_user):
     if not auth_code_str:
         return jsonify({'message': 'Auth code is required.'}), 400
 
+    use_auth_code(auth_code_str)
     auth_code_entry = AuthCode.query.filter_by(authcode=auth_code_str).first()
 
     if not auth_code_entry:
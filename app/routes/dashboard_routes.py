@@ -1,6 +1,5 @@
 from flask import Blueprint, jsonify
 from ..utils import token_required
-from ..rules_engine import get_dashboard_content
 
 dashboard_bp = Blueprint('dashboard_bp', __name__)
 
@@ -10,5 +9,6 @@ def dashboard(current_user):
     """
     Returns the content for the user's dashboard.
     """
+    from ..rules_engine import get_dashboard_content # numpy-backed; imported on first use
     content = get_dashboard_content(current_user)
     return jsonify(content), 200
\ No newline at end of file
@@ -0,0 +1,108 @@
+from flask import Blueprint, Response, current_app, jsonify, json
+from ..utils import token_required, stream_token_required, generate_stream_token
+from ..models import Project
+from ..sharding import use_project
+from ..change_broker import get_change_broker, project_topic, account_topic, SubscriptionLimitReached
+from ..change_log import current_seq
+
+events_bp = Blueprint('events_bp', __name__)
+
+# Seconds a client is asked to wait when this worker has no free stream slot
+STREAM_LIMIT_RETRY_AFTER = 5
+
+
+def _format_sse(change_event):
+    return f"id: {change_event['id']}\nevent: {change_event['event']}\ndata: {json.dumps(change_event['data'])}\n\n"
+
+
+def _event_stream(broker, subscription, heartbeat_seconds, initial_event=None):
+    try:
+        if initial_event:
+            yield _format_sse(initial_event)
+        while True:
+            change_event = subscription.get(timeout=heartbeat_seconds)
+            if change_event is None:
+                # Comment line keeps proxies from closing an idle connection.
+                yield ': keep-alive\n\n'
+            else:
+                yield _format_sse(change_event)
+    finally:
+        # Runs when the client disconnects and the server closes the generator.
+        broker.unsubscribe(subscription)
+
+
+def _sse_response(topics, initial_event=None):
+    broker = get_change_broker()
+    try:
+        subscription = broker.subscribe(topics)
+    except SubscriptionLimitReached as e:
+        # Every open stream holds a serving thread; past SSE_MAX_STREAMS the worker could not
+        # answer anything else. EventSource does not retry a 503, so clients reconnect themselves.
+        current_app.logger.warning("Refusing change stream: %s", e, extra={'log_key': 'events.stream_limit'})
+        response = jsonify({'message': 'Too many open change streams; try again later.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_LIMIT_RETRY_AFTER)
+        return response
+    stream = _event_stream(broker, subscription, current_app.config.get('SSE_HEARTBEAT_SECONDS', 15), initial_event)
+    response = Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Stop nginx from buffering the stream
+    })
+    # Frees the slot even if the stream is closed before its generator ever ran
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
+
+
+@events_bp.route('/events/token', methods=['POST'])
+@token_required
+def create_stream_token(current_user):
+    """
+    Issues a short-lived token for the event streams below. Browsers' EventSource cannot send
+    an Authorization header, so the web client opens e.g. /projects/<id>/events?token=<token>.
+    """
+    expires_in = current_app.config.get('SSE_TOKEN_SECONDS', 60)
+    token = generate_stream_token(current_user.id, current_app.config.get('SECRET_KEY'), expires_in)
+    return jsonify({'token': token, 'expires_in': expires_in}), 200
+
+
+@events_bp.route('/projects/<int:project_id>/events', methods=['GET'])
+@stream_token_required
+def project_events(current_user, project_id):
+    """
+    Server-Sent Events stream of change notifications for one project.
+    Each 'change' event carries the new change sequence and counts of what changed;
+    clients apply it with GET /projects/<id>/changes?since=<their last seq>.
+    The first event is a 'hello' with the current sequence.
+    """
+    use_project(project_id)
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'message': 'Project not found'}), 404
+
+    user_account_ids = [ua.account_id for ua in current_user.accounts]
+    if project.account_id not in user_account_ids:
+        return jsonify({'message': 'User not authorized to view this project'}), 403
+
+    seq = current_seq(project_id)
+    return _sse_response([project_topic(project_id)], initial_event={
+        'id': seq,
+        'event': 'hello',
+        'data': {'project_id': project_id, 'seq': seq},
+    })
+
+
+@events_bp.route('/accounts/<int:account_id>/events', methods=['GET'])
+@stream_token_required
+def account_events(current_user, account_id):
+    """
+    Server-Sent Events stream of change notifications for every project of an account.
+    """
+    user_account_ids = [ua.account_id for ua in current_user.accounts]
+    if account_id not in user_account_ids:
+        return jsonify({'message': 'User not authorized for this account'}), 403
+
+    return _sse_response([account_topic(account_id)], initial_event={
+        'id': 0,
+        'event': 'hello',
+        'data': {'account_id': account_id},
+    })
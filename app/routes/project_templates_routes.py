@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify
+from .. import db
 from ..utils import token_required
-from ..models import ProjectTemplate, TaskTemplate
+from ..query_budget import query_budget
+from ..read_replicas import read_replica
+from ..models import ProjectTemplate, TaskTemplate, task_template_dependencies
+from ..template_catalog import template_catalog
 
 # Create a new Blueprint for project templates
 project_templates_bp = Blueprint('project_templates_bp', __name__)
@@ -9,6 +13,8 @@ project_templates_bp = Blueprint('project_templates_bp', __name__)
 # --- NEW: Route 1 - Get a lightweight list of all templates ---
 
 @project_templates_bp.route('/project-templates', methods=['GET'])
+@query_budget(5)
+@read_replica
 @token_required
 def get_project_template_list(current_user):
     """
@@ -16,15 +22,16 @@ def get_project_template_list(current_user):
     containing only their ID, name, and description.
     """
     try:
-        # Fetch all project templates from the database
-        templates = ProjectTemplate.query.all()
+        catalog = template_catalog()
+        templates_data = catalog.get('list') if catalog else None
+        if templates_data is None:
+            # Fetch all project templates from the database
+            templates = ProjectTemplate.query.all()
 
-        # Build a simple list of dictionaries, without the heavy task data
-        templates_data = [{
-            'id': template.id,
-            'name': template.name,
-            'description': template.description
-        } for template in templates]
+            # Build a simple list of dictionaries, without the heavy task data
+            templates_data = _template_list_json(templates)
+            if catalog:
+                catalog.put('list', templates_data)
 
         return jsonify(templates_data), 200
 
@@ -36,6 +43,8 @@ def get_project_template_list(current_user):
 # --- NEW: Route 2 - Get the full details of a single template ---
 
 @project_templates_bp.route('/project-templates/<int:template_id>', methods=['GET'])
+@query_budget(8)
+@read_replica
 @token_required
 def get_project_template_details(current_user, template_id):
     """
@@ -43,40 +52,98 @@ def get_project_template_details(current_user, template_id):
     single project template by its ID.
     """
     try:
+        catalog = template_catalog()
+        template_details = catalog.get(('details', template_id)) if catalog else None
+        if template_details is not None:
+            return jsonify(template_details), 200
+
         # Fetch the specific project template by its ID
         template = ProjectTemplate.query.get(template_id)
 
         if not template:
             return jsonify({'message': 'Project template not found'}), 404
 
-        # Helper function to recursively build the JSON for a task and its children
-        # This is the same powerful function from your original route
-        def _build_task_template_json(task_template):
-            children_json = [_build_task_template_json(child) for child in task_template.children]
-            dependency_ids = [dep.id for dep in task_template.dependencies]
-
-            return {
-                'id': task_template.id,
-                'name': task_template.name,
-                'duration_seconds': task_template.duration,
-                'parent_id': task_template.parent_id,
-                'dependencyIds': dependency_ids,
-                'children': children_json
-            }
-
-        # Build the JSON for the template's top-level tasks
-        top_level_tasks = [_build_task_template_json(task) for task in template.tasks]
-        
-        # Assemble the final data for the single template
-        template_details = {
-            'id': template.id,
-            'name': template.name,
-            'description': template.description,
-            'tasks': top_level_tasks # The full, nested task tree
-        }
+        # Load every task of the template and all of their dependencies up front (two queries),
+        # instead of lazily loading children and dependencies node by node
+        task_templates = TaskTemplate.query.filter_by(project_template_id=template.id).order_by(TaskTemplate.id).all()
+        dependency_rows = db.session.query(
+            task_template_dependencies.c.task_template_id, task_template_dependencies.c.depends_on_task_template_id
+        ).join(TaskTemplate, TaskTemplate.id == task_template_dependencies.c.task_template_id).filter(
+            TaskTemplate.project_template_id == template.id
+        ).all()
+        template_details = _template_details_json(template, task_templates, dependency_rows)
+        if catalog:
+            catalog.put(('details', template_id), template_details)
 
         return jsonify(template_details), 200
 
     except Exception as e:
         print(f"Error fetching project template details for ID {template_id}: {e}")
-        return jsonify({'message': 'Error fetching project template details', 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': 'Error fetching project template details', 'error': str(e)}), 500
+
+
+def _template_list_json(templates):
+    return [{
+        'id': template.id,
+        'name': template.name,
+        'description': template.description
+    } for template in templates]
+
+
+def _template_details_json(template, task_templates, dependency_rows):
+    """Template JSON with its nested task tree, from all of its task templates and dependency rows."""
+    children_by_parent = {}
+    for task_template in task_templates:
+        children_by_parent.setdefault(task_template.parent_id, []).append(task_template)
+    dependency_map = {}
+    for task_template_id, depends_on_id in dependency_rows:
+        dependency_map.setdefault(task_template_id, []).append(depends_on_id)
+
+    # Helper function to recursively build the JSON for a task and its children
+    # This is the same powerful function from your original route
+    def _build_task_template_json(task_template):
+        children_json = [_build_task_template_json(child) for child in children_by_parent.get(task_template.id, [])]
+        dependency_ids = dependency_map.get(task_template.id, [])
+
+        return {
+            'id': task_template.id,
+            'name': task_template.name,
+            'duration_seconds': task_template.duration,
+            'parent_id': task_template.parent_id,
+            'dependencyIds': dependency_ids,
+            'children': children_json
+        }
+
+    # Build the JSON for the template's top-level tasks
+    top_level_tasks = [_build_task_template_json(task) for task in children_by_parent.get(None, [])]
+
+    # Assemble the final data for the single template
+    return {
+        'id': template.id,
+        'name': template.name,
+        'description': template.description,
+        'tasks': top_level_tasks # The full, nested task tree
+    }
+
+
+def warm_template_catalog():
+    """Loads the template list and every template's details into the catalog with three queries."""
+    catalog = template_catalog()
+    if catalog is None:
+        return 0
+    templates = ProjectTemplate.query.order_by(ProjectTemplate.id).all()
+    task_templates_by_template = {}
+    for task_template in TaskTemplate.query.order_by(TaskTemplate.id):
+        task_templates_by_template.setdefault(task_template.project_template_id, []).append(task_template)
+    dependency_rows_by_template = {}
+    for template_id, task_template_id, depends_on_id in db.session.query(
+        TaskTemplate.project_template_id, task_template_dependencies.c.task_template_id,
+        task_template_dependencies.c.depends_on_task_template_id
+    ).join(TaskTemplate, TaskTemplate.id == task_template_dependencies.c.task_template_id):
+        dependency_rows_by_template.setdefault(template_id, []).append((task_template_id, depends_on_id))
+
+    catalog.put('list', _template_list_json(templates))
+    for template in templates:
+        catalog.put(('details', template.id), _template_details_json(
+            template, task_templates_by_template.get(template.id, []), dependency_rows_by_template.get(template.id, [])))
+    return len(templates)
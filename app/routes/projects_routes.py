@@ -1,12 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from ..utils import token_required
 from .. import db
-from ..models import Project, Account, User, Task, TaskStatusEnum
+from ..models import Project, Account, User, Task, TaskStatusEnum, task_dependencies
+from ..change_log import record_changes, get_changes_since, current_seq
+from ..single_flight import SingleFlight
+from ..query_budget import query_budget
+from ..read_replicas import read_replica
+from ..sharding import use_account, use_project, AccountReadOnly
 import datetime
 from collections import deque
 
 projects_bp = Blueprint('projects_bp', __name__)
 
+# Coalesces concurrent identical project reads within this worker
+project_reads = SingleFlight('project_reads')
+
 @projects_bp.route('/projects', methods=['POST'])
 @token_required
 def create_project(current_user):
@@ -36,6 +44,7 @@ def create_project(current_user):
     user_accounts = [ua.account_id for ua in current_user.accounts]
     if account_id not in user_accounts:
         return jsonify({'message': 'User not authorized for this account'}), 403
+    use_account(account_id)
 
     start_date = None
     if start_date_str:
@@ -66,6 +75,7 @@ def create_project(current_user):
 
         # Dictionary to map frontend UUIDs to backend integer IDs
         if not tasks_data:
+            record_changes(new_project.id, account_id=new_project.account_id)
             db.session.commit()
             return jsonify({ 'message': 'Project created with no tasks', 'project_id': new_project.id }), 201
 
@@ -91,6 +101,7 @@ def create_project(current_user):
         db.session.flush()
 
         # Pass 2: Link parents and dependencies now that all tasks exist in the session.
+        new_edges = [] # (task_id, depends_on_task_id) pairs, for the change log
         for task_data in tasks_data:
             frontend_id = task_data.get('frontend_id')
             task_to_update = frontend_id_map.get(frontend_id)
@@ -110,7 +121,14 @@ def create_project(current_user):
                 prerequisite_task = frontend_id_map.get(str(dep_frontend_id))
                 if prerequisite_task:
                     task_to_update.dependencies.append(prerequisite_task)
+                    new_edges.append((task_to_update.id, prerequisite_task.id))
         
+        record_changes(
+            new_project.id,
+            task_upserts=[task.id for task in frontend_id_map.values()],
+            edge_upserts=new_edges,
+            account_id=new_project.account_id
+        )
         db.session.commit()
 
         return jsonify({
@@ -118,12 +136,18 @@ def create_project(current_user):
             'project': { 'id': new_project.id, 'name': new_project.name }
         }), 201
         
+    except AccountReadOnly:
+        # Answered with a retryable 503 by the handler from init_sharding
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         print(f"Error during project creation: {e}")
         return jsonify({'message': 'Error creating project', 'error': str(e)}), 500
     
 @projects_bp.route('/projects', methods=['GET'])
+@query_budget(5)
+@read_replica
 @token_required
 def get_projects(current_user):
     """
@@ -144,21 +168,12 @@ def get_projects(current_user):
     user_account_ids = [ua.account_id for ua in current_user.accounts]
     if account_id not in user_account_ids:
         return jsonify({'message': 'User not authorized for this account'}), 403
+    use_account(account_id)
 
     try:
         projects = Project.query.filter_by(account_id=account_id).all()
 
-        projects_data = [{
-            'id': project.id,
-            'name': project.name,
-            'description': project.description,
-            'start_date': project.start_date.isoformat() if project.start_date else None,
-            'end_date': project.end_date.isoformat() if project.end_date else None,
-            'account_id': project.account_id,
-            'created_by': project.created_by,
-            'created_at': project.created_at.isoformat(),
-            'updated_at': project.updated_at.isoformat()
-        } for project in projects]
+        projects_data = [_project_summary_json(project) for project in projects]
 
         return jsonify(projects_data), 200
 
@@ -172,7 +187,11 @@ def update_project(current_user, project_id):
     """
     Updates an existing project by correctly deleting and recreating tasks to
     respect foreign key constraints.
+    Tasks are matched by frontend id only within one request, so every update records a delete
+    of each old task and an upsert of each new one: the change log delta of an edit is the size
+    of the whole project, not of what the user changed.
     """
+    use_project(project_id)
     project = Project.query.get(project_id)
     if not project:
         return jsonify({'message': 'Project not found'}), 404
@@ -193,6 +212,10 @@ def update_project(current_user, project_id):
         
         # 2. Delete existing tasks correctly (from previous fix)
         existing_tasks = Task.query.filter_by(project_id=project_id).all()
+        deleted_task_ids = [task.id for task in existing_tasks]
+        deleted_edges = db.session.query(
+            task_dependencies.c.task_id, task_dependencies.c.depends_on_task_id
+        ).filter(task_dependencies.c.task_id.in_(deleted_task_ids)).all() if deleted_task_ids else []
         tasks_to_delete = list(existing_tasks)
         while tasks_to_delete:
             parent_ids = {task.parent_id for task in tasks_to_delete if task.parent_id is not None}
@@ -227,6 +250,7 @@ def update_project(current_user, project_id):
         db.session.flush() # Assign database IDs to all newly created tasks
 
         # Second Pass: Link parents and dependencies now that all tasks exist
+        new_edges = [] # (task_id, depends_on_task_id) pairs, for the change log
         for task_data in tasks_data:
             frontend_id = task_data.get('frontend_id')
             task_to_update = frontend_id_map.get(frontend_id)
@@ -245,22 +269,40 @@ def update_project(current_user, project_id):
                 prerequisite_task = frontend_id_map.get(str(dep_frontend_id))
                 if prerequisite_task:
                     task_to_update.dependencies.append(prerequisite_task)
+                    new_edges.append((task_to_update.id, prerequisite_task.id))
         
+        seq = record_changes(
+            project.id,
+            task_upserts=[task.id for task in frontend_id_map.values()],
+            task_deletes=deleted_task_ids,
+            edge_upserts=new_edges,
+            edge_deletes=[tuple(edge) for edge in deleted_edges],
+            account_id=project.account_id
+        )
         db.session.commit()
-        return jsonify({'message': 'Project updated successfully'}), 200
+        return jsonify({'message': 'Project updated successfully', 'seq': seq}), 200
 
+    except AccountReadOnly:
+        # Answered with a retryable 503 by the handler from init_sharding
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         print(f"Error updating project: {e}")
         return jsonify({'message': 'An internal error occurred while updating the project', 'error': str(e)}), 500
     
 @projects_bp.route('/projects/<int:project_id>', methods=['GET'])
+@query_budget(16)
+@read_replica
 @token_required
 def get_project(current_user, project_id):
     """
     Retrieves a single project by its ID.
+    Pass ?lod=<day|week|month|quarter|year> (and optionally &lod_depth=N) to get an
+    aggregated level-of-detail overview instead of the full task list.
     """
     try:
+        use_project(project_id)
         project = Project.query.get(project_id)
 
         if not project:
@@ -271,55 +313,291 @@ def get_project(current_user, project_id):
         if project.account_id not in user_account_ids:
             return jsonify({'message': 'User not authorized to view this project'}), 403
 
-        def _build_task_json(task):
-            task_json = {
-                'id': task.id,
-                'name': task.name,
-                'description': task.description,
-                'status': task.status.name,
-                'startDate': task.start_date.isoformat() if task.start_date else None,
-                'duration': task.duration, # Duration in seconds
-                'projectId': task.project_id,
-                'parentId': task.parent_id,
-                'assignedTo': task.assigned_to,
-                'dependencyIds': [dep.id for dep in task.dependencies],
-                'children': [], # Will be populated recursively
-            }
-            return task_json
-
-        # Fetch all tasks for the project
-        all_tasks = Task.query.filter_by(project_id=project_id).all()
-        
-        # Create a map for quick lookup and to store the JSON representation
-        task_map = {task.id: _build_task_json(task) for task in all_tasks}
-
-        # Build the hierarchy
-        for task in all_tasks:
-            if task.parent_id and task.parent_id in task_map:
-                task_map[task.parent_id]['children'].append(task_map[task.id])
-            # If a task has no parent_id, it's a top-level task.
-            # We don't need to explicitly add it to a top-level list here,
-            # as the frontend's _buildTaskHierarchy will handle it.
-            # However, we need to ensure all tasks are included in the 'tasks' list.
-
-        # Flatten the task_map values into a list for the frontend
-        # The frontend's _buildTaskHierarchy will reconstruct the tree
-        tasks_list_for_frontend = list(task_map.values())
-
-        project_data = {
-            'id': project.id,
-            'name': project.name,
-            'description': project.description,
-            'start_date': project.start_date.isoformat() if project.start_date else None,
-            'end_date': project.end_date.isoformat() if project.end_date else None,
-            'account_id': project.account_id,
-            'created_by': project.created_by,
-            'created_at': project.created_at.isoformat(),
-            'updated_at': project.updated_at.isoformat(),
-            'tasks': tasks_list_for_frontend # Include the tasks here
-        }
-        return jsonify(project_data), 200
+        # Identical concurrent reads of the same project version share one computation
+        # and its encoded bytes. The change sequence is bumped by every task/edge write.
+        key = ('project', project.id, current_seq(project.id), request.query_string)
+        body, status = project_reads.do(key, lambda: _render_project(project, request.args))
+        return current_app.response_class(body, status=status, mimetype='application/json')
 
     except Exception as e:
         print(f"Error fetching project by ID: {e}")
         return jsonify({'message': 'Error fetching project', 'error': str(e)}), 500
+
+
+def _encode_json(data):
+    return current_app.json.dumps(data).encode('utf-8')
+
+
+def _render_project(project, args):
+    """
+    Builds the encoded GET /projects/<id> payload for the given query arguments.
+    Returns (body_bytes, status_code) so the result can be shared between coalesced requests.
+    """
+    lod_granularity = args.get('lod')
+    if lod_granularity:
+        from ..gantt_lod import build_lod_overview # numpy-backed; imported on first use
+        try:
+            lod_depth = int(args.get('lod_depth', 1))
+            if lod_depth < 0:
+                return _encode_json({'message': 'lod_depth must be at least 0'}), 400
+            overview = build_lod_overview(
+                project.id,
+                granularity=lod_granularity.lower(),
+                depth=lod_depth,
+                max_buckets=current_app.config.get('LOD_MAX_BUCKETS', 2000)
+            )
+        except ValueError as e:
+            return _encode_json({'message': str(e)}), 400
+        overview['id'] = project.id
+        overview['name'] = project.name
+        return _encode_json(overview), 200
+
+    depth_str = args.get('depth')
+    if depth_str:
+        try:
+            depth = int(depth_str)
+        except ValueError:
+            return _encode_json({'message': 'Invalid depth format. Must be an integer.'}), 400
+        if depth < 1:
+            return _encode_json({'message': 'depth must be at least 1'}), 400
+        # Only the top `depth` levels; deeper nodes are fetched on demand via
+        # /projects/<id>/tasks/<task_id>/children.
+        tasks_list_for_frontend = _load_task_levels(project.id, None, depth)
+    else:
+        # Fetch all tasks for the project, and all of their dependencies with one more query
+        all_tasks = Task.query.filter_by(project_id=project.id).all()
+        dependency_map = _load_project_dependency_map(project.id)
+        tasks_list_for_frontend = _task_list_json(all_tasks, dependency_map)
+
+    return _encode_project(project, tasks_list_for_frontend), 200
+
+
+def _encode_project(project, tasks_list):
+    """The encoded full project payload; the async twin of get_project builds its body here too."""
+    project_data = _project_summary_json(project)
+    project_data['tasks'] = tasks_list # Include the tasks here
+    return _encode_json(project_data)
+
+
+def _project_summary_json(project):
+    return {
+        'id': project.id,
+        'name': project.name,
+        'description': project.description,
+        'start_date': project.start_date.isoformat() if project.start_date else None,
+        'end_date': project.end_date.isoformat() if project.end_date else None,
+        'account_id': project.account_id,
+        'created_by': project.created_by,
+        'created_at': project.created_at.isoformat(),
+        'updated_at': project.updated_at.isoformat()
+    }
+
+
+def _task_list_json(all_tasks, dependency_map):
+    """Flat list of task JSON with children filled in, from all tasks of a project and their dependency map."""
+    # Create a map for quick lookup and to store the JSON representation
+    task_map = {task.id: _build_task_json(task, dependency_map.get(task.id, [])) for task in all_tasks}
+
+    # Build the hierarchy
+    for task in all_tasks:
+        if task.parent_id and task.parent_id in task_map:
+            task_map[task.parent_id]['children'].append(task_map[task.id])
+        # If a task has no parent_id, it's a top-level task.
+        # We don't need to explicitly add it to a top-level list here,
+        # as the frontend's _buildTaskHierarchy will handle it.
+        # However, we need to ensure all tasks are included in the 'tasks' list.
+
+    for task_json in task_map.values():
+        task_json['childCount'] = len(task_json['children'])
+        task_json['hasChildren'] = task_json['childCount'] > 0
+
+    # Flatten the task_map values into a list for the frontend
+    # The frontend's _buildTaskHierarchy will reconstruct the tree
+    return list(task_map.values())
+
+
+def _build_task_json(task, dependency_ids=None):
+    task_json = {
+        'id': task.id,
+        'name': task.name,
+        'description': task.description,
+        'status': task.status.name,
+        'startDate': task.start_date.isoformat() if task.start_date else None,
+        'duration': task.duration, # Duration in seconds
+        'projectId': task.project_id,
+        'parentId': task.parent_id,
+        'assignedTo': task.assigned_to,
+        'dependencyIds': dependency_ids if dependency_ids is not None else [dep.id for dep in task.dependencies],
+        'children': [], # Will be populated recursively
+    }
+    return task_json
+
+
+def _load_dependency_map(task_ids):
+    """Maps each task id to the ids of the tasks it depends on, with a single query."""
+    dependency_map = {task_id: [] for task_id in task_ids}
+    if not task_ids:
+        return dependency_map
+    dependency_rows = db.session.query(
+        task_dependencies.c.task_id, task_dependencies.c.depends_on_task_id
+    ).filter(task_dependencies.c.task_id.in_(task_ids)).all()
+    for task_id, depends_on_task_id in dependency_rows:
+        dependency_map[task_id].append(depends_on_task_id)
+    return dependency_map
+
+
+def _load_project_dependency_map(project_id):
+    """Maps task id -> ids it depends on for every task of a project, joining instead of a large IN list."""
+    dependency_rows = db.session.query(
+        task_dependencies.c.task_id, task_dependencies.c.depends_on_task_id
+    ).join(Task, Task.id == task_dependencies.c.task_id).filter(Task.project_id == project_id).all()
+    dependency_map = {}
+    for task_id, depends_on_task_id in dependency_rows:
+        dependency_map.setdefault(task_id, []).append(depends_on_task_id)
+    return dependency_map
+
+
+def _load_task_levels(project_id, parent_id, depth):
+    """
+    Loads `depth` levels of the task hierarchy below parent_id (None for the top level)
+    with one query per level. Every node carries childCount/hasChildren, taken from a
+    grouped COUNT so the children of the deepest level are never loaded.
+    Returns the flat list of loaded task dictionaries, each with its loaded children nested.
+    """
+    loaded = []
+    level_parent_ids = [parent_id]
+    for level in range(depth):
+        if level == 0 and parent_id is None:
+            level_tasks = Task.query.filter_by(project_id=project_id, parent_id=None).all()
+        else:
+            level_tasks = Task.query.filter(
+                Task.project_id == project_id,
+                Task.parent_id.in_(level_parent_ids)
+            ).all()
+        if not level_tasks:
+            break
+        loaded.extend(level_tasks)
+        level_parent_ids = [task.id for task in level_tasks]
+
+    if not loaded:
+        return []
+
+    loaded_ids = [task.id for task in loaded]
+    child_counts = dict(
+        db.session.query(Task.parent_id, db.func.count(Task.id))
+        .filter(Task.parent_id.in_(loaded_ids))
+        .group_by(Task.parent_id)
+        .all()
+    )
+    dependency_map = _load_dependency_map(loaded_ids)
+
+    task_map = {}
+    for task in loaded:
+        task_json = _build_task_json(task, dependency_map[task.id])
+        task_json['childCount'] = child_counts.get(task.id, 0)
+        task_json['hasChildren'] = task_json['childCount'] > 0
+        task_map[task.id] = task_json
+        if task.parent_id in task_map:
+            task_map[task.parent_id]['children'].append(task_json)
+    return list(task_map.values())
+
+
+@projects_bp.route('/projects/<int:project_id>/tasks/<int:task_id>/children', methods=['GET'])
+@query_budget(16)
+@token_required
+def get_task_children(current_user, project_id, task_id):
+    """
+    Retrieves the children of a single task, for expanding the task tree on demand.
+    Accepts an optional ?depth=N (default 1) to load N levels below the task.
+    """
+    try:
+        use_project(project_id)
+        project = Project.query.get(project_id)
+        if not project:
+            return jsonify({'message': 'Project not found'}), 404
+
+        user_account_ids = [ua.account_id for ua in current_user.accounts]
+        if project.account_id not in user_account_ids:
+            return jsonify({'message': 'User not authorized to view this project'}), 403
+
+        task = Task.query.filter_by(id=task_id, project_id=project_id).first()
+        if not task:
+            return jsonify({'message': 'Task not found'}), 404
+
+        try:
+            depth = int(request.args.get('depth', 1))
+        except ValueError:
+            return jsonify({'message': 'Invalid depth format. Must be an integer.'}), 400
+        if depth < 1:
+            return jsonify({'message': 'depth must be at least 1'}), 400
+
+        return jsonify({
+            'taskId': task.id,
+            'tasks': _load_task_levels(project_id, task.id, depth)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching children for task {task_id}: {e}")
+        return jsonify({'message': 'Error fetching task children', 'error': str(e)}), 500
+
+
+@projects_bp.route('/projects/<int:project_id>/changes', methods=['GET'])
+@token_required
+def get_project_changes(current_user, project_id):
+    """
+    Returns the tasks and dependency edges changed after change sequence `since`.
+    Clients store the returned 'seq' and pass it as ?since= on their next sync.
+    If the log has been compacted past `since`, 'full_resync' is true and the
+    full task list is returned instead.
+    """
+    try:
+        use_project(project_id)
+        project = Project.query.get(project_id)
+        if not project:
+            return jsonify({'message': 'Project not found'}), 404
+
+        user_account_ids = [ua.account_id for ua in current_user.accounts]
+        if project.account_id not in user_account_ids:
+            return jsonify({'message': 'User not authorized to view this project'}), 403
+
+        try:
+            since = int(request.args.get('since', 0))
+        except ValueError:
+            return jsonify({'message': 'Invalid since format. Must be an integer.'}), 400
+
+        changes = get_changes_since(project_id, since)
+        if changes['full_resync']:
+            all_tasks = Task.query.filter_by(project_id=project_id).all()
+            dependency_map = _load_project_dependency_map(project.id)
+            return jsonify({
+                'project_id': project_id,
+                'since': since,
+                'seq': changes['seq'],
+                'full_resync': True,
+                'tasks': [_build_task_json(task, dependency_map.get(task.id, [])) for task in all_tasks]
+            }), 200
+
+        upserted_tasks = Task.query.filter(
+            Task.project_id == project_id,
+            Task.id.in_(changes['task_upserts'])
+        ).all() if changes['task_upserts'] else []
+        dependency_map = _load_dependency_map([task.id for task in upserted_tasks])
+
+        return jsonify({
+            'project_id': project_id,
+            'since': since,
+            'seq': changes['seq'],
+            'full_resync': False,
+            'tasks': {
+                'upserted': [_build_task_json(task, dependency_map[task.id]) for task in upserted_tasks],
+                'deleted': changes['task_deletes']
+            },
+            'edges': {
+                'upserted': [{'taskId': t, 'dependsOnTaskId': d} for t, d in changes['edge_upserts']],
+                'deleted': [{'taskId': t, 'dependsOnTaskId': d} for t, d in changes['edge_deletes']]
+            }
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching changes for project {project_id}: {e}")
+        return jsonify({'message': 'Error fetching project changes', 'error': str(e)}), 500
@@ -1,16 +1,31 @@
+import functools
 from flask import Blueprint, jsonify, request
 from ..utils import token_required
-from ..rules_engine import get_dashboard_content, get_test_content, submit_test, completed_learning, update_next_recommended_lesson
 from .. import db
 
 rules_bp = Blueprint('rules_bp', __name__)
 
-RULES = {
-    'dashboard_content': get_dashboard_content,
-    'test_content': get_test_content,
-    'submit_test': submit_test,
-    'completed_learning': completed_learning,
-}
+
+@functools.lru_cache(maxsize=None)
+def _rules():
+    """
+    Rule name -> callable. Built on first use rather than at blueprint registration: the rules
+    engine pulls in numpy and compiles the declarative rules when it is imported.
+    """
+    from ..rules_engine import get_dashboard_content, get_test_content, submit_test, completed_learning, COMPILED_RULES
+    rules = {
+        'dashboard_content': get_dashboard_content,
+        'test_content': get_test_content,
+        'submit_test': submit_test,
+        'completed_learning': completed_learning,
+    }
+    # Declarative rules that commit their own changes can be triggered directly by name
+    # (POST /rules/<rule_name>, no body); hand-written rules above take precedence.
+    for rule_name, compiled_rule in COMPILED_RULES.items():
+        if compiled_rule.commit:
+            rules.setdefault(rule_name, compiled_rule)
+    return rules
+
 
 @rules_bp.route('/rules/<rule_name>', methods=['GET', 'POST'])
 @token_required
@@ -18,12 +33,17 @@ def handle_rule(current_user, rule_name):
     """
     Generic route to execute a rule from the rules engine.
     """
-    rule = RULES.get(rule_name)
+    from ..rules_engine import question_to_dict, COMPILED_RULES
+    rule = _rules().get(rule_name)
     if not rule:
         return jsonify({'message': 'Rule not found.'}), 404
 
+    if request.method == 'GET' and (rule_name in ('submit_test', 'completed_learning') or rule_name in COMPILED_RULES):
+        # These rules change the user's progress and take the session; they only run on POST
+        return jsonify({'message': f'Rule {rule_name} must be triggered with POST.'}), 405
+
     if request.method == 'POST':
-        if rule_name == 'completed_learning':
+        if rule_name == 'completed_learning' or rule_name in COMPILED_RULES:
             result, status_code = rule(current_user, db)
         else:
             data = request.get_json()
@@ -48,6 +68,7 @@ def handle_rule(current_user, rule_name):
 @rules_bp.route('/rules/update_next_lesson', methods=['POST'])
 @token_required
 def update_next_lesson_route(current_user):
+    from ..rules_engine import update_next_recommended_lesson
     data = request.get_json()
     learning_content_id = data.get('learning_content_id')
 
@@ -0,0 +1,246 @@
+import operator
+from functools import lru_cache
+from flask import current_app
+from .models import *
+
+_OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': lambda value, operand: value is not None and value > operand,
+    'gte': lambda value, operand: value is not None and value >= operand,
+    'lt': lambda value, operand: value is not None and value < operand,
+    'lte': lambda value, operand: value is not None and value <= operand,
+    'in': lambda value, operand: value in operand,
+    'not_in': lambda value, operand: value not in operand,
+    'is_null': lambda value, operand: (value is None) == bool(operand),
+}
+
+
+class RuleDefinitionError(ValueError):
+    pass
+
+
+def _compile_getter(field):
+    """Returns getter(user, context) for a 'user.x' or context field."""
+    if field.startswith('user.'):
+        attribute = field[len('user.'):]
+        return lambda user, context: getattr(user, attribute, None)
+    return lambda user, context: context.get(field)
+
+
+def _compile_condition(field, spec, field_index):
+    if isinstance(spec, dict):
+        if len(spec) != 1:
+            raise RuleDefinitionError(f"Condition on '{field}' must have exactly one operator.")
+        op_name, operand = next(iter(spec.items()))
+    else:
+        op_name, operand = 'eq', spec
+    compare = _OPERATORS.get(op_name)
+    if compare is None:
+        raise RuleDefinitionError(f"Unknown operator '{op_name}' on '{field}'.")
+    if op_name in ('in', 'not_in'):
+        operand = frozenset(operand)
+    position = field_index[field]
+    return lambda snapshot: compare(snapshot[position], operand)
+
+
+def _compile_predicate(when, field_index):
+    conditions = [_compile_condition(field, spec, field_index) for field, spec in when.items()]
+    if not conditions:
+        return lambda snapshot: True
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda snapshot: all(condition(snapshot) for condition in conditions)
+
+
+# --- Actions: each compiles a spec into a closure(user, context, session) ---
+
+def _action_set(spec, module_path):
+    values = list(spec['values'].items())
+
+    def run(user, context, session):
+        for attribute, value in values:
+            setattr(user, attribute, value)
+    return run
+
+
+def _action_set_from_context(spec, module_path):
+    values = list(spec['values'].items())
+
+    def run(user, context, session):
+        for attribute, context_field in values:
+            setattr(user, attribute, context.get(context_field))
+    return run
+
+
+def _action_record_completed_module(spec, module_path):
+    def run(user, context, session):
+        session.add(UserCompletedModules(
+            user_id=user.id,
+            module_id=user.current_learning_focus_module_id,
+            problem_category_slug=user.current_problem_category_slug
+        ))
+    return run
+
+
+def _action_advance_module(spec, module_path):
+    next_module = {module_id: next_id for module_id, next_id in zip(module_path, module_path[1:])}
+
+    def run(user, context, session):
+        current_module = user.current_learning_focus_module_id
+        # Modules outside the declared path keep the historical sequential-id behaviour.
+        user.current_learning_focus_module_id = next_module.get(current_module, current_module + 1)
+    return run
+
+
+ACTIONS = {
+    'set': _action_set,
+    'set_from_context': _action_set_from_context,
+    'record_completed_module': _action_record_completed_module,
+    'advance_module': _action_advance_module,
+}
+
+
+class CompiledTransition:
+    def __init__(self, name, predicate, actions, message, error_message):
+        self.name = name
+        self.predicate = predicate
+        self.actions = actions
+        self.message = message
+        self.error_message = error_message
+
+    def apply(self, user, context, session):
+        for action in self.actions:
+            action(user, context, session)
+
+
+class CompiledRule:
+    """
+    A rule definition compiled into predicate and action closures.
+    Decisions depend only on the snapshot of the fields the rule reads, so they are memoized
+    per snapshot; evaluating many users with the same snapshot costs one decision.
+    """
+
+    def __init__(self, name, definition, module_path, cache_size=4096):
+        self.name = name
+        self.commit = definition.get('commit', False)
+        self.default_message = definition.get('default_message', 'No change.')
+
+        fields = []
+        for transition in definition['transitions']:
+            for field in transition.get('when', {}):
+                if field not in fields:
+                    fields.append(field)
+        self.fields = tuple(fields)
+        self.batch = definition.get('batch', False)
+        if self.batch and any(not field.startswith('user.') for field in fields):
+            raise RuleDefinitionError(f"Rule '{name}' reads context fields, which a batch run cannot supply.")
+        field_index = {field: position for position, field in enumerate(fields)}
+        self._getters = [_compile_getter(field) for field in fields]
+
+        self.transitions = []
+        for transition in definition['transitions']:
+            actions = []
+            for action_spec in transition.get('then', []):
+                factory = ACTIONS.get(action_spec.get('action'))
+                if factory is None:
+                    raise RuleDefinitionError(f"Unknown action '{action_spec.get('action')}' in rule '{name}'.")
+                actions.append(factory(action_spec, module_path))
+            self.transitions.append(CompiledTransition(
+                transition['name'],
+                _compile_predicate(transition.get('when', {}), field_index),
+                actions,
+                transition.get('message', 'Rule applied successfully.'),
+                transition.get('error_message', 'Failed to apply rule.'),
+            ))
+
+        transitions = self.transitions
+
+        @lru_cache(maxsize=cache_size)
+        def decide_snapshot(snapshot):
+            for position, transition in enumerate(transitions):
+                if transition.predicate(snapshot):
+                    return position
+            return None
+        self._decide_snapshot = decide_snapshot
+
+    def snapshot(self, user, context=None):
+        context = context or {}
+        return tuple(getter(user, context) for getter in self._getters)
+
+    def decide(self, user, context=None):
+        """Returns the first matching CompiledTransition for the user, or None."""
+        snapshot = self.snapshot(user, context)
+        try:
+            position = self._decide_snapshot(snapshot)
+        except TypeError:
+            # Unhashable field value; evaluate without the memo.
+            position = self._decide_snapshot.__wrapped__(snapshot)
+        return self.transitions[position] if position is not None else None
+
+    def __call__(self, user, db, context=None):
+        """
+        Evaluates and applies the rule for one user. Committing rules return (result, status)
+        like the hand-written rules they replace; non-committing rules return the applied
+        transition name (or None) and leave the commit to the caller.
+        """
+        context = context or {}
+        transition = self.decide(user, context)
+        if transition is None:
+            return ({'message': self.default_message}, 200) if self.commit else None
+
+        transition.apply(user, context, db.session)
+        if not self.commit:
+            return transition.name
+
+        try:
+            db.session.commit()
+            current_app.logger.info("Rule %s applied transition %s for user %s.", self.name, transition.name, user.email,
+                                    extra={'log_key': 'rules.transition_applied'})
+            return {'message': transition.message}, 200
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error applying rule {self.name} ({transition.name}) for user {user.email}: {e}")
+            return {'message': transition.error_message, 'error': str(e)}, 500
+
+    def evaluate_batch(self, users, contexts=None):
+        """
+        Decides the rule for many users at once without applying it. Users are grouped by
+        snapshot so each distinct snapshot is decided exactly once.
+        :return: list of transition names (None where no transition matches), in user order
+        """
+        decisions = {}
+        names = []
+        for index, user in enumerate(users):
+            context = contexts[index] if contexts else {}
+            snapshot = self.snapshot(user, context)
+            try:
+                if snapshot not in decisions:
+                    transition = self.decide(user, context)
+                    decisions[snapshot] = transition.name if transition else None
+                names.append(decisions[snapshot])
+            except TypeError:
+                # Unhashable field value; decide this user on its own, as decide() does.
+                transition = self.decide(user, context)
+                names.append(transition.name if transition else None)
+        return names
+
+    def apply_batch(self, users, db, contexts=None):
+        """
+        Applies the rule to many users in the current session without committing.
+        :return: dict of transition name -> number of users it was applied to
+        """
+        applied = {}
+        by_name = {transition.name: transition for transition in self.transitions}
+        for index, (user, name) in enumerate(zip(users, self.evaluate_batch(users, contexts))):
+            if name is None:
+                continue
+            by_name[name].apply(user, contexts[index] if contexts else {}, db.session)
+            applied[name] = applied.get(name, 0) + 1
+        return applied
+
+
+def compile_rules(definitions, module_path=()):
+    """Compiles every rule definition once; raises RuleDefinitionError on malformed definitions."""
+    module_path = list(module_path)
+    return {name: CompiledRule(name, definition, module_path) for name, definition in definitions.items()}
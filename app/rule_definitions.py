@@ -0,0 +1,78 @@
+# Declarative learning-progression rules, compiled once at import by rule_compiler.compile_rules.
+#
+# Each rule is a list of transitions evaluated in order; the first whose 'when' matches runs its
+# 'then' actions. 'when' maps a field to a literal (equality) or to {operator: operand}, with
+# operators eq, ne, gt, gte, lt, lte, in, not_in and is_null. Fields prefixed with 'user.' are
+# read from the user; any other field is read from the context passed by the caller.
+#
+# 'batch': True marks a rule that run_rules_batch.py may apply to every user at once. Rules that
+# react to something the user just did (finishing content, submitting a test) must not be batched,
+# and batch rules may only read 'user.' fields.
+#
+# Actions:
+#   set                      - assign literal values to user attributes
+#   set_from_context         - assign user attributes from context fields
+#   record_completed_module  - add a UserCompletedModules row for the current module/category
+#   advance_module           - move to the next module of MODULE_PATH (or the next id if unlisted)
+
+# Ordered learning path of module ids. Modules not listed here advance to module_id + 1.
+MODULE_PATH = []
+
+RULE_DEFINITIONS = {
+    'completed_learning': {
+        'description': 'Progress the user after they finish a piece of learning content.',
+        'commit': True,
+        'batch': False, # Only meaningful right after the user finished a piece of content
+        'transitions': [
+            {
+                'name': 'pt_to_psq',
+                'when': {'user.current_problem_category_slug': 'PT'},
+                'then': [
+                    {'action': 'record_completed_module'},
+                    {'action': 'set', 'values': {
+                        'current_problem_category_slug': 'PSQ',
+                        # Clear the recommended lesson after completing learning
+                        'next_recommended_lesson_id': None,
+                    }},
+                ],
+                'message': 'Problem category updated successfully.',
+                'error_message': 'Failed to update problem category slug.',
+            },
+            {
+                'name': 'psq_to_next_module',
+                'when': {'user.current_problem_category_slug': 'PSQ'},
+                'then': [
+                    {'action': 'record_completed_module'},
+                    {'action': 'advance_module'},
+                    {'action': 'set', 'values': {
+                        'current_problem_category_slug': 'PT',
+                        'next_recommended_lesson_id': None,
+                    }},
+                ],
+                'message': 'Problem category updated successfully.',
+                'error_message': 'Failed to update problem category slug.',
+            },
+        ],
+        'default_message': 'No change needed for problem category.',
+    },
+    'test_progression': {
+        'description': 'Progress the user after a graded practice test. Committed by submit_test.',
+        'commit': False,
+        'transitions': [
+            {
+                'name': 'pt_mastered',
+                'when': {'user.current_problem_category_slug': 'PT', 'score_percentage': {'gte': 100}},
+                'then': [
+                    {'action': 'set', 'values': {'current_problem_category_slug': 'PSQ'}},
+                ],
+            },
+            {
+                'name': 'pt_recommend_lesson',
+                'when': {'user.current_problem_category_slug': 'PT', 'first_content_id': {'gt': 0}},
+                'then': [
+                    {'action': 'set_from_context', 'values': {'next_recommended_lesson_id': 'first_content_id'}},
+                ],
+            },
+        ],
+    },
+}
@@ -1,21 +1,30 @@
 from .models import *
+from . import db
+from .question_pool import get_question_pool
+from .rule_compiler import compile_rules
+from .rule_definitions import RULE_DEFINITIONS, MODULE_PATH
 from datetime import datetime, timedelta
 from flask import current_app
-import boto3
+import numpy as np
 import os
 import random
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
+import threading
+import time
+from collections import OrderedDict
+
+# Declarative progression rules, compiled once at import (i.e. at blueprint registration)
+COMPILED_RULES = compile_rules(RULE_DEFINITIONS, MODULE_PATH)
 
 def get_dashboard_content(user):
     """
     Determines the content to display on the user's dashboard based on their progress.
     """
-    current_app.logger.info(f"Rules engine started for user: {user.email}")
+    current_app.logger.debug("Rules engine started for user %s", user.id)
 
     # Determine the problem category slug
     time_since_creation = datetime.utcnow() - user.created_at
     is_new_user = time_since_creation < timedelta(hours=1)
-    current_app.logger.info(f"User is new: {is_new_user}")
+    current_app.logger.debug("User is new: %s", is_new_user)
     # user.current_problem_category_slug is null or new user
     
     projects_data = []
@@ -28,27 +37,125 @@ def get_dashboard_content(user):
    
     return dashboard_data
 
+def _missed_question_ids(user):
+    """
+    Ids of the questions the user has answered incorrectly in earlier attempts, one entry per
+    miss. Repeats are intended: the spiral draw weights concepts by how often they were missed,
+    so this must not be made DISTINCT.
+    """
+    rows = db.session.query(UserTestAnswer.question_id).join(
+        UserTestAttempt, UserTestAnswer.user_test_attempt_id == UserTestAttempt.id
+    ).filter(
+        UserTestAttempt.user_id == user.id,
+        UserTestAnswer.is_correct == False
+    ).all()
+    return [row[0] for row in rows]
+
 def get_test_content(user, spiral=False):
-    current_app.logger.error("Not implemented fro this product.")
-    # Exclude 'correct_answer' from the response
-    return 
+    """
+    Selects the questions for the user's next practice test from the precomputed question pool.
+    Questions come from the user's current module and problem category. In spiral mode a share of
+    the test (SPIRAL_FRACTION) is drawn from concepts the user has missed before, weighted by how
+    often each concept was missed.
+    """
+    pool = get_question_pool()
+    rng = np.random.default_rng()
+    question_count = current_app.config.get('TEST_QUESTION_COUNT', 10)
+
+    base_rows = pool.rows_for(
+        module_id=user.current_learning_focus_module_id,
+        slug=user.current_problem_category_slug
+    )
+
+    spiral_ids = np.empty(0, dtype=np.int64)
+    if spiral:
+        missed_rows = pool.rows_of_ids(_missed_question_ids(user))
+        if len(missed_rows):
+            missed_concepts = pool.concept_ids[missed_rows]
+            missed_concepts = missed_concepts[missed_concepts >= 0]
+            candidate_rows = np.setdiff1d(pool.rows_for_concepts(missed_concepts), base_rows)
+            if len(candidate_rows):
+                concepts, miss_counts = np.unique(missed_concepts, return_counts=True)
+                candidate_concepts = pool.concept_ids[candidate_rows]
+                weights = miss_counts[np.searchsorted(concepts, candidate_concepts)]
+                spiral_count = int(round(question_count * current_app.config.get('SPIRAL_FRACTION', 0.3)))
+                spiral_ids = pool.sample(candidate_rows, spiral_count, weights=weights, rng=rng)
+
+    base_ids = pool.sample(base_rows, question_count - len(spiral_ids), rng=rng)
+    selected_ids = rng.permutation(np.concatenate([base_ids, spiral_ids])).tolist()
+    if not selected_ids:
+        return []
+
+    questions_by_id = {
+        question.id: question
+        for question in TestQuestion.query.filter(TestQuestion.id.in_(selected_ids)).all()
+    }
+    # Exclude 'correct_answer' from the response (see question_to_dict)
+    return [questions_by_id[question_id] for question_id in selected_ids if question_id in questions_by_id]
+
+def question_to_dict(question):
+    """Serializes a test question for the client, without its correct answer."""
+    return {
+        'id': question.id,
+        'question_text': question.question_text,
+        'wrong_answer_1': question.wrong_answer_1,
+        'wrong_answer_2': question.wrong_answer_2,
+        'wrong_answer_3': question.wrong_answer_3,
+        'wrong_answer_4': question.wrong_answer_4,
+        'modules_id': question.modules_id,
+        'concepts_id': question.concepts_id,
+        'problem_category_slug': question.problem_category_slug,
+    }
+
+# Process-wide S3 client. boto3 clients are thread-safe but expensive to build, so one is
+# created lazily per process (and again after a fork, since sockets must not be shared).
+# boto3 itself is imported on first use too: it is the slowest import in the app.
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+
+# object key -> (presigned url, unix time after which it must not be handed out), in LRU order
+_presigned_url_cache = OrderedDict()
+_presigned_url_cache_lock = threading.Lock()
+
+def _get_s3_client():
+   global _s3_client, _s3_client_pid
+   if _s3_client is None or _s3_client_pid != os.getpid():
+       import boto3
+       with _s3_client_lock:
+           if _s3_client is None or _s3_client_pid != os.getpid():
+               _s3_client = boto3.client('s3',
+                                         aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+                                         aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+                                         region_name=os.environ.get("S3_REGION"))
+               _s3_client_pid = os.getpid()
+   return _s3_client
 
 def _generate_presigned_s3_url(object_name, expiration=3600):
-   """Generate a pre-signed URL to share an S3 object."""
+   """
+   Generate a pre-signed URL to share an S3 object.
+   URLs are cached per bucket/key/expiration and reused until PRESIGNED_URL_SAFETY_MARGIN
+   seconds before they expire, so repeated recommendations cost a dictionary lookup.
+   """
    s3_bucket_name = os.environ.get("S3_BUCKET_NAME")
    if not s3_bucket_name:
        current_app.logger.error("S3_BUCKET_NAME environment variable not set.")
        return None
 
-   s3_client = boto3.client('s3',
-                            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-                            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-                            region_name=os.environ.get("S3_REGION"))
+   cache_key = (s3_bucket_name, object_name, expiration)
+   now = time.time()
+   with _presigned_url_cache_lock:
+       cached = _presigned_url_cache.get(cache_key)
+       if cached and cached[1] > now:
+           _presigned_url_cache.move_to_end(cache_key)
+           return cached[0]
+
+   from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
    try:
-       response = s3_client.generate_presigned_url('get_object',
-                                                   Params={'Bucket': s3_bucket_name,
-                                                           'Key': object_name},
-                                                   ExpiresIn=expiration)
+       response = _get_s3_client().generate_presigned_url('get_object',
+                                                          Params={'Bucket': s3_bucket_name,
+                                                                  'Key': object_name},
+                                                          ExpiresIn=expiration)
    except NoCredentialsError:
        current_app.logger.error("AWS credentials not found.")
        return None
@@ -58,6 +165,16 @@ def _generate_presigned_s3_url(object_name, expiration=3600):
    except ClientError as e:
        current_app.logger.error(f"Could not generate presigned URL: {e}")
        return None
+
+   # Hand the URL out only while it still has at least the safety margin left to live.
+   safety_margin = current_app.config.get('PRESIGNED_URL_SAFETY_MARGIN', 300)
+   reusable_until = now + expiration - min(safety_margin, expiration / 2)
+   max_entries = current_app.config.get('PRESIGNED_URL_CACHE_SIZE', 1024)
+   with _presigned_url_cache_lock:
+       _presigned_url_cache[cache_key] = (response, reusable_until)
+       _presigned_url_cache.move_to_end(cache_key)
+       while len(_presigned_url_cache) > max_entries:
+           _presigned_url_cache.popitem(last=False)
    return response
 
 def _get_flutter_friendly_youtube_url(youtube_url):
@@ -76,9 +193,19 @@ def _generate_learning_content_recommendations(incorrect_questions):
    learning_content_recommendations = []
    
    firstcontentid = 0
+
+   # One IN query for all incorrect questions instead of one query per question.
+   # Rows are ordered by id so each question keeps its first piece of content.
+   content_by_question = {}
+   if incorrect_questions:
+       contents = LearningContent.query.filter(
+           LearningContent.test_questions_id.in_(set(incorrect_questions))
+       ).order_by(LearningContent.id).all()
+       for content in contents:
+           content_by_question.setdefault(content.test_questions_id, content)
    
    for q_id in incorrect_questions:
-       content = LearningContent.query.filter_by(test_questions_id=q_id).first()
+       content = content_by_question.get(q_id)
        if content:
            if firstcontentid == 0 :
                firstcontentid = content.id
@@ -113,33 +240,19 @@ def _generate_learning_content_recommendations(incorrect_questions):
            })
    return learning_content_recommendations, firstcontentid
 
-def submit_test(user, answers, db):
+def _grade_answers(answers, questions_by_id):
     """
-    Handles the submission of a practice test.
+    Grades submitted answers in memory against preloaded questions.
+    Returns (score, results, incorrect_question_ids, answer_rows).
     """
     score = 0
-    total_questions = len(answers)
     results = []
     incorrect_questions = []
-
-    new_test_attempt = UserTestAttempt(
-        user_id=user.id,
-        module_id=user.current_learning_focus_module_id
-    )
-    db.session.add(new_test_attempt)
-
+    answer_rows = []
     for answer in answers:
         question_id = answer.get('question_id')
         user_answer = answer.get('selected_answer')
-
-        if not question_id or not user_answer:
-            db.session.rollback()
-            return {'message': 'Each answer must include "question_id" and "selected_answer".'}, 400
-
-        question = TestQuestion.query.get(question_id)
-        if not question:
-            db.session.rollback()
-            return {'message': f'Question with id {question_id} not found.'}, 404
+        question = questions_by_id[question_id]
 
         correct_answer_field = f'wrong_answer_{question.correct_answer}'
         correct_answer_value = getattr(question, correct_answer_field)
@@ -148,20 +261,57 @@ def submit_test(user, answers, db):
             score += 1
         else:
             incorrect_questions.append(question_id)
-        
+
         results.append({
             'question_id': question_id,
             'user_answer': user_answer,
             'correct_answer': correct_answer_value, # Store the actual correct answer string
             'is_correct': is_correct
         })
+        answer_rows.append({
+            'question_id': question_id,
+            'submitted_answer': user_answer,
+            'is_correct': is_correct
+        })
+    return score, results, incorrect_questions, answer_rows
 
-        new_answer = UserTestAnswer(
-            question_id=question_id,
-            submitted_answer=user_answer,
-            is_correct=is_correct
-        )
-        new_test_attempt.answers.append(new_answer)
+def submit_test(user, answers, db):
+    """
+    Handles the submission of a practice test.
+    Grading is batched: all referenced questions are loaded with one IN query, answers are
+    graded in memory and inserted with a single executemany, so the number of queries does
+    not grow with the number of answers.
+    """
+    total_questions = len(answers)
+
+    normalized_answers = []
+    for answer in answers:
+        if not answer.get('question_id') or not answer.get('selected_answer'):
+            return {'message': 'Each answer must include "question_id" and "selected_answer".'}, 400
+        # Clients may send ids as strings ("5"); questions are keyed by integer id
+        try:
+            question_id = int(answer['question_id'])
+        except (TypeError, ValueError):
+            return {'message': f'Invalid question_id {answer["question_id"]!r}; it must be an integer.'}, 400
+        normalized_answers.append(dict(answer, question_id=question_id))
+    answers = normalized_answers
+
+    question_ids = {answer.get('question_id') for answer in answers}
+    questions_by_id = {
+        question.id: question
+        for question in TestQuestion.query.filter(TestQuestion.id.in_(question_ids)).all()
+    } if question_ids else {}
+    for answer in answers:
+        if answer.get('question_id') not in questions_by_id:
+            return {'message': f'Question with id {answer.get("question_id")} not found.'}, 404
+
+    score, results, incorrect_questions, answer_rows = _grade_answers(answers, questions_by_id)
+
+    new_test_attempt = UserTestAttempt(
+        user_id=user.id,
+        module_id=user.current_learning_focus_module_id
+    )
+    db.session.add(new_test_attempt)
 
     score_percentage = (score / total_questions) * 100 if total_questions > 0 else 0
 
@@ -170,14 +320,18 @@ def submit_test(user, answers, db):
 
     if score_percentage < 100:
             learning_content_recommendations, firstcontentid = _generate_learning_content_recommendations(incorrect_questions)
-    if user.current_problem_category_slug == 'PT':
-        if score_percentage == 100 :
-            user.current_problem_category_slug = 'PSQ'
-        else :
-            if firstcontentid >0 : # Check if firstcontenturl is not empty
-                    user.next_recommended_lesson_id = firstcontentid
+    # PT -> PSQ on a perfect score, otherwise recommend the first lesson (see rule_definitions)
+    COMPILED_RULES['test_progression'](user, db, {
+        'score_percentage': score_percentage,
+        'first_content_id': firstcontentid
+    })
 
     try:
+        if answer_rows:
+            db.session.flush() # Assigns new_test_attempt.id for the answer rows
+            for row in answer_rows:
+                row['user_test_attempt_id'] = new_test_attempt.id
+            db.session.execute(UserTestAnswer.__table__.insert(), answer_rows)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -213,54 +367,7 @@ def update_next_recommended_lesson(user, learning_content_id, db):
 def completed_learning(user, db):
     """
     Evaluates the user's current problem category slug after completing learning content.
-    If the current problem category is 'PT', it updates it to 'PSQ'.
+    PT moves to PSQ; PSQ moves to PT of the next module. The transitions are declared in
+    rule_definitions.RULE_DEFINITIONS['completed_learning'].
     """
-    current_app.logger.info(f"User {user.email} completed_learning problem category slug-------."+user.current_problem_category_slug)
-        
-    if   user.current_problem_category_slug == 'PT':
-            new_completed_module = UserCompletedModules(
-                user_id=user.id,
-                module_id=user.current_learning_focus_module_id,
-                problem_category_slug=user.current_problem_category_slug
-            )
-            
-            user.current_problem_category_slug = 'PSQ'
-            user.next_recommended_lesson_id = None # Clear the recommended lesson after completing learning
-            
-            # Add entry to UserCompletedModules
-           
-            db.session.add(new_completed_module)
-
-            try:
-                db.session.commit()
-                current_app.logger.info(f"User {user.email} problem category slug updated to PSQ after completing learning.")
-                return {'message': 'Problem category updated successfully.'}, 200
-            except Exception as e:
-                db.session.rollback()
-                current_app.logger.error(f"Error updating problem category slug to PSQ for user {user.email}: {e}")
-                return {'message': 'Failed to update problem category slug.', 'error': str(e)}, 500
-    elif user.current_problem_category_slug == 'PSQ':
-            new_completed_module = UserCompletedModules(
-                user_id=user.id,
-                module_id=user.current_learning_focus_module_id,
-                problem_category_slug=user.current_problem_category_slug
-            )
-            modules_id=user.current_learning_focus_module_id
-            modules_id  = modules_id +1 # expectng learning path modules ids to be in sequence, eventaully need to maintain meta data
-            user.current_problem_category_slug = 'PT'
-            user.current_learning_focus_module_id = modules_id
-            user.next_recommended_lesson_id = None # should be none already but Clearing anyway
-
-            # Add entry to UserCompletedModules
-            
-            db.session.add(new_completed_module)
-
-            try:
-                db.session.commit()
-                current_app.logger.info(f"User {user.email} problem category slug updated to PT after completing feedback.")
-                return {'message': 'Problem category updated successfully.'}, 200
-            except Exception as e:
-                db.session.rollback()
-                current_app.logger.error(f"Error updating problem category slug to PT for user {user.email}: {e}")
-                return {'message': 'Failed to update problem category slug.', 'error': str(e)}, 500
-    return {'message': 'No change needed for problem category.'}, 200
+    return COMPILED_RULES['completed_learning'](user, db)
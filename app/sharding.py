@@ -0,0 +1,177 @@
+import threading
+import time
+from flask import current_app, g, has_app_context, jsonify
+from sqlalchemy import inspect as sa_inspect, text
+from sqlalchemy.sql.util import find_tables
+from .db_pool import pool_engine_options
+
+DEFAULT_SHARD = 'default'
+# Retry-After (seconds) sent with 503s for writes to an account that is being moved
+READ_ONLY_RETRY_AFTER = 5
+
+# Tables whose rows belong to one account and live on that account's shard. Everything
+# else (organizations, accounts, users, templates, the directory itself) stays on the
+# default database.
+TENANT_TABLES = frozenset({
+    'projects', 'tasks', 'task_dependencies', 'auth_codes', 'project_change_sequences', 'project_changes',
+})
+
+
+class ShardRoutingError(Exception):
+    """Raised when a statement on a tenant table cannot be attributed to a single shard."""
+
+
+class AccountReadOnly(ShardRoutingError):
+    """Raised for writes to an account that is being moved between shards."""
+
+
+class ShardDirectory:
+    """
+    account_id -> (shard, read_only) from the account_shards table on the default database.
+    Each worker reloads the whole table every ttl seconds, so a directory change is seen by
+    all workers within ttl; the migration tool waits that long between its phases.
+    """
+
+    def __init__(self, shard_keys, ttl=30):
+        self.shard_keys = list(shard_keys)
+        self.ttl = ttl
+        self._entries = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def lookup(self, account_id):
+        entries = self._entries
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            entries = self.reload()
+        return entries.get(account_id, (DEFAULT_SHARD, False))
+
+    def reload(self):
+        # A separate connection: this runs inside Session.get_bind, possibly mid-flush
+        engine = current_app.extensions['sqlalchemy'].engines[None]
+        with engine.connect() as connection:
+            rows = connection.execute(text('SELECT account_id, shard, read_only FROM account_shards')).all()
+        with self._lock:
+            self._entries = {account_id: (shard, bool(read_only)) for account_id, shard, read_only in rows}
+            self._loaded_at = time.monotonic()
+        return self._entries
+
+    def invalidate(self):
+        self._loaded_at = None
+
+
+def sharding_enabled():
+    return has_app_context() and 'shards' in current_app.extensions
+
+
+def is_tenant_statement(mapper, clause):
+    if mapper is not None:
+        return sa_inspect(mapper).local_table.name in TENANT_TABLES
+    if clause is not None:
+        return any(table.name in TENANT_TABLES for table in find_tables(clause, include_crud=True, include_joins=True))
+    return False
+
+
+def use_account(account_id):
+    """Scopes the tenant statements of the current request or app context to this account's shard."""
+    if sharding_enabled():
+        shard, _ = current_app.extensions['shards'].lookup(account_id)
+        g._shard = (shard, (account_id,))
+
+
+def _candidate_shards():
+    """Shard -> account ids of the current user's accounts."""
+    user = g.get('current_user')
+    if user is None:
+        return {}
+    directory = current_app.extensions['shards']
+    session = current_app.extensions['sqlalchemy'].session
+    with session.no_autoflush:
+        account_ids = [user_account.account_id for user_account in user.accounts]
+    shards = {}
+    for account_id in account_ids:
+        shards.setdefault(directory.lookup(account_id)[0], []).append(account_id)
+    return shards
+
+
+def _probe(shards, statement, parameters):
+    engines = current_app.extensions['sqlalchemy'].engines
+    for shard in shards:
+        engine = engines[None] if shard == DEFAULT_SHARD else engines[shard]
+        with engine.connect() as connection:
+            account_id = connection.execute(statement, parameters).scalar()
+        if account_id is not None:
+            return account_id
+    return None
+
+
+def use_project(project_id):
+    """Scopes the request to the shard holding this project, among the current user's shards."""
+    if not sharding_enabled():
+        return
+    shards = _candidate_shards()
+    if len(shards) > 1:
+        account_id = _probe(shards, text('SELECT account_id FROM projects WHERE id = :id'), {'id': project_id})
+        if account_id is not None:
+            use_account(account_id)
+        else:
+            g._shard = next(iter(shards.items())) # Not found anywhere; let the route answer 404
+
+
+def use_auth_code(code):
+    """Scopes the request to the shard holding this auth code; codes are looked up on every shard."""
+    if not sharding_enabled():
+        return
+    shards = [DEFAULT_SHARD] + current_app.extensions['shards'].shard_keys
+    account_id = _probe(shards, text('SELECT account_id FROM auth_codes WHERE authcode = :code'), {'code': code})
+    if account_id is not None:
+        use_account(account_id)
+
+
+def request_shard(writing=False):
+    """
+    The shard for tenant statements in the current context: the one chosen with use_account /
+    use_project, else the only shard holding the current user's accounts.
+    """
+    scope = g.get('_shard')
+    if scope is None:
+        shards = _candidate_shards()
+        if len(shards) > 1:
+            raise ShardRoutingError('The accounts of this user live on several shards; call use_account() '
+                                    'or use_project() before touching tenant tables.')
+        scope = g._shard = next(iter(shards.items()), (DEFAULT_SHARD, ()))
+    shard, account_ids = scope
+    if writing:
+        directory = current_app.extensions['shards']
+        for account_id in account_ids:
+            if directory.lookup(account_id)[1]:
+                raise AccountReadOnly(f'Account {account_id} is being moved between databases; retry shortly.')
+    return shard
+
+
+def _account_read_only_response(e):
+    # The move finishes (or is rolled back) within seconds; clients retry the write
+    response = jsonify({'message': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(READ_ONLY_RETRY_AFTER)
+    return response
+
+
+def init_sharding(app):
+    """
+    Adds one bind per SHARD_URLS entry (shard_1, shard_2, ...), with the primary's pool
+    profile. Tenant tables are then routed by account through the account_shards directory.
+    Call it before db.init_app(app). Without shards everything stays on the default database.
+    """
+    app.register_error_handler(AccountReadOnly, _account_read_only_response)
+    urls = [url.strip() for url in (app.config.get('SHARD_URLS') or '').split(',') if url.strip()]
+    if not urls:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    shard_keys = []
+    for position, url in enumerate(urls, start=1):
+        key = f'shard_{position}'
+        binds[key] = {'url': url, **pool_engine_options(app.config, url)}
+        shard_keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['shards'] = ShardDirectory(shard_keys, ttl=app.config.get('SHARD_DIRECTORY_TTL', 30))
+
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+
+# Every SingleFlight created in this process, by name, so the metrics route can report them all
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+        self.callbacks = [] # run once done is set; async waiters use them to wake their loop
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the leader) runs the
+    function, later callers arriving while it is in flight wait for and share its result.
+    Nothing is cached once the call completes, so the key must already identify the
+    version of the resource being computed.
+    """
+
+    def __init__(self, name, wait_timeout=30):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                # The leader is stuck; compute independently rather than fail the request.
+                with self._lock:
+                    self.timeouts += 1
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._finish(key, call)
+
+    async def do_async(self, key, fn):
+        """
+        do() for coroutine functions, sharing its keys and counters. Waiting callers await the
+        leader without holding a thread; the leader may be a thread in do() or another task.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+                woken = loop.create_future()
+                call.callbacks.append(lambda: _wake_soon(loop, woken))
+
+        if not leader:
+            try:
+                await asyncio.wait_for(woken, self.wait_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                return await fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = await fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._finish(key, call)
+
+    def _finish(self, key, call):
+        with self._lock:
+            self._calls.pop(key, None)
+            callbacks = list(call.callbacks)
+        call.done.set()
+        for callback in callbacks:
+            callback()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'in_flight': len(self._calls),
+            }
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _wake_soon(loop, future):
+    try:
+        loop.call_soon_threadsafe(_wake, future)
+    except RuntimeError: # The waiter's loop has closed; nobody is left to wake
+        pass
+
+
+def all_stats():
+    with _registry_lock:
+        flights = list(_registry.values())
+    return {flight.name: flight.stats() for flight in flights}
@@ -0,0 +1,143 @@
+import datetime
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .query_budget import fingerprint
+
+# Execution option set on the recorder's own EXPLAIN connection so it never records itself
+SKIP_OPTION = 'slow_query_log_skip'
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describes bound parameters by type only, so records never hold user data."""
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'row': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def explain_prefix(dialect_name):
+    return 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+
+
+class SlowQueryLog:
+    """
+    Bounded ring buffer of statements slower than threshold_ms. EXPLAIN plans are fetched
+    by a background thread on a separate connection, so the slow request is not delayed further.
+    """
+
+    def __init__(self, threshold_ms=200, size=200, explain=True):
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+        self._explain_pid = None
+
+    def record(self, engine, statement, parameters, executemany, seconds):
+        with self._lock:
+            record = {
+                'id': self._next_id,
+                'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'duration_ms': round(seconds * 1000, 3),
+                'sql': fingerprint(statement),
+                'parameters': parameter_shape(parameters, executemany),
+                'endpoint': f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+                            if has_request_context() else None,
+                'explain': None,
+                'explain_status': 'pending',
+            }
+            self._next_id += 1
+            self._records.append(record)
+
+        # Async engines cannot be driven from the plain explain thread
+        if not self.explain or executemany or engine.dialect.is_async or not _EXPLAINABLE.match(statement):
+            record['explain_status'] = 'skipped'
+            return record
+        try:
+            self._ensure_explain_thread()
+            self._explain_queue.put_nowait((engine, statement, parameters, record))
+        except queue.Full:
+            record['explain_status'] = 'dropped'
+        return record
+
+    def records(self, limit=None):
+        with self._lock:
+            records = list(self._records)
+        records.reverse() # Newest first
+        return records[:limit] if limit else records
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def _ensure_explain_thread(self):
+        # One explain thread per process; forked workers start their own.
+        if self._explain_thread is None or self._explain_pid != os.getpid():
+            self._explain_pid = os.getpid()
+            self._explain_queue = queue.Queue(maxsize=100)
+            self._explain_thread = threading.Thread(target=self._explain_loop, name='slow-query-explain', daemon=True)
+            self._explain_thread.start()
+
+    def _explain_loop(self):
+        while True:
+            engine, statement, parameters, record = self._explain_queue.get()
+            try:
+                with engine.connect() as connection:
+                    connection = connection.execution_options(**{SKIP_OPTION: True})
+                    result = connection.exec_driver_sql(explain_prefix(engine.dialect.name) + statement, parameters)
+                    columns = list(result.keys())
+                    record['explain'] = [dict(zip(columns, [_plain(value) for value in row])) for row in result]
+                    record['explain_status'] = 'done'
+            except Exception as e:
+                record['explain'] = str(e)
+                record['explain_status'] = 'failed'
+
+
+def _plain(value):
+    return value if isinstance(value, (int, float, str, type(None))) else str(value)
+
+
+_active_log = None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_log is not None and context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if _active_log is None or started is None:
+        return
+    seconds = time.perf_counter() - started
+    if seconds >= _active_log.threshold and not conn.get_execution_options().get(SKIP_OPTION):
+        _active_log.record(conn.engine, statement, parameters, executemany, seconds)
+
+
+def init_slow_query_log(app):
+    """Installs the slow-query recorder for the process; view it at /api/v1/admin/slow-queries."""
+    global _active_log
+    if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        return
+    _active_log = app.extensions['slow_query_log'] = SlowQueryLog(
+        threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS', 200),
+        size=app.config.get('SLOW_QUERY_LOG_SIZE', 200),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', True),
+    )
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
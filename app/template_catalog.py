@@ -0,0 +1,45 @@
+import threading
+import time
+from flask import current_app, has_app_context
+
+
+class TemplateCatalog:
+    """
+    Per-process cache of the project template list and template details. Templates only
+    change when they are reseeded, so entries are served for ttl seconds without a query.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def template_catalog():
+    """The app's TemplateCatalog, or None when caching is off."""
+    return current_app.extensions.get('template_catalog') if has_app_context() else None
+
+
+def init_template_catalog(app):
+    ttl = app.config.get('TEMPLATE_CACHE_SECONDS', 300)
+    if ttl > 0:
+        app.extensions['template_catalog'] = TemplateCatalog(ttl)
@@ -0,0 +1,155 @@
+import zlib
+from flask import request
+from flask_cors import CORS
+
+try:
+    import brotli
+except ImportError: # Optional; without it responses are gzip-compressed only
+    brotli = None
+
+PREFLIGHT_METHODS = 'GET, HEAD, POST, OPTIONS, PUT, PATCH, DELETE'
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # memLevel 9: more memory per stream for a faster, slightly tighter deflate of repetitive JSON
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31, 9)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def whole(self, data):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def whole(self, data):
+        return self._compressor.process(data) + self._compressor.finish()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _compressed_stream(body, chunks, stream):
+    """Compresses a streamed body chunk by chunk, flushing each so events are not held back."""
+    try:
+        for chunk in chunks:
+            data = stream.chunk(chunk)
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        # Closing the response (e.g. the client went away) must still close the original stream
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+
+
+class Transport:
+    """
+    CORS preflights and response compression.
+
+    Preflights from allowed origins are answered by preflight_headers() around the WSGI app
+    (and by AsgiApp) before a request context exists, with an Access-Control-Max-Age that
+    lets browsers skip them for CORS_MAX_AGE seconds. compress() runs as the last after_request
+    hook and encodes JSON and text bodies of at least COMPRESSION_MIN_SIZE bytes, and streamed
+    responses such as Server-Sent Events, with brotli (when installed) or gzip.
+    """
+
+    def __init__(self, config):
+        origins = config.get('CORS_ORIGINS', '*')
+        self.origins = '*' if origins == '*' else {origin.strip() for origin in origins.split(',') if origin.strip()}
+        self.max_age = config.get('CORS_MAX_AGE', 86400)
+        self.compression = config.get('COMPRESSION_ENABLED', True)
+        self.min_size = config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = config.get('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = config.get('COMPRESSION_BROTLI_QUALITY', 5)
+
+    def preflight_headers(self, environ):
+        """Response headers for a CORS preflight from an allowed origin, otherwise None."""
+        origin = environ.get('HTTP_ORIGIN')
+        if environ.get('REQUEST_METHOD') != 'OPTIONS' or not origin or 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' not in environ:
+            return None
+        if self.origins != '*' and origin not in self.origins:
+            return None
+        # The origin is echoed back, as flask-cors does for the requests that follow
+        headers = [
+            ('Access-Control-Allow-Origin', origin),
+            ('Access-Control-Allow-Methods', PREFLIGHT_METHODS),
+            ('Access-Control-Max-Age', str(self.max_age)),
+            ('Vary', 'Origin'),
+            ('Content-Length', '0'),
+        ]
+        requested_headers = environ.get('HTTP_ACCESS_CONTROL_REQUEST_HEADERS')
+        if requested_headers:
+            headers.append(('Access-Control-Allow-Headers', requested_headers))
+        return headers
+
+    def wrap(self, wsgi_app):
+        def preflight_middleware(environ, start_response):
+            headers = self.preflight_headers(environ)
+            if headers is None:
+                return wsgi_app(environ, start_response)
+            start_response('204 No Content', headers)
+            return [b'']
+        return preflight_middleware
+
+    def _encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _stream(self, encoding):
+        return _BrotliStream(self.brotli_quality) if encoding == 'br' else _GzipStream(self.gzip_level)
+
+    def compress(self, response):
+        mimetype = response.mimetype or ''
+        if not (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith('+json')):
+            return response
+        response.vary.add('Accept-Encoding')
+        if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or 'no-transform' in (response.headers.get('Cache-Control') or '')):
+            return response
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compressed_stream(response.response, response.iter_encoded(), self._stream(encoding))
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self._stream(encoding).whole(data))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The encoded body is a different representation from the identity one
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def init_transport(app):
+    transport = app.extensions['transport'] = Transport(app.config)
+    CORS(app, origins=transport.origins if transport.origins == '*' else sorted(transport.origins),
+         max_age=transport.max_age)
+    app.wsgi_app = transport.wrap(app.wsgi_app)
+    if transport.compression:
+        # Flask runs after_request hooks in reverse, so request timing and the query budget
+        # (registered later) still see the uncompressed body
+        app.after_request(transport.compress)
@@ -1,9 +1,11 @@
 import jwt
 import datetime
+import hmac
 import os
-from flask import current_app, jsonify, request
+from flask import current_app, jsonify, request, g
 from functools import wraps
 from .models import User # Assuming your User model is in models.py
+from .read_replicas import request_target, use_primary, PRIMARY
 
 def generate_token(user_id, user_email, secret_key):
     """
@@ -46,6 +48,25 @@ def generate_token(user_id, user_email, secret_key):
         return str(e)
 # utils.py
 
+# Audience of stream tokens. Login tokens carry no audience, so each kind is rejected where the other is expected.
+STREAM_TOKEN_AUDIENCE = 'events'
+
+
+def generate_stream_token(user_id, secret_key, expires_in):
+    """
+    Generates a short-lived token for Server-Sent Events streams. EventSource cannot set an
+    Authorization header, so it is passed as ?token=; it only opens event streams.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    payload = {
+        'exp': int((now + datetime.timedelta(seconds=expires_in)).timestamp()),
+        'iat': int(now.timestamp()) - 15,
+        'sub': str(user_id),
+        'aud': STREAM_TOKEN_AUDIENCE,
+    }
+    return jwt.encode(payload, secret_key.encode('utf-8'), algorithm='HS256')
+
+
 def decode_token_DIAGNOSTIC(token, secret_key):
     """
     Decodes the auth token, explicitly disabling the iat check for diagnostics.
@@ -142,9 +163,10 @@ def decode_token_SUPERDIAGNOSTIC(token, secret_key):
     except Exception as e:
         current_app.logger.error(f"--- UNEXPECTED DECODE ERROR: {e} ---")
         return 'An unexpected error occurred.'
-def decode_token(token, secret_key):
+def decode_token(token, secret_key, audience=None):
     """
     Decodes the auth token, explicitly disabling the iat check for diagnostics.
+    Tokens with an audience (stream tokens) only decode when that audience is given.
     """
     try:
         # --- THE DIAGNOSTIC CODE ---
@@ -161,25 +183,22 @@ def decode_token(token, secret_key):
         
         secret_key_bytes = secret_key.encode('utf-8')
         
-        current_app.logger.info("--- DECODING WITH IAT VALIDATION DISABLED ---")
-        
         payload = jwt.decode(
             token,
             secret_key_bytes,
             algorithms=['HS256'],
             leeway=60, # Leeway is now ignored for iat, but it's good to keep it for exp.
+            audience=audience,
             options=decode_options
         )
-        
-        current_app.logger.info("--- SUCCESS! DECODE WORKED WITH IAT CHECK OFF ---")
         return payload
 
     except jwt.InvalidTokenError as e:
-        # Now we'll see the REAL error if it's not the iat.
-        current_app.logger.error(f"--- FAILED EVEN WITH IAT CHECK OFF: {e} ---")
+        # Expired and tampered tokens are routine; rate limited under a single key
+        current_app.logger.warning("Token rejected: %s", e, extra={'log_key': 'auth.token_rejected'})
         return 'Invalid token. Please log in again.'
     except Exception as e:
-        current_app.logger.error(f"--- UNEXPECTED DECODE ERROR: {e} ---")
+        current_app.logger.error("Unexpected token decode error: %s", e, extra={'log_key': 'auth.decode_error'})
         return 'An unexpected error occurred.'
 
 def decode_token_original(token, secret_key):
@@ -189,20 +208,44 @@ def decode_token_original(token, secret_key):
     :return: integer|string
     """
     try:
-        current_app.logger.info("At decode "+secret_key)
         payload = jwt.decode(token, secret_key.encode('utf-8'), algorithms=['HS256'], leeway=60)
         #payload = jwt.decode(token, secret_key, algorithms=['HS256'], leeway=60)
         return payload
     except jwt.ExpiredSignatureError as e:
-        current_app.logger.info("-------------jwt.ExpiredSignatureError")
-        current_app.logger.error (e)
+        current_app.logger.warning("Token rejected: %s", e, extra={'log_key': 'auth.token_rejected'})
         return 'Signature expired. Please log in again.'
     except jwt.InvalidTokenError as e:
-        current_app.logger.info("-------------jwt.InvalidTokenError")
-        current_app.logger.error (e)
+        current_app.logger.warning("Token rejected: %s", e, extra={'log_key': 'auth.token_rejected'})
         return 'Invalid token. Please log in again.'
 
 
+def _authenticate(token, audience=None):
+    """Resolves a token to its user; returns (user, None) or (None, error response)."""
+    try:
+        secret_key = current_app.config.get('SECRET_KEY')
+        data = decode_token(token, secret_key, audience)
+        if isinstance(data, str): # Error message returned from decode_token
+            return None, (jsonify({'message': data}), 401)
+        g._token_subject = str(data['sub']) # Read-your-writes stickiness is keyed by user
+        
+        current_user = User.query.filter_by(id=data['sub']).first()
+        if not current_user and request_target() != PRIMARY:
+            # A user created moments ago may not have reached the replica yet
+            use_primary()
+            current_user = User.query.filter_by(id=data['sub']).first()
+        if not current_user:
+            current_app.logger.warning("User with id %s was not found in the database.", data['sub'],
+                                       extra={'log_key': 'auth.user_not_found'})
+            return None, (jsonify({'message': 'User not found!'}), 401)
+        g.current_user = current_user # Shard routing reads the user's accounts
+        current_app.logger.debug("Authenticated user %s", current_user.id, extra={'log_key': 'auth.user_found'})
+        return current_user, None
+            
+    except Exception as e:
+        current_app.logger.error("Token processing error: %s", e, extra={'log_key': 'auth.token_error'})
+        return None, (jsonify({'message': 'Token is invalid or expired!'}), 401)
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -223,23 +266,64 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
 
-        try:
-            secret_key = current_app.config.get('SECRET_KEY')
-            data = decode_token(token, secret_key)
-            if isinstance(data, str): # Error message returned from decode_token
-                return jsonify({'message': data}), 401
-            
-            current_app.logger.info(f"Attempting to find user with sub: {data['sub']} (type: {type(data['sub'])})")
-            current_user = User.query.filter_by(id=data['sub']).first()
-            if not current_user:
-                current_app.logger.error(f"User with id {data['sub']} was not found in the database.")
-                return jsonify({'message': 'User not found!'}), 401
-            current_app.logger.info(f"Successfully found user: {current_user.email}")
-                
-        except Exception as e:
-            current_app.logger.error(f"Token processing error: {e}")
-            return jsonify({'message': 'Token is invalid or expired!'}), 401
+        current_user, error = _authenticate(token)
+        if error:
+            return error
 
         return f(current_user, *args, **kwargs) # Pass the user object to the decorated function
 
-    return decorated
\ No newline at end of file
+    return decorated
+
+
+def stream_token_required(f):
+    """
+    token_required for Server-Sent Events endpoints: also accepts a stream token from
+    generate_stream_token() in the ?token= query parameter, as EventSource cannot send headers.
+    """
+    header_authenticated = token_required(f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if not token:
+            return header_authenticated(*args, **kwargs)
+        current_user, error = _authenticate(token, audience=STREAM_TOKEN_AUDIENCE)
+        if error:
+            return error
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+
+def admin_required(f):
+    """
+    Restricts a @token_required endpoint to platform administrators: members of a super-admin
+    organization, or users listed in the ADMIN_EMAILS setting. Place it below @token_required.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        admin_emails = current_app.config.get('ADMIN_EMAILS', [])
+        organization = current_user.organization
+        if not (organization is not None and organization.super_admin) and current_user.email not in admin_emails:
+            return jsonify({'message': 'Administrator access required.'}), 403
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+
+def metrics_auth_required(f):
+    """
+    Protects the /metrics endpoints: a scraper sends 'Authorization: Bearer <METRICS_TOKEN>',
+    anyone else needs an administrator's login token. Without METRICS_TOKEN only administrators get in.
+    """
+    admin_only = token_required(admin_required(lambda current_user, *args, **kwargs: f(*args, **kwargs)))
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        metrics_token = current_app.config.get('METRICS_TOKEN')
+        if metrics_token and hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                                 f'Bearer {metrics_token}'.encode('utf-8')):
+            return f(*args, **kwargs)
+        return admin_only(*args, **kwargs)
+
+    return decorated
@@ -0,0 +1,55 @@
+import importlib
+import time
+from sqlalchemy import text
+from . import db
+
+# Heavy modules the app imports on first use instead of at start-up (see tests/test_cold_start.py).
+# A long-running server imports them before it takes traffic.
+DEFERRED_IMPORTS = (
+    'app.rules_engine', # numpy, rule compilation
+    'app.gantt_lod',
+    'boto3',
+    'botocore.exceptions',
+    'google.oauth2.id_token',
+    'google.auth.transport.requests',
+)
+
+
+def import_deferred_modules():
+    """Imports DEFERRED_IMPORTS; a module that is not installed is skipped."""
+    for name in DEFERRED_IMPORTS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def warm_caches(app):
+    """
+    Fills this process's caches before it takes traffic: the deferred imports, a pooled DB
+    connection, the shard directory, the template catalog and Google's signing certificates.
+    A failing step is logged and skipped; that cache then fills on first use as usual.
+    Returns step name -> seconds taken (None when the step failed).
+    """
+    from .google_auth_service import GoogleAuthService
+    from .routes.project_templates_routes import warm_template_catalog
+
+    steps = [('imports', import_deferred_modules), ('database', lambda: db.session.execute(text('SELECT 1')))]
+    if 'shards' in app.extensions:
+        steps.append(('shard_directory', app.extensions['shards'].reload))
+    steps.append(('template_catalog', warm_template_catalog))
+    if app.config.get('GOOGLE_CLIENT_ID'):
+        steps.append(('google_certs', GoogleAuthService.warm))
+
+    results = {}
+    with app.app_context():
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+                results[name] = round(time.perf_counter() - started, 3)
+            except Exception as e:
+                results[name] = None
+                app.logger.warning("Warm-up step %s failed: %s", name, e, extra={'log_key': f'warmup.{name}'})
+    app.logger.info("Warmed caches: %s", results, extra={'log_key': 'warmup.done'})
+    return results
@@ -0,0 +1,6 @@
+from app import create_app
+from app.asgi import AsgiApp
+
+# ASGI entry point: uvicorn asgi:app --host 0.0.0.0 --port 8080 --workers 4
+# Auth, project and template reads run on the event loop; see app/asgi.py.
+app = AsgiApp(create_app())
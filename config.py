@@ -1,22 +1,151 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file; python-dotenv is only imported when there is one
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 if os.path.exists(dotenv_path):
+    from dotenv import load_dotenv
     load_dotenv(dotenv_path)
 
+def _optional_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def _optional_bool(name):
+    value = os.environ.get(name)
+    return value.lower() == 'true' if value else None
+
+
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
+    # Users allowed on /api/v1/admin routes besides members of a super-admin organization
+    ADMIN_EMAILS = [email.strip() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()]
+    # Bearer token for scraping /metrics and /metrics/single-flight; without it only administrators can read them
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
 
-    print(f"DEBUG: Config.SQLALCHEMY_DATABASE_URI is: {SQLALCHEMY_DATABASE_URI}")
-    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
 
+    # Upper bound on the number of buckets returned by the Gantt level-of-detail overview
+    LOD_MAX_BUCKETS = int(os.environ.get('LOD_MAX_BUCKETS', 2000))
+    # Number of change sequences kept per project for delta sync before older entries are compacted
+    CHANGE_LOG_RETENTION = int(os.environ.get('CHANGE_LOG_RETENTION', 500))
+
+    # Server-sent change events. 'local' fans out within one worker; 'sqlite' shares events
+    # between the workers of one host through the file at CHANGE_BROKER_SQLITE_PATH.
+    CHANGE_BROKER_BACKEND = os.environ.get('CHANGE_BROKER_BACKEND', 'local')
+    CHANGE_BROKER_SQLITE_PATH = os.environ.get('CHANGE_BROKER_SQLITE_PATH', '/tmp/sreepmp_change_events.sqlite')
+    SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 100))
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    # Open change streams per worker. Each holds a serving thread for its lifetime, so keep this
+    # below GUNICORN_THREADS (asgi.py gives streams a pool of this size of their own);
+    # further subscribers get 503 with Retry-After
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 4))
+    # Lifetime of the ?token= stream tokens from POST /api/v1/events/token. It is only checked
+    # when a stream opens; EventSource reconnects after it expires need a new token
+    SSE_TOKEN_SECONDS = int(os.environ.get('SSE_TOKEN_SECONDS', 60))
+
+    # Presigned S3 URLs for learning content are cached per object key and stop being
+    # reused this many seconds before they expire
+    PRESIGNED_URL_CACHE_SIZE = int(os.environ.get('PRESIGNED_URL_CACHE_SIZE', 1024))
+    PRESIGNED_URL_SAFETY_MARGIN = int(os.environ.get('PRESIGNED_URL_SAFETY_MARGIN', 300))
+
+    # Practice test generation from the precomputed question pool
+    TEST_QUESTION_COUNT = int(os.environ.get('TEST_QUESTION_COUNT', 10))
+    SPIRAL_FRACTION = float(os.environ.get('SPIRAL_FRACTION', 0.3))
+    QUESTION_POOL_TTL = int(os.environ.get('QUESTION_POOL_TTL', 600))
+
+    # Per-request wall/SQL/serialization timing, exposed on /metrics and, unless disabled,
+    # in a Server-Timing response header
+    REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+
+    # Opt-in N+1 detection: statement shapes repeated this many times in one request are logged
+    # with their call sites. Budgets declared with @query_budget fail requests when testing or
+    # when QUERY_BUDGET_ENFORCE is set, and are only logged otherwise.
+    N_PLUS_ONE_DETECTION = os.environ.get('N_PLUS_ONE_DETECTION', 'false').lower() == 'true'
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+
+    # Statements slower than this are kept (per worker, newest SLOW_QUERY_LOG_SIZE) with an
+    # EXPLAIN plan fetched on a separate connection; see /api/v1/admin/slow-queries
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+
+    # On-demand profiling through /api/v1/admin/profiles: one session at a time per worker,
+    # at most one new session every PROFILING_MIN_INTERVAL seconds. A session for the next N
+    # requests ends after PROFILING_MAX_SECONDS even if fewer requests matched
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'true').lower() == 'true'
+    PROFILING_MIN_INTERVAL = int(os.environ.get('PROFILING_MIN_INTERVAL', 60))
+    PROFILING_MAX_REQUESTS = int(os.environ.get('PROFILING_MAX_REQUESTS', 50))
+    PROFILING_MAX_SECONDS = int(os.environ.get('PROFILING_MAX_SECONDS', 120))
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILING_SAMPLE_INTERVAL_MS', 5))
+
+    # app.logger goes through a bounded queue to a background writer thread. Records below
+    # WARNING are sampled per message key (LOG_SAMPLE_RATES='key=0.01,...'), every key is
+    # limited to LOG_RATE_LIMIT records per LOG_RATE_LIMIT_WINDOW seconds, and tokens and
+    # secrets are redacted. LOG_FORMAT is 'json' (one object per line) or 'text'.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', 'true').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+    LOG_RATE_LIMIT = int(os.environ.get('LOG_RATE_LIMIT', 50))
+    LOG_RATE_LIMIT_WINDOW = float(os.environ.get('LOG_RATE_LIMIT_WINDOW', 10))
+
+    # Connection pool profile ('default', 'web' or 'batch', see app/db_pool.py); the DB_POOL_*
+    # settings override single values of the profile. Pool gauges and checkout wait times
+    # are exported on /metrics.
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'default')
+    DB_POOL_SIZE = _optional_int('DB_POOL_SIZE')
+    DB_POOL_MAX_OVERFLOW = _optional_int('DB_POOL_MAX_OVERFLOW')
+    DB_POOL_TIMEOUT = _optional_int('DB_POOL_TIMEOUT')
+    DB_POOL_RECYCLE = _optional_int('DB_POOL_RECYCLE')
+    DB_POOL_PRE_PING = _optional_bool('DB_POOL_PRE_PING')
+    DB_POOL_USE_LIFO = _optional_bool('DB_POOL_USE_LIFO')
+
+    # Optional read replicas (comma-separated URLs). get_projects, get_project, the template
+    # routes and /me read from them; a user who wrote in the last READ_YOUR_WRITES_SECONDS
+    # reads from the primary, and a failing replica is skipped for READ_REPLICA_RETRY_SECONDS.
+    READ_REPLICA_URLS = os.environ.get('READ_REPLICA_URLS', '')
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    READ_REPLICA_RETRY_SECONDS = float(os.environ.get('READ_REPLICA_RETRY_SECONDS', 30))
+
+    # Optional account shards (comma-separated URLs, bound as shard_1, shard_2, ...). Accounts
+    # are placed through the account_shards directory, cached per worker for
+    # SHARD_DIRECTORY_TTL seconds; each shard hands out ids from its own SHARD_ID_SPAN range.
+    SHARD_URLS = os.environ.get('SHARD_URLS', '')
+    SHARD_DIRECTORY_TTL = float(os.environ.get('SHARD_DIRECTORY_TTL', 30))
+    SHARD_ID_SPAN = int(os.environ.get('SHARD_ID_SPAN', 100000000))
+
+    # ASGI serving mode (asgi.py). Auth, project and template reads run on the event loop with
+    # async drivers (ASYNC_DATABASE_URL overrides the one derived from DATABASE_URL, e.g. for
+    # TLS options); other endpoints run in a pool of ASYNC_THREADPOOL_SIZE threads.
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_THREADPOOL_SIZE = int(os.environ.get('ASYNC_THREADPOOL_SIZE', 32))
+
+    # Seconds each worker serves the project template list and details from memory (0 disables).
+    # gunicorn.conf.py loads them, and Google's signing certificates, before a worker takes traffic.
+    TEMPLATE_CACHE_SECONDS = int(os.environ.get('TEMPLATE_CACHE_SECONDS', 300))
+
+    # Transport (app/transport.py). CORS preflights from CORS_ORIGINS (comma-separated, or *) are
+    # answered before Flask runs and cached by browsers for CORS_MAX_AGE seconds (Chromium caps
+    # it at 7200). JSON/text bodies of COMPRESSION_MIN_SIZE bytes or more, and streams, are sent
+    # with brotli when it is installed, otherwise gzip; level 6 / quality 5 get close to the
+    # maximum ratio on JSON at a fraction of the CPU.
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+    CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', 86400))
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
@@ -24,9 +153,8 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
-    # Add any production-specific settings here, e.g.
-    # SQLALCHEMY_POOL_RECYCLE = 299
-    # SQLALCHEMY_ENGINE_OPTIONS = {'pool_recycle': 280}
+    # Sized for gunicorn threads, recycled before managed MySQL drops idle connections
+    DB_POOL_PROFILE = os.environ.get('DB_POOL_PROFILE', 'web')
 
 
 # Determine which config to use based on FLASK_ENV or default to Development
@@ -0,0 +1,316 @@
+import os
+import csv
+import time
+import random
+import argparse
+import datetime
+from collections import OrderedDict
+from sqlalchemy import func
+from app import create_app, db
+from app.models import Organization, Account, User, UserAccount, Project, Task, task_dependencies, AuthSourceEnum
+
+# Table name -> column order, shared by the CSV writer and run_seed.py's loaders
+TABLE_COLUMNS = OrderedDict([
+    ('organizations', ['id', 'name']),
+    ('accounts', ['id', 'name', 'organization_id']),
+    ('users', ['id', 'name', 'email', 'auth_source', 'organization_id', 'created_at', 'updated_at']),
+    ('user_accounts', ['user_id', 'account_id', 'role']),
+    ('projects', ['id', 'name', 'description', 'start_date', 'end_date', 'account_id', 'created_by', 'created_at', 'updated_at']),
+    ('tasks', ['id', 'name', 'status', 'start_date', 'duration', 'project_id', 'assigned_to', 'parent_id', 'created_at', 'updated_at']),
+    ('task_dependencies', ['task_id', 'depends_on_task_id']),
+])
+
+ROLE_WEIGHTS = [('viewer', 60), ('editor', 30), ('admin', 10)]
+STATUS_WEIGHTS = [('NOT_STARTED', 40), ('IN_PROGRESS', 25), ('COMPLETED', 30), ('ON_HOLD', 3), ('CANCELLED', 2)]
+DAY = 86400
+
+
+class CsvSink:
+    """Writes generated rows as CSV files that run_seed.py --data-dir can load."""
+
+    def __init__(self, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        self._files = {}
+        self._writers = {}
+        for table, columns in TABLE_COLUMNS.items():
+            csv_file = open(os.path.join(out_dir, f'{table}.csv'), 'w', newline='', encoding='utf-8')
+            writer = csv.writer(csv_file)
+            writer.writerow(columns)
+            self._files[table] = csv_file
+            self._writers[table] = writer
+        # run_seed.py always reads auth codes; generated datasets have none.
+        with open(os.path.join(out_dir, 'auth_codes.csv'), 'w', newline='', encoding='utf-8') as csv_file:
+            csv.writer(csv_file).writerow(['auth_code', 'account_id', 'role'])
+
+    def write(self, table, rows):
+        columns = TABLE_COLUMNS[table]
+        self._writers[table].writerows(
+            [_csv_value(row.get(column)) for column in columns] for row in rows
+        )
+
+    def close(self):
+        for csv_file in self._files.values():
+            csv_file.close()
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class DbSink:
+    """Writes generated rows straight to the database, one executemany per batch."""
+
+    TABLES = {
+        'organizations': Organization.__table__,
+        'accounts': Account.__table__,
+        'users': User.__table__,
+        'user_accounts': UserAccount.__table__,
+        'projects': Project.__table__,
+        'tasks': Task.__table__,
+        'task_dependencies': task_dependencies,
+    }
+
+    def write(self, table, rows):
+        if rows:
+            db.session.execute(self.TABLES[table].insert(), rows)
+            db.session.commit()
+
+    def close(self):
+        pass
+
+
+class _Buffer:
+    """Collects rows per table and flushes them to the sink batch_size rows at a time."""
+
+    def __init__(self, sink, batch_size):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.rows = {table: [] for table in TABLE_COLUMNS}
+        self.counts = {table: 0 for table in TABLE_COLUMNS}
+
+    def add(self, table, row):
+        rows = self.rows[table]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        # TABLE_COLUMNS lists parents before children: every table ahead of the one being
+        # flushed goes first, so foreign keys always resolve.
+        for name in TABLE_COLUMNS:
+            self._flush_one(name)
+            if name == table:
+                break
+
+    def _flush_one(self, table):
+        rows = self.rows[table]
+        if rows:
+            self.sink.write(table, rows)
+            self.counts[table] += len(rows)
+            self.rows[table] = []
+
+
+def _weighted_picker(rng, weighted):
+    values = [value for value, _ in weighted]
+    cum_weights = []
+    total = 0
+    for _, weight in weighted:
+        total += weight
+        cum_weights.append(total)
+    return lambda: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def _assignee_picker(rng, user_ids, distribution, zipf_s, unassigned_fraction):
+    """Picks assignees uniformly or with a Zipf skew (a few users own most tasks)."""
+    if not user_ids:
+        return lambda: None
+    if distribution == 'zipf':
+        cum_weights = []
+        total = 0.0
+        for rank in range(1, len(user_ids) + 1):
+            total += 1.0 / rank ** zipf_s
+            cum_weights.append(total)
+        pick = lambda: rng.choices(user_ids, cum_weights=cum_weights)[0]
+    else:
+        pick = lambda: rng.choice(user_ids)
+    return lambda: None if rng.random() < unassigned_fraction else pick()
+
+
+def _task_tree(rng, count, fanout, max_depth):
+    """
+    Shapes `count` tasks into a forest. Returns (parent_index, depth) per task, parents always
+    before their children. Expanding a random open node (rather than breadth-first) gives
+    deep, uneven hierarchies bounded by max_depth.
+    """
+    nodes = []
+    open_nodes = []
+    while len(nodes) < count:
+        if not open_nodes:
+            nodes.append((-1, 0))
+            open_nodes.append(len(nodes) - 1)
+            continue
+        position = rng.randrange(len(open_nodes))
+        parent = open_nodes[position]
+        open_nodes[position] = open_nodes[-1]
+        open_nodes.pop()
+        depth = nodes[parent][1] + 1
+        if depth >= max_depth:
+            continue
+        for _ in range(min(rng.randint(1, 2 * fanout - 1), count - len(nodes))):
+            nodes.append((parent, depth))
+            open_nodes.append(len(nodes) - 1)
+    return nodes
+
+
+def generate(sink, args):
+    rng = random.Random(args.seed)
+    buffer = _Buffer(sink, args.batch_size)
+    pick_role = _weighted_picker(rng, ROLE_WEIGHTS)
+    pick_status = _weighted_picker(rng, STATUS_WEIGHTS)
+    now = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    next_id = dict(args.id_start)
+    def new_id(table):
+        value = next_id[table]
+        next_id[table] += 1
+        return value
+
+    started = time.perf_counter()
+    for _ in range(args.orgs):
+        organization_id = new_id('organizations')
+        buffer.add('organizations', {'id': organization_id, 'name': f'Perf Org {organization_id}'})
+
+        for _ in range(args.accounts_per_org):
+            account_id = new_id('accounts')
+            buffer.add('accounts', {'id': account_id, 'name': f'Perf Account {account_id}', 'organization_id': organization_id})
+
+            user_ids = []
+            for _ in range(args.users_per_account):
+                user_id = new_id('users')
+                user_ids.append(user_id)
+                buffer.add('users', {
+                    'id': user_id,
+                    'name': f'Perf User {user_id}',
+                    'email': f'user{user_id}@perf.example.com',
+                    'auth_source': AuthSourceEnum.GOOGLE.name,
+                    'organization_id': organization_id,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+                buffer.add('user_accounts', {'user_id': user_id, 'account_id': account_id, 'role': pick_role()})
+            pick_assignee = _assignee_picker(rng, user_ids, args.assignee_distribution, args.zipf_s, args.unassigned_fraction)
+
+            for _ in range(args.projects_per_account):
+                project_id = new_id('projects')
+                project_start = now + datetime.timedelta(days=rng.randint(0, 365))
+                # Buffered before its tasks, so a tasks flush midway through the project writes it first
+                buffer.add('projects', {
+                    'id': project_id,
+                    'name': f'Perf Project {project_id}',
+                    'description': None,
+                    'start_date': project_start.replace(tzinfo=None),
+                    'end_date': None,
+                    'account_id': account_id,
+                    'created_by': rng.choice(user_ids) if user_ids else None,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+                _generate_project_tasks(
+                    rng, buffer, args, project_id, project_start, new_id, pick_status, pick_assignee, now
+                )
+
+    buffer.flush()
+    sink.close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    total = sum(buffer.counts.values())
+    for table, count in buffer.counts.items():
+        print(f"  {table}: {count}")
+    print(f"Generated {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/s)")
+
+
+def _generate_project_tasks(rng, buffer, args, project_id, project_start, new_id, pick_status, pick_assignee, now):
+    tree = _task_tree(rng, args.tasks_per_project, args.fanout, args.max_depth)
+    task_ids = []
+    starts = []
+    ends = []
+    pending_edges = []
+    whole_edges = int(args.edge_density)
+    fractional_edge = args.edge_density - whole_edges
+    for index, (parent_index, depth) in enumerate(tree):
+        task_id = new_id('tasks')
+        task_ids.append(task_id)
+
+        # Predecessors come from a window of earlier tasks, so every edge points backwards
+        # in generation order and the dependency graph is a DAG by construction.
+        predecessors = set()
+        if index > 0:
+            wanted = whole_edges + (1 if rng.random() < fractional_edge else 0)
+            low = max(0, index - args.dependency_window)
+            for _ in range(wanted):
+                candidate = rng.randint(low, index - 1)
+                if candidate != parent_index:
+                    predecessors.add(candidate)
+
+        start = starts[parent_index] + rng.randint(0, 3) * DAY if parent_index >= 0 else \
+            int(project_start.timestamp()) + rng.randint(0, 30) * DAY
+        for predecessor in predecessors:
+            start = max(start, ends[predecessor])
+            pending_edges.append({'task_id': task_id, 'depends_on_task_id': task_ids[predecessor]})
+        duration = rng.randint(1, 10) * DAY
+        starts.append(start)
+        ends.append(start + duration)
+
+        buffer.add('tasks', {
+            'id': task_id,
+            'name': f'Task {task_id} (level {depth})',
+            'status': pick_status(),
+            'start_date': datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+            'duration': duration,
+            'project_id': project_id,
+            'assigned_to': pick_assignee(),
+            'parent_id': task_ids[parent_index] if parent_index >= 0 else None,
+            'created_at': now,
+            'updated_at': now,
+        })
+    for edge in pending_edges:
+        buffer.add('task_dependencies', edge)
+
+
+def _db_id_start():
+    """First free id per table, so generated rows can be appended to an existing database."""
+    models = {'organizations': Organization, 'accounts': Account, 'users': User, 'projects': Project, 'tasks': Task}
+    return {table: (db.session.query(func.max(model.id)).scalar() or 0) + 1 for table, model in models.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset for performance environments.')
+    parser.add_argument('--output', choices=['db', 'csv'], default='csv', help='Write straight to the database or to CSV files.')
+    parser.add_argument('--out-dir', type=str, default='seed/generated', help='Directory for --output csv (load with run_seed.py --data-dir).')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed; the same arguments and seed give the same dataset.')
+    parser.add_argument('--orgs', type=int, default=2)
+    parser.add_argument('--accounts-per-org', type=int, default=5)
+    parser.add_argument('--users-per-account', type=int, default=20)
+    parser.add_argument('--projects-per-account', type=int, default=10)
+    parser.add_argument('--tasks-per-project', type=int, default=1000)
+    parser.add_argument('--max-depth', type=int, default=8, help='Maximum task hierarchy depth.')
+    parser.add_argument('--fanout', type=int, default=4, help='Average number of children per expanded task.')
+    parser.add_argument('--edge-density', type=float, default=1.2, help='Average number of dependencies per task.')
+    parser.add_argument('--dependency-window', type=int, default=50, help='How many earlier tasks a dependency may point back to.')
+    parser.add_argument('--assignee-distribution', choices=['uniform', 'zipf'], default='zipf')
+    parser.add_argument('--zipf-s', type=float, default=1.1, help='Skew of the zipf assignee distribution.')
+    parser.add_argument('--unassigned-fraction', type=float, default=0.2)
+    parser.add_argument('--batch-size', type=int, default=10000, help='Rows per executemany / CSV write.')
+    args = parser.parse_args()
+
+    if args.output == 'db':
+        app = create_app()
+        with app.app_context():
+            args.id_start = _db_id_start()
+            generate(DbSink(), args)
+    else:
+        args.id_start = {table: 1 for table in ['organizations', 'accounts', 'users', 'projects', 'tasks']}
+        generate(CsvSink(args.out_dir), args)
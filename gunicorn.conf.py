@@ -0,0 +1,89 @@
+"""
+Production gunicorn settings, read from the environment:
+
+    gunicorn -c gunicorn.conf.py run:app
+
+The app is imported once in the master (preload_app), along with the modules it otherwise
+imports on first use, so workers share its memory copy-on-write. Each forked worker gets new DB pools and a new log pipeline from the
+os.register_at_fork hooks in app/db_pool.py and app/log_pipeline.py, warms its caches
+before it accepts connections, and is replaced once its memory has grown by
+GUNICORN_MAX_MEMORY_GROWTH_MB since then.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# 'gthread' (default) serves GUNICORN_THREADS requests per worker, enough to keep slow Google
+# calls from blocking a worker. Every open change stream (SSE) holds one of those threads, so
+# SSE_MAX_STREAMS (503 beyond it) must stay below GUNICORN_THREADS; for many concurrent
+# collaborators use 'gevent' and raise SSE_MAX_STREAMS. 'gevent' runs up to GUNICORN_WORKER_CONNECTIONS
+# greenlets per worker and needs the gevent package; PyMySQL is pure Python, so its DB waits
+# yield too. Size DB_POOL_SIZE to the concurrency per worker either way.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Request-count recycling stays available as a backstop; off unless set
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Worker heartbeat files on tmpfs; a container's overlay filesystem can stall them
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+
+# Memory-based recycling, checked every MEMORY_CHECK_INTERVAL requests (0 disables it)
+MAX_MEMORY_GROWTH_MB = int(os.environ.get('GUNICORN_MAX_MEMORY_GROWTH_MB', 256))
+MEMORY_CHECK_INTERVAL = int(os.environ.get('GUNICORN_MEMORY_CHECK_INTERVAL', 100))
+
+
+def rss_bytes():
+    """Resident memory of this process."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak rather than current size: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def when_ready(server):
+    """Runs in the master once the app is loaded, before the first worker is forked."""
+    if server.cfg.preload_app:
+        from app.warmup import import_deferred_modules
+        import_deferred_modules()
+
+
+def post_worker_init(worker):
+    """Runs in each worker once the app is loaded, before it accepts connections."""
+    from app.warmup import warm_caches
+    warm_caches(getattr(worker.wsgi, 'flask_app', worker.wsgi)) # asgi.py wraps the Flask app
+    worker.baseline_rss = rss_bytes()
+    worker.requests_since_memory_check = 0
+
+
+def post_request(worker, req, environ, resp):
+    if MAX_MEMORY_GROWTH_MB <= 0 or MEMORY_CHECK_INTERVAL <= 0:
+        return
+    worker.requests_since_memory_check = getattr(worker, 'requests_since_memory_check', 0) + 1
+    if worker.requests_since_memory_check < MEMORY_CHECK_INTERVAL:
+        return
+    worker.requests_since_memory_check = 0
+    rss = rss_bytes()
+    baseline = getattr(worker, 'baseline_rss', None)
+    if baseline is None:
+        worker.baseline_rss = rss
+        return
+    growth_mb = (rss - baseline) / (1024 * 1024)
+    if growth_mb > MAX_MEMORY_GROWTH_MB and worker.alive:
+        # The worker finishes its in-flight requests and the master starts a fresh one
+        worker.log.info("Worker %s grew by %.0f MB since warm-up (limit %d MB); recycling it",
+                        worker.pid, growth_mb, MAX_MEMORY_GROWTH_MB)
+        worker.alive = False
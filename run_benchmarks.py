@@ -0,0 +1,384 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tempfile
+from types import SimpleNamespace
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_THRESHOLD = 0.10
+
+
+class Benchmark:
+    """
+    A named measurement. setup(size) prepares fixtures and returns the callable to time;
+    `number` calls are timed per sample so very fast paths are not dominated by timer overhead.
+    """
+
+    def __init__(self, name, setup, sizes=None, number=1):
+        self.name = name
+        self.setup = setup
+        self.sizes = sizes
+        self.number = number
+
+
+def _measure(fn, number, repeat):
+    fn() # Warm-up: fills ORM/compiled statement caches like a long-running worker would
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return _summary(samples, repeat, number)
+
+
+def _summary(samples, repeat, number=1):
+    samples = sorted(samples)
+    return {
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'max': samples[-1],
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+# Run in a fresh interpreter by measure_cold_start; reports its phases on one marked line
+_COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get('/health').status_code
+responded = time.perf_counter()
+from app.warmup import DEFERRED_IMPORTS
+print('COLD_START ' + json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_response': responded - started,
+    'status': status,
+    'deferred_loaded': sorted(name for name in DEFERRED_IMPORTS if name in sys.modules),
+}), flush=True)
+"""
+
+
+def measure_cold_start(database_url=None):
+    """
+    Starts a new Python process that imports the app, creates it and serves GET /health.
+    Returns the child's phase timings plus 'spawn_to_response': seconds from spawning the
+    process to the response, interpreter start-up included.
+    """
+    env = dict(os.environ)
+    if database_url:
+        env['DATABASE_URL'] = database_url
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', _COLD_START_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in child.stdout:
+            if line.startswith('COLD_START '):
+                result = json.loads(line[len('COLD_START '):])
+                result['spawn_to_response'] = time.perf_counter() - started
+                return result
+    finally:
+        child.stdout.close()
+        child.wait()
+    raise RuntimeError(f'Cold start child exited with status {child.returncode} before responding')
+
+
+def _cold_start_results(repeat, database_url=None):
+    runs = [measure_cold_start(database_url) for _ in range(repeat)]
+    return {
+        f'cold_start.{phase}': _summary([run[phase] for run in runs], repeat)
+        for phase in ('import', 'create_app', 'first_response', 'spawn_to_response')
+    }
+
+
+def _task_payload(size, fanout=4):
+    """Create/update payload of `size` tasks: a tree with fan-out `fanout` and a dependency chain."""
+    base = datetime.datetime(2026, 1, 1)
+    tasks = []
+    for i in range(size):
+        tasks.append({
+            'frontend_id': str(i),
+            'name': f'Task {i}',
+            'status': ['NOT_STARTED', 'IN_PROGRESS', 'COMPLETED'][i % 3],
+            'start_date': (base + datetime.timedelta(days=i % 365)).isoformat(),
+            'duration': 86400 * (1 + i % 5),
+            'parent_id': str((i - 1) // fanout) if i else None,
+            'dependencies': [{'depends_on_task_id': str(i - 1)}] if i > 1 and i % 3 else [],
+        })
+    return tasks
+
+
+class _Fixtures:
+    """Builds benchmark data with generate_dataset.py so runs are reproducible across machines."""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self._accounts = {}
+
+    def account(self, tasks_per_project=0, projects=0):
+        """Returns (user, account_id, headers) for a fresh generated account."""
+        from generate_dataset import generate, DbSink, _db_id_start
+        from app.models import User, UserAccount
+        from app.utils import generate_token
+
+        id_start = _db_id_start()
+        generate(DbSink(), SimpleNamespace(
+            seed=42, orgs=1, accounts_per_org=1, users_per_account=5, projects_per_account=projects,
+            tasks_per_project=tasks_per_project, max_depth=8, fanout=4, edge_density=1.2,
+            dependency_window=50, assignee_distribution='zipf', zipf_s=1.1, unassigned_fraction=0.2,
+            batch_size=10000, id_start=id_start,
+        ))
+        account_id = id_start['accounts']
+        membership = UserAccount.query.filter_by(account_id=account_id).first()
+        user = User.query.get(membership.user_id)
+        token = generate_token(user.id, user.email, self.app.config['SECRET_KEY'])
+        return user, account_id, {'Authorization': f'Bearer {token}'}, id_start['projects']
+
+    def project_template(self, size, fanout=4):
+        from app.models import ProjectTemplate, TaskTemplate, task_template_dependencies
+        from sqlalchemy import func
+
+        template = ProjectTemplate(name=f'Benchmark template {size} {time.time_ns()}')
+        self.db.session.add(template)
+        self.db.session.flush()
+        first_id = (self.db.session.query(func.max(TaskTemplate.id)).scalar() or 0) + 1
+        rows = [{
+            'id': first_id + i,
+            'name': f'Template task {i}',
+            'duration': 86400,
+            'project_template_id': template.id,
+            'parent_id': first_id + (i - 1) // fanout if i else None,
+        } for i in range(size)]
+        self.db.session.execute(TaskTemplate.__table__.insert(), rows)
+        edges = [{'task_template_id': first_id + i, 'depends_on_task_template_id': first_id + i - 1}
+                 for i in range(2, size) if i % 3]
+        if edges:
+            self.db.session.execute(task_template_dependencies.insert(), edges)
+        self.db.session.commit()
+        return template.id
+
+
+def _benchmarks(app, db, fixtures, client):
+    from flask import request
+    from app.utils import token_required
+    from app.models import Project
+    from app.routes.projects_routes import _render_project
+
+    def token_required_setup(size):
+        user, account_id, headers, _ = fixtures.account()
+        endpoint = token_required(lambda current_user: None)
+
+        def run():
+            with app.test_request_context('/', headers=headers):
+                endpoint()
+        return run
+
+    def get_project_setup(size):
+        _, _, _, project_id = fixtures.account(tasks_per_project=size, projects=1)
+
+        def run():
+            with app.test_request_context('/'):
+                project = Project.query.get(project_id)
+                body, status = _render_project(project, request.args)
+                assert status == 200
+            db.session.remove()
+        return run
+
+    def create_project_setup(size):
+        _, account_id, headers, _ = fixtures.account()
+        body = json.dumps({'name': f'Benchmark {size}', 'account_id': account_id, 'tasks': _task_payload(size)})
+
+        def run():
+            response = client.post('/api/v1/projects', data=body, content_type='application/json', headers=headers)
+            assert response.status_code == 201, response.get_data(as_text=True)[:200]
+        return run
+
+    def update_project_setup(size):
+        _, account_id, headers, _ = fixtures.account()
+        body = json.dumps({'name': f'Benchmark {size}', 'account_id': account_id, 'tasks': _task_payload(size)})
+        created = client.post('/api/v1/projects', data=body, content_type='application/json', headers=headers)
+        project_id = created.get_json()['project']['id']
+
+        def run():
+            response = client.put(f'/api/v1/projects/{project_id}', data=body, content_type='application/json', headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)[:200]
+        return run
+
+    def template_detail_setup(size):
+        _, _, headers, _ = fixtures.account()
+        template_id = fixtures.project_template(size)
+
+        def run():
+            response = client.get(f'/api/v1/project-templates/{template_id}', headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)[:200]
+        return run
+
+    def grade_answers_setup(size):
+        # Pure in-memory grading; runs even where the learning models are not deployed.
+        from app.rules_engine import _grade_answers
+        questions = {
+            question_id: SimpleNamespace(id=question_id, correct_answer=1, wrong_answer_1='a', wrong_answer_2='b')
+            for question_id in range(1, size + 1)
+        }
+        answers = [{'question_id': question_id, 'selected_answer': 'a' if question_id % 4 else 'b'}
+                   for question_id in questions]
+        return lambda: _grade_answers(answers, questions)
+
+    def submit_test_setup(size):
+        from app import models
+        from app.rules_engine import submit_test
+        if not hasattr(models, 'TestQuestion'):
+            raise _Skip('TestQuestion and the other grading models are not defined in app/models.py')
+        questions = models.TestQuestion.query.limit(size).all()
+        if len(questions) < size:
+            raise _Skip(f'needs {size} seeded test questions, found {len(questions)}')
+        user, _, _, _ = fixtures.account()
+        answers = [{'question_id': question.id, 'selected_answer': getattr(question, 'wrong_answer_1', None) or 'x'}
+                   for question in questions]
+
+        def run():
+            with app.test_request_context('/'):
+                result, status = submit_test(db.session.merge(user), answers, db)
+                assert status == 200, result
+        return run
+
+    return [
+        Benchmark('token_required', token_required_setup, number=200),
+        Benchmark('get_project.render', get_project_setup, sizes=True),
+        Benchmark('create_project', create_project_setup, sizes=True),
+        Benchmark('update_project', update_project_setup, sizes=True),
+        Benchmark('template_detail', template_detail_setup, sizes=True),
+        Benchmark('submit_test.grade', grade_answers_setup, sizes=[50], number=100),
+        Benchmark('submit_test', submit_test_setup, sizes=[50]),
+    ]
+
+
+class _Skip(Exception):
+    pass
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, only=None, database_url=None):
+    """Runs every benchmark and returns the results document (see compare_results)."""
+    if database_url:
+        os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db'))
+
+    # Imported after DATABASE_URL is set: config.py reads it at import time.
+    from app import create_app, db
+    app = create_app()
+    results = {}
+    with app.app_context():
+        db.create_all()
+        fixtures = _Fixtures(app, db)
+        client = app.test_client()
+        for benchmark in _benchmarks(app, db, fixtures, client):
+            if only and not any(benchmark.name.startswith(prefix) for prefix in only):
+                continue
+            benchmark_sizes = sizes if benchmark.sizes is True else (benchmark.sizes or [None])
+            for size in benchmark_sizes:
+                name = benchmark.name if size is None else f'{benchmark.name}[{size}]'
+                try:
+                    fn = benchmark.setup(size)
+                    results[name] = _measure(fn, benchmark.number, repeat)
+                    print(f"{name:<32} median {results[name]['median'] * 1000:10.3f} ms")
+                except _Skip as e:
+                    results[name] = {'skipped': str(e)}
+                    print(f"{name:<32} skipped: {e}")
+                finally:
+                    db.session.remove()
+        dialect = db.engine.dialect.name
+
+    if not only or any('cold_start'.startswith(prefix) or prefix.startswith('cold_start') for prefix in only):
+        for name, result in _cold_start_results(repeat).items():
+            results[name] = result
+            print(f"{name:<32} median {result['median'] * 1000:10.3f} ms")
+
+    return {'meta': _metadata(dialect, repeat), 'results': results}
+
+
+def _metadata(dialect, repeat):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': dialect,
+        'repeat': repeat,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the median of every benchmark present in both documents.
+    :return: list of (name, baseline_median, current_median, ratio, regressed) tuples
+    """
+    rows = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous or 'median' not in previous or 'median' not in result:
+            continue
+        ratio = result['median'] / previous['median'] if previous['median'] else float('inf')
+        rows.append((name, previous['median'], result['median'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _print_comparison(rows, threshold):
+    print(f"\n{'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for name, previous, current, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<32} {previous * 1000:12.3f} {current * 1000:12.3f} {(ratio - 1) * 100:+8.1f}%{flag}")
+    regressions = [row for row in rows if row[4]]
+    print(f"\n{len(regressions)} regression(s) above {threshold * 100:.0f}%")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the hot-path microbenchmarks and the cold-start benchmark.')
+    parser.add_argument('--database-url', type=str, help='Scratch database to benchmark against (default: a temporary SQLite file).')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)), help='Task counts for the size-dependent benchmarks.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed samples per benchmark.')
+    parser.add_argument('--only', type=str, help='Comma-separated benchmark name prefixes to run.')
+    parser.add_argument('--output', type=str, default='bench_results.json', help='Where to write the JSON results.')
+    parser.add_argument('--compare', type=str, help='Baseline results JSON to compare against.')
+    parser.add_argument('--current', type=str, help='Compare this results JSON with --compare instead of running.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Slowdown ratio flagged as a regression (0.10 = 10%%).')
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(
+            sizes=[int(size) for size in args.sizes.split(',') if size],
+            repeat=args.repeat,
+            only=args.only.split(',') if args.only else None,
+            database_url=args.database_url,
+        )
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if _print_comparison(compare_results(baseline, current, args.threshold), args.threshold):
+            sys.exit(1)
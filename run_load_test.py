@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from types import SimpleNamespace
+import numpy as np
+
+# Scenario name -> relative weight. Override with --mix "open_project=5,edit_tasks=1".
+DEFAULT_MIX = {
+    'login': 1,
+    'list_projects': 4,
+    'open_project': 4,
+    'edit_tasks': 1,
+    'fetch_templates': 2,
+}
+FAKE_GOOGLE_TOKEN_PREFIX = 'loadtest:'
+
+
+def _fake_verify_token(token):
+    """Stands in for GoogleAuthService.verify_token: 'loadtest:<email>' is accepted as that user."""
+    if not token.startswith(FAKE_GOOGLE_TOKEN_PREFIX):
+        raise ValueError("Invalid Google token.")
+    email = token[len(FAKE_GOOGLE_TOKEN_PREFIX):]
+    return {'email': email, 'name': email.split('@')[0]}
+
+
+def create_load_test_app():
+    """
+    App factory used by both the in-process server and gunicorn workers
+    (gunicorn "run_load_test:create_load_test_app()"). Google token verification is mocked
+    so the login scenario needs no network access.
+    """
+    from app import create_app, db
+    from app.google_auth_service import GoogleAuthService
+
+    GoogleAuthService.verify_token = staticmethod(_fake_verify_token)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def prepare_dataset(app, users, projects, tasks_per_project, templates, template_size):
+    """Generates the load test account once; returns (account_id, user emails)."""
+    from app import db
+    from app.models import Account, User, UserAccount, ProjectTemplate, TaskTemplate
+    from generate_dataset import generate, DbSink, _db_id_start
+
+    with app.app_context():
+        account = Account.query.filter(Account.name.like('Perf Account %')).order_by(Account.id).first()
+        if account is None:
+            id_start = _db_id_start()
+            generate(DbSink(), SimpleNamespace(
+                seed=42, orgs=1, accounts_per_org=1, users_per_account=users, projects_per_account=projects,
+                tasks_per_project=tasks_per_project, max_depth=6, fanout=4, edge_density=1.0,
+                dependency_window=30, assignee_distribution='zipf', zipf_s=1.1, unassigned_fraction=0.2,
+                batch_size=10000, id_start=id_start,
+            ))
+            account = Account.query.get(id_start['accounts'])
+
+        if ProjectTemplate.query.count() < templates:
+            for index in range(templates):
+                template = ProjectTemplate(name=f'Load test template {index} {time.time_ns()}')
+                db.session.add(template)
+                db.session.flush()
+                parents = []
+                for position in range(template_size):
+                    task = TaskTemplate(
+                        name=f'Template task {position}', duration=86400, project_template_id=template.id,
+                        parent_id=parents[(position - 1) // 4].id if position else None
+                    )
+                    db.session.add(task)
+                    db.session.flush()
+                    parents.append(task)
+            db.session.commit()
+
+        emails = [user.email for user in User.query.join(UserAccount, UserAccount.user_id == User.id)
+                  .filter(UserAccount.account_id == account.id).order_by(User.id).all()]
+        return account.id, emails
+
+
+class _Stats:
+    """Thread-safe per-endpoint latency and status recorder."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            statuses = self.statuses.setdefault(endpoint, {})
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 'error' or status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        all_latencies = []
+        for endpoint, latencies in sorted(self.latencies.items()):
+            all_latencies.extend(latencies)
+            endpoints[endpoint] = _summarize(latencies, self.errors.get(endpoint, 0), elapsed)
+            endpoints[endpoint]['statuses'] = {str(status): count for status, count in self.statuses[endpoint].items()}
+        return {
+            'elapsed_seconds': elapsed,
+            'total': _summarize(all_latencies, sum(self.errors.values()), elapsed),
+            'endpoints': endpoints,
+        }
+
+
+def _summarize(latencies, errors, elapsed):
+    if not latencies:
+        return {'requests': 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed,
+        'error_rate': errors / len(latencies),
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'max_ms': max(latencies) * 1000,
+    }
+
+
+class VirtualUser:
+    """One simulated client: logs in, then runs weighted scenarios until the deadline."""
+
+    def __init__(self, host, port, email, account_id, stats, mix, rng):
+        self.host = host
+        self.port = port
+        self.email = email
+        self.account_id = account_id
+        self.stats = stats
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.rng = rng
+        self.token = None
+        self.project_ids = []
+
+    def request(self, method, path, endpoint, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        started = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            self.stats.record(endpoint, time.perf_counter() - started, 'error')
+            return None, None
+        self.stats.record(endpoint, time.perf_counter() - started, response.status)
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def login(self):
+        status, data = self.request('POST', '/api/v1/auth/google', 'POST /auth/google',
+                                    {'token': FAKE_GOOGLE_TOKEN_PREFIX + self.email})
+        if status == 200:
+            self.token = data['token']
+
+    def list_projects(self):
+        status, data = self.request('GET', f'/api/v1/projects?account_id={self.account_id}', 'GET /projects')
+        if status == 200 and data:
+            self.project_ids = [project['id'] for project in data]
+
+    def open_project(self):
+        if not self.project_ids:
+            return self.list_projects()
+        project_id = self.rng.choice(self.project_ids)
+        return self.request('GET', f'/api/v1/projects/{project_id}', 'GET /projects/<id>')
+
+    def edit_tasks(self):
+        # Read-modify-write like the Gantt editor: shift a few tasks and save the whole plan.
+        if not self.project_ids:
+            return self.list_projects()
+        project_id = self.rng.choice(self.project_ids)
+        status, project = self.request('GET', f'/api/v1/projects/{project_id}', 'GET /projects/<id>')
+        if status != 200 or not project:
+            return
+        tasks = []
+        for task in project['tasks']:
+            tasks.append({
+                'frontend_id': str(task['id']),
+                'name': task['name'],
+                'status': task['status'],
+                'start_date': task['startDate'],
+                'duration': task['duration'] + (86400 if self.rng.random() < 0.05 else 0),
+                'parent_id': str(task['parentId']) if task['parentId'] else None,
+                'dependencies': [{'depends_on_task_id': str(dependency_id)} for dependency_id in task['dependencyIds']],
+            })
+        self.request('PUT', f'/api/v1/projects/{project_id}', 'PUT /projects/<id>',
+                     {'name': project['name'], 'tasks': tasks})
+
+    def fetch_templates(self):
+        status, templates = self.request('GET', '/api/v1/project-templates', 'GET /project-templates')
+        if status == 200 and templates:
+            template_id = self.rng.choice(templates)['id']
+            self.request('GET', f'/api/v1/project-templates/{template_id}', 'GET /project-templates/<id>')
+
+    def run(self, deadline):
+        self.login()
+        self.list_projects()
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(self.scenarios, weights=self.weights)[0]
+            getattr(self, scenario)()
+
+
+class _InProcessServer:
+    """Serves the app from a background thread with werkzeug's threaded WSGI server."""
+
+    def __init__(self, app, port):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.WARNING) # No per-request access log lines
+        self.server = make_server('127.0.0.1', port, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+
+
+class _GunicornServer:
+    """Runs gunicorn locally so worker counts and worker classes can be compared."""
+
+    def __init__(self, port, workers, worker_class, threads):
+        self.port = port
+        self.command = [
+            sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--worker-class', worker_class, '--threads', str(threads),
+            '--log-level', 'warning', 'run_load_test:create_load_test_app()',
+        ]
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, cwd=os.path.dirname(os.path.abspath(__file__)))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+            try:
+                connection.request('GET', '/health')
+                if connection.getresponse().status == 200:
+                    return self
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            # Not listening yet, or still warming up (e.g. answering 500)
+            time.sleep(0.2)
+        self.process.terminate()
+        raise RuntimeError('gunicorn did not become healthy within 30s')
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def run_load_test(args):
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'load.db'))
+    app = create_load_test_app()
+    account_id, emails = prepare_dataset(
+        app, users=max(args.concurrency, 2), projects=args.projects, tasks_per_project=args.tasks_per_project,
+        templates=args.templates, template_size=args.template_size
+    )
+
+    if args.server == 'gunicorn':
+        server = _GunicornServer(args.port or 8099, args.workers, args.worker_class, args.threads)
+    else:
+        server = _InProcessServer(app, args.port)
+
+    stats = _Stats()
+    with server:
+        deadline = time.monotonic() + args.duration
+        users = [
+            VirtualUser('127.0.0.1', server.port, emails[index % len(emails)], account_id, stats,
+                        args.mix, random.Random(args.seed + index))
+            for index in range(args.concurrency)
+        ]
+        threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+    report = stats.report(elapsed)
+    report['config'] = {
+        'server': args.server, 'workers': args.workers, 'worker_class': args.worker_class, 'threads': args.threads,
+        'concurrency': args.concurrency, 'duration': args.duration, 'mix': args.mix,
+        'projects': args.projects, 'tasks_per_project': args.tasks_per_project,
+    }
+    return report
+
+
+def _print_report(report):
+    print(f"\n{'endpoint':<30} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for endpoint, summary in rows:
+        if not summary['requests']:
+            continue
+        print(f"{endpoint:<30} {summary['requests']:>7} {summary['throughput_rps']:>8.1f} "
+              f"{summary['error_rate'] * 100:>6.2f} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}")
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'. Choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive the API over HTTP with a realistic request mix.')
+    parser.add_argument('--server', choices=['inprocess', 'gunicorn'], default='inprocess')
+    parser.add_argument('--port', type=int, default=0, help='Port to serve on (0 picks a free port in-process).')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers.')
+    parser.add_argument('--worker-class', type=str, default='sync', help='gunicorn worker class (sync, gthread, gevent, ...).')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker (gthread).')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to generate load for.')
+    parser.add_argument('--mix', type=_parse_mix, default=dict(DEFAULT_MIX), help='Scenario weights, e.g. "open_project=5,edit_tasks=1".')
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--tasks-per-project', type=int, default=200)
+    parser.add_argument('--templates', type=int, default=5)
+    parser.add_argument('--template-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=str, help='Also write the report as JSON to this path.')
+    args = parser.parse_args()
+
+    report = run_load_test(args)
+    _print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
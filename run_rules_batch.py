@@ -0,0 +1,63 @@
+import argparse
+import time
+from app import create_app, db
+from app.models import User
+from app.rules_engine import COMPILED_RULES
+
+def run_rule_batch(rule_name, batch_size=1000, apply=False):
+    """
+    Evaluates a declarative rule for every user, batch by batch, for nightly recomputation.
+    Users sharing the same rule snapshot are decided once per batch.
+    By default only reports the transitions; apply=True applies and commits them. Only rules
+    marked 'batch': True in app/rule_definitions.py can be run.
+    """
+    app = create_app()
+    with app.app_context():
+        rule = COMPILED_RULES.get(rule_name)
+        if not rule:
+            print(f"Rule '{rule_name}' not found. Available: {', '.join(sorted(COMPILED_RULES))}")
+            return
+        if not rule.batch:
+            batch_rules = sorted(name for name, compiled_rule in COMPILED_RULES.items() if compiled_rule.batch)
+            print(f"Rule '{rule_name}' is not marked 'batch': True and only runs per request. "
+                  f"Batch rules: {', '.join(batch_rules) or 'none'}")
+            return
+
+        started = time.perf_counter()
+        totals = {}
+        processed = 0
+        last_id = 0
+        while True:
+            # Keyset pagination keeps each batch query cheap regardless of table size.
+            users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+            if not users:
+                break
+            last_id = users[-1].id
+
+            if not apply:
+                applied = {}
+                for name in rule.evaluate_batch(users):
+                    if name:
+                        applied[name] = applied.get(name, 0) + 1
+            else:
+                applied = rule.apply_batch(users, db)
+                db.session.commit()
+
+            for name, count in applied.items():
+                totals[name] = totals.get(name, 0) + count
+            processed += len(users)
+            db.session.expunge_all()
+
+        elapsed = time.perf_counter() - started
+        print(f"Evaluated rule '{rule_name}' for {processed} users in {elapsed:.2f}s")
+        for name, count in sorted(totals.items()):
+            print(f"  {name}: {count}{'' if apply else ' (dry run)'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate a declarative rule across all users.')
+    parser.add_argument('rule_name', type=str, help='Name of the rule in app/rule_definitions.py.')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Users loaded and committed per batch.')
+    parser.add_argument('--apply', action='store_true', help='Apply and commit the transitions; without it they are only reported.')
+    args = parser.parse_args()
+    run_rule_batch(args.rule_name, batch_size=args.batch_size, apply=args.apply)
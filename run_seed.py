@@ -1,13 +1,151 @@
 import os
-import pandas as pd
+import csv
+import time
 import argparse
 import datetime # Import datetime
-from sqlalchemy import text
+import numpy as np
+from sqlalchemy import text, bindparam, select, func
 from app import create_app, db
-from app.models import Organization, AuthCode, Account, User,ProjectTemplate, TaskTemplate # Import necessary models
+from app.models import Organization, AuthCode, Account, User, UserAccount, Project, Task, task_dependencies, AuthSourceEnum, TaskStatusEnum, ProjectTemplate, TaskTemplate, task_template_dependencies # Import necessary models
 #insert into organizations values (1,'org1','address1',null)
-def seed_data(delete=False):
-    """Seeds the database with data from CSV files."""
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _iter_batches(path, batch_size):
+    """
+    Streams a CSV file as lists of row dictionaries, batch_size rows at a time,
+    so memory use does not depend on the size of the file.
+    Completely blank rows are skipped and surrounding whitespace is stripped.
+    """
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        reader = csv.DictReader(csv_file, skipinitialspace=True)
+        batch = []
+        for row in reader:
+            row = {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+            if not any(row.values()):
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _to_int(value):
+    """Parses an integer column; blank values become None. Accepts '3.0' as written by pandas."""
+    if value is None or value == '':
+        return None
+    return int(float(value))
+
+
+def _insert_rows(table, rows):
+    # A Core insert with a list of parameter sets runs as a single executemany.
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def _load_ids(column):
+    """Preloads the full set of existing keys once so foreign keys can be validated in memory."""
+    return {row[0] for row in db.session.query(column).all()}
+
+
+def _load_id_array(column):
+    """
+    Preloads keys as a sorted numpy array (8 bytes per key) for tables too large for a set,
+    such as tasks in generated datasets.
+    """
+    ids = db.session.execute(select(column).order_by(column).execution_options(yield_per=100000)).scalars()
+    return np.fromiter(ids, dtype=np.int64)
+
+
+def _contains(sorted_ids, value):
+    position = np.searchsorted(sorted_ids, value)
+    return position < len(sorted_ids) and sorted_ids[position] == value
+
+
+def _sync_identity(table):
+    """
+    Moves the table's identity counter past the highest id, so rows the application
+    creates after a seed with explicit ids do not collide with them.
+    SQLite always continues from the highest rowid and needs nothing.
+    """
+    max_id = db.session.execute(select(func.max(table.c.id))).scalar()
+    if max_id is None:
+        return
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        db.session.execute(text(f'ALTER TABLE {table.name} AUTO_INCREMENT = {max_id + 1}'))
+    elif dialect == 'postgresql':
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), {max_id})"))
+
+
+def _optional_id(row):
+    """
+    The id column of the base seed files is optional: without it the database assigns ids
+    in file order. A file must fill it for every row or for none, as each batch is one executemany.
+    """
+    row_id = _to_int(row.get('id'))
+    return {} if row_id is None else {'id': row_id}
+
+
+def _to_datetime(value):
+    """Parses an ISO-8601 column as written by generate_dataset.py; blank values become None."""
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+class _SeedReport:
+    def __init__(self, label):
+        self.label = label
+        self.inserted = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+    def skip(self, message):
+        # Only the first few problems are printed; the total is reported at the end.
+        if self.skipped < 10:
+            print(f"Skipping {self.label}: {message}")
+        self.skipped += 1
+
+    def finish(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(f"Seeded {self.inserted} {self.label} ({self.skipped} skipped) in {elapsed:.2f}s "
+              f"({self.inserted / elapsed:,.0f} rows/s)")
+
+
+def _seed_table(path, table, batch_size, label, build_row):
+    """
+    Generic streaming seeder: build_row(row, report) returns the insert parameters
+    for a CSV row, or None after calling report.skip(...) for an invalid row.
+    Each batch is inserted with one executemany and committed. When rows carry explicit
+    ids the table's identity counter is moved past them afterwards.
+    """
+    report = _SeedReport(label)
+    explicit_ids = False
+    for batch in _iter_batches(path, batch_size):
+        rows = []
+        for row in batch:
+            values = build_row(row, report)
+            if values is not None:
+                rows.append(values)
+        _insert_rows(table, rows)
+        db.session.commit()
+        report.inserted += len(rows)
+        explicit_ids = explicit_ids or any('id' in values for values in rows)
+    if explicit_ids:
+        _sync_identity(table)
+        db.session.commit()
+    report.finish()
+    return report
+
+
+def seed_data(delete=False, batch_size=DEFAULT_BATCH_SIZE, data_dir='seed/data'):
+    """
+    Seeds the database with data from CSV files.
+    Each table is only seeded while it is empty, so ids taken from a CSV cannot collide with
+    existing rows; use --delete to re-seed into a database that already holds data.
+    """
     app = create_app()
     with app.app_context():
         if delete:
@@ -15,6 +153,7 @@ def seed_data(delete=False):
             # For MySQL, we need to truncate tables one by one and disable foreign key checks.
             # TRUNCATE TABLE automatically resets the AUTO_INCREMENT counter in MySQL.
             table_names = [
+                'task_dependencies', 'tasks', 'projects',
                 'auth_codes', 'user_accounts', 'accounts', 'organizations', 'users'
             ] # Include tables in correct order for foreign key constraints
 
@@ -27,104 +166,116 @@ def seed_data(delete=False):
 
         # Seed Organizations
         if Organization.query.first() is None:
-            df = pd.read_csv('seed/data/organizations.csv', skipinitialspace=True)
-            for _, row in df.iterrows():
-                organization = Organization(
-                    name=row['name']
-                )
-                db.session.add(organization)
-            db.session.commit()
-            print("Seeded Organizations")
+            _seed_table(
+                os.path.join(data_dir, 'organizations.csv'), Organization.__table__, batch_size, 'Organizations',
+                lambda row, report: {**_optional_id(row), 'name': row['name']}
+            )
 
         # Seed Accounts
         if Account.query.first() is None:
-            df = pd.read_csv('seed/data/accounts.csv', skipinitialspace=True)
-            df.dropna(how='all', inplace=True) # Remove empty rows
-            for _, row in df.iterrows():
-                organization = Organization.query.get(row['organization_id'])
-                if organization:
-                    account = Account(
-                        name=row['name'],
-                        organization_id=row['organization_id']
-                    )
-                    db.session.add(account)
-                else:
-                    print(f"Skipping Account {row['name']}: Organization with ID {row['organization_id']} not found.")
-            db.session.commit()
-            print("Seeded Accounts")
+            organization_ids = _load_ids(Organization.id)
+
+            def build_account(row, report):
+                organization_id = _to_int(row.get('organization_id'))
+                if organization_id not in organization_ids:
+                    report.skip(f"Account {row.get('name')}: Organization with ID {organization_id} not found.")
+                    return None
+                return {**_optional_id(row), 'name': row['name'], 'organization_id': organization_id}
+
+            _seed_table(os.path.join(data_dir, 'accounts.csv'), Account.__table__, batch_size, 'Accounts', build_account)
 
         # Seed Auth Codes
         if AuthCode.query.first() is None:
-            df = pd.read_csv('seed/data/auth_codes.csv') # Corrected filename
-            for _, row in df.iterrows():
-                # Ensure account exists
-                account = Account.query.get(row['account_id'])
-                if account:
-                    auth_code = AuthCode(
-                        authcode=row['auth_code'], # Corrected column name
-                        account_id=row['account_id'],
-                        role=row['role'],
-                        expires_at=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24) # Always set default expiry
-                    )
-                    db.session.add(auth_code)
-                else:
-                    print(f"Skipping AuthCode {row['auth_code']}: Account with ID {row['account_id']} not found.")
-            db.session.commit()
-            print("Seeded Auth Codes")
-            
+            account_ids = _load_ids(Account.id)
+            now = datetime.datetime.now(datetime.timezone.utc)
 
-        if ProjectTemplate.query.first() is  None:
-            
+            def build_auth_code(row, report):
+                account_id = _to_int(row.get('account_id'))
+                if account_id not in account_ids:
+                    report.skip(f"AuthCode {row.get('auth_code')}: Account with ID {account_id} not found.")
+                    return None
+                return {
+                    'authcode': row['auth_code'], # Corrected column name
+                    'account_id': account_id,
+                    'role': row['role'],
+                    'created_at': now,
+                    'expires_at': now + datetime.timedelta(hours=24) # Always set default expiry
+                }
+
+            _seed_table(os.path.join(data_dir, 'auth_codes.csv'), AuthCode.__table__, batch_size, 'Auth Codes', build_auth_code)
+
+        # Users, memberships, projects and tasks are optional: they are only present in
+        # datasets written by generate_dataset.py --output csv.
+        _seed_generated(data_dir, batch_size)
 
+        if ProjectTemplate.query.first() is  None:
             print("Seeding project templates from CSVs...")
+            templates_dir = os.path.join(data_dir, 'templates')
             try:
                 # 1. Seed Project Templates
-                df_projects = pd.read_csv('seed/data/templates/project_templates.csv')
-                for _, row in df_projects.iterrows():
-                    project_template = ProjectTemplate(
-                        id=row['id'],
-                        name=row['name'],
-                        description=row['description']
-                    )
-                    db.session.add(project_template)
-                db.session.commit()
-                print(f"Seeded {len(df_projects)} Project Templates")
-
-                # 2. Seed Task Templates
-                df_tasks = pd.read_csv('seed/data/templates/task_templates.csv')
-                print("read seed/data/templates/task_templates.csv")
-                # Replace blank parent_id with None (for SQLAlchemy)
-                df_tasks['parent_id'] = df_tasks['parent_id'].astype('Int64').where(pd.notna(df_tasks['parent_id']), None)
-                
-                for _, row in df_tasks.iterrows():
+                _seed_table(
+                    os.path.join(templates_dir, 'project_templates.csv'), ProjectTemplate.__table__, batch_size,
+                    'Project Templates',
+                    lambda row, report: {'id': _to_int(row['id']), 'name': row['name'], 'description': row.get('description') or None}
+                )
+
+                # 2. Seed Task Templates. Rows are inserted without parents first, so a child may
+                # appear before its parent in the file; parent links are applied afterwards.
+                project_template_ids = _load_ids(ProjectTemplate.id)
+                parent_links = [] # (task template id, parent id) pairs, two ints per row
+
+                def build_task_template(row, report):
+                    project_template_id = _to_int(row.get('project_template_id'))
+                    if project_template_id not in project_template_ids:
+                        report.skip(f"Task Template {row.get('id')}: Project Template with ID {project_template_id} not found.")
+                        return None
+                    task_template_id = _to_int(row['id'])
+                    parent_id = _to_int(row.get('parent_id'))
+                    if parent_id is not None:
+                        parent_links.append((task_template_id, parent_id))
                     # Handle duration for parent tasks (which may be blank in the CSV)
-                    duration_days = row['duration_days'] if pd.notna(row['duration_days']) else 0
-                    parent_id_value = row['parent_id'] if pd.notna(row['parent_id']) else None
-                    task_template = TaskTemplate(
-                        id=row['id'],
-                        project_template_id=row['project_template_id'],
-                        name=row['name'],
-                        duration=int(duration_days * 86400), # Convert days to seconds
-                        parent_id=parent_id_value
-                    )
-                    db.session.add(task_template)
-                db.session.commit()
-                print(f"Seeded {len(df_tasks)} Task Templates")
-
-                # 3. Seed Dependencies
-                df_deps = pd.read_csv('seed/data/templates/task_template_dependencies.csv')
-                for _, row in df_deps.iterrows():
-                    # Find the actual TaskTemplate objects
-                    task = TaskTemplate.query.get(row['task_template_id'])
-                    depends_on_task = TaskTemplate.query.get(row['depends_on_task_template_id'])
-                    
-                    if task and depends_on_task:
-                        task.dependencies.append(depends_on_task)
-                    else:
-                        print(f"Warning: Could not create dependency for task_id {row['task_template_id']}. Task or dependency not found.")
-                
-                db.session.commit()
-                print(f"Seeded {len(df_deps)} Template Dependencies")
+                    duration_days = float(row['duration_days']) if row.get('duration_days') else 0
+                    return {
+                        'id': task_template_id,
+                        'project_template_id': project_template_id,
+                        'name': row['name'],
+                        'duration': int(duration_days * 86400), # Convert days to seconds
+                        'parent_id': None
+                    }
+
+                _seed_table(
+                    os.path.join(templates_dir, 'task_templates.csv'), TaskTemplate.__table__, batch_size,
+                    'Task Templates', build_task_template
+                )
+
+                task_template_ids = _load_ids(TaskTemplate.id)
+                link_parent = TaskTemplate.__table__.update().where(
+                    TaskTemplate.__table__.c.id == bindparam('b_id')
+                ).values(parent_id=bindparam('b_parent_id'))
+                valid_links = [
+                    {'b_id': task_id, 'b_parent_id': parent_id}
+                    for task_id, parent_id in parent_links if parent_id in task_template_ids
+                ]
+                if len(valid_links) < len(parent_links):
+                    print(f"Warning: {len(parent_links) - len(valid_links)} Task Templates reference a missing parent and were left top-level.")
+                for start in range(0, len(valid_links), batch_size):
+                    db.session.execute(link_parent, valid_links[start:start + batch_size])
+                    db.session.commit()
+                print(f"Linked {len(valid_links)} Task Template parents")
+
+                # 3. Seed Dependencies, validated against the preloaded task template ids
+                def build_dependency(row, report):
+                    task_id = _to_int(row.get('task_template_id'))
+                    depends_on_id = _to_int(row.get('depends_on_task_template_id'))
+                    if task_id not in task_template_ids or depends_on_id not in task_template_ids:
+                        report.skip(f"dependency for task_id {task_id}. Task or dependency not found.")
+                        return None
+                    return {'task_template_id': task_id, 'depends_on_task_template_id': depends_on_id}
+
+                _seed_table(
+                    os.path.join(templates_dir, 'task_template_dependencies.csv'), task_template_dependencies,
+                    batch_size, 'Template Dependencies', build_dependency
+                )
 
             except FileNotFoundError as e:
                 print(f"Error seeding templates: Could not find a template CSV file. {e}")
@@ -133,8 +284,127 @@ def seed_data(delete=False):
                 print(f"An error occurred during template seeding: {e}")
 
 
+def _seed_generated(data_dir, batch_size):
+    """
+    Seeds the tables generate_dataset.py writes beyond the base seed data.
+    These files reference each other by id, so every row must carry an explicit id and the ids
+    are kept as written; organizations and accounts must then be seeded with their ids too.
+    """
+    path = lambda table: os.path.join(data_dir, f'{table}.csv')
+
+    if os.path.exists(path('users')) and User.query.first() is None:
+        organization_ids = _load_ids(Organization.id)
+
+        def build_user(row, report):
+            organization_id = _to_int(row.get('organization_id'))
+            if organization_id not in organization_ids:
+                report.skip(f"User {row.get('email')}: Organization with ID {organization_id} not found.")
+                return None
+            return {
+                'id': _to_int(row['id']),
+                'name': row.get('name') or None,
+                'email': row['email'],
+                'auth_source': AuthSourceEnum[row.get('auth_source') or 'LOCAL'],
+                'organization_id': organization_id,
+                'created_at': _to_datetime(row.get('created_at')),
+                'updated_at': _to_datetime(row.get('updated_at')),
+            }
+
+        _seed_table(path('users'), User.__table__, batch_size, 'Users', build_user)
+
+    if os.path.exists(path('user_accounts')) and UserAccount.query.first() is None:
+        user_ids = _load_ids(User.id)
+        account_ids = _load_ids(Account.id)
+
+        def build_user_account(row, report):
+            user_id = _to_int(row.get('user_id'))
+            account_id = _to_int(row.get('account_id'))
+            if user_id not in user_ids or account_id not in account_ids:
+                report.skip(f"membership of user {user_id} in account {account_id}. User or account not found.")
+                return None
+            return {'user_id': user_id, 'account_id': account_id, 'role': row.get('role') or 'viewer'}
+
+        _seed_table(path('user_accounts'), UserAccount.__table__, batch_size, 'User Accounts', build_user_account)
+
+    if os.path.exists(path('projects')) and Project.query.first() is None:
+        user_ids = _load_ids(User.id)
+        account_ids = _load_ids(Account.id)
+
+        def build_project(row, report):
+            account_id = _to_int(row.get('account_id'))
+            created_by = _to_int(row.get('created_by'))
+            if account_id not in account_ids or created_by not in user_ids:
+                report.skip(f"Project {row.get('id')}: Account {account_id} or creator {created_by} not found.")
+                return None
+            return {
+                'id': _to_int(row['id']),
+                'name': row['name'],
+                'description': row.get('description') or None,
+                'start_date': _to_datetime(row.get('start_date')),
+                'end_date': _to_datetime(row.get('end_date')),
+                'account_id': account_id,
+                'created_by': created_by,
+                'created_at': _to_datetime(row.get('created_at')),
+                'updated_at': _to_datetime(row.get('updated_at')),
+            }
+
+        _seed_table(path('projects'), Project.__table__, batch_size, 'Projects', build_project)
+
+    if os.path.exists(path('tasks')) and Task.query.first() is None:
+        user_ids = _load_ids(User.id)
+        project_ids = _load_ids(Project.id)
+        # Tasks are expected grouped by project with parents before children, as
+        # generate_dataset.py writes them, so only the current project's ids are kept.
+        current = {'project_id': None, 'task_ids': set()}
+
+        def build_task(row, report):
+            project_id = _to_int(row.get('project_id'))
+            if project_id not in project_ids:
+                report.skip(f"Task {row.get('id')}: Project with ID {project_id} not found.")
+                return None
+            if project_id != current['project_id']:
+                current['project_id'] = project_id
+                current['task_ids'] = set()
+            task_id = _to_int(row['id'])
+            parent_id = _to_int(row.get('parent_id'))
+            if parent_id is not None and parent_id not in current['task_ids']:
+                report.skip(f"Task {task_id}: parent {parent_id} not listed earlier in project {project_id}.")
+                return None
+            assigned_to = _to_int(row.get('assigned_to'))
+            current['task_ids'].add(task_id)
+            return {
+                'id': task_id,
+                'name': row['name'],
+                'status': TaskStatusEnum[row.get('status') or 'NOT_STARTED'],
+                'start_date': _to_datetime(row['start_date']),
+                'duration': _to_int(row.get('duration')) or 86400,
+                'project_id': project_id,
+                'assigned_to': assigned_to if assigned_to in user_ids else None,
+                'parent_id': parent_id,
+                'created_at': _to_datetime(row.get('created_at')),
+                'updated_at': _to_datetime(row.get('updated_at')),
+            }
+
+        _seed_table(path('tasks'), Task.__table__, batch_size, 'Tasks', build_task)
+
+    if os.path.exists(path('task_dependencies')) and db.session.execute(select(task_dependencies).limit(1)).first() is None:
+        task_ids = _load_id_array(Task.id)
+
+        def build_task_dependency(row, report):
+            task_id = _to_int(row.get('task_id'))
+            depends_on_id = _to_int(row.get('depends_on_task_id'))
+            if not _contains(task_ids, task_id) or not _contains(task_ids, depends_on_id):
+                report.skip(f"dependency for task_id {task_id}. Task or dependency not found.")
+                return None
+            return {'task_id': task_id, 'depends_on_task_id': depends_on_id}
+
+        _seed_table(path('task_dependencies'), task_dependencies, batch_size, 'Task Dependencies', build_task_dependency)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Seed the database.')
     parser.add_argument('--delete', action='store_true', help='Delete all data before seeding.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows read, inserted and committed per batch.')
+    parser.add_argument('--data-dir', type=str, default='seed/data', help='Directory holding the seed CSV files.')
     args = parser.parse_args()
-    seed_data(delete=args.delete)
\ No newline at end of file
+    seed_data(delete=args.delete, batch_size=args.batch_size, data_dir=args.data_dir)
@@ -0,0 +1,306 @@
+"""
+Account shard administration.
+
+    python run_shard_migration.py provision
+        Creates the tenant tables on every SHARD_URLS database and moves each shard's id
+        counters to the start of its range, so rows keep their ids when accounts move.
+
+    python run_shard_migration.py status
+
+    python run_shard_migration.py move --account 12 --to shard_2
+        Moves an account online. Its projects are copied while the account stays writable,
+        then re-copied until no project changed (change sequence and updated_at) during a
+        round. Then the account is frozen (writes refused) for the final round, switched to
+        the target in the directory and, once every worker has seen that, removed from the
+        source. Use --to default to move an account back to the default database.
+"""
+import time
+import argparse
+import datetime
+from flask import current_app
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Index, select, delete, update, func, text
+from app import create_app, db
+from app.models import AccountShard
+from app.sharding import TENANT_TABLES, DEFAULT_SHARD
+
+# Tenant tables with an autoincrement id, moved to the shard's id range by provision
+ID_TABLES = ('projects', 'tasks', 'project_changes', 'auth_codes')
+# Range of a signed 32-bit INTEGER id
+MAX_ID = 2 ** 31 - 1
+
+
+def tenant_metadata():
+    """Copies of the tenant tables without the foreign keys to tables that stay on the default database."""
+    metadata = MetaData()
+    for name in sorted(TENANT_TABLES):
+        source = db.metadata.tables[name]
+        columns = [Column(
+            column.name, column.type,
+            *[ForeignKey(fk.target_fullname) for fk in column.foreign_keys if fk.column.table.name in TENANT_TABLES],
+            primary_key=column.primary_key, nullable=column.nullable, unique=column.unique, autoincrement=column.autoincrement
+        ) for column in source.columns]
+        indexes = [Index(index.name, *[column.name for column in index.columns], unique=index.unique) for index in source.indexes]
+        # AUTOINCREMENT makes SQLite keep its id counter in sqlite_sequence, where provision can move it
+        Table(name, metadata, *columns, *indexes, sqlite_autoincrement=name in ID_TABLES)
+    return metadata
+
+
+def shard_keys():
+    return current_app.extensions['shards'].shard_keys
+
+
+def engine_for(shard):
+    return db.engines[None] if shard == DEFAULT_SHARD else db.engines[shard]
+
+
+def shard_id_start(shard, span):
+    """First id a shard hands out; the default database keeps its ids from 1."""
+    return 1 if shard == DEFAULT_SHARD else (shard_keys().index(shard) + 1) * span + 1
+
+
+def provision(span, log=print):
+    if (len(shard_keys()) + 1) * span > MAX_ID:
+        log(f'Warning: {len(shard_keys())} shards with SHARD_ID_SPAN={span} exceed 32-bit INTEGER ids.')
+    metadata = tenant_metadata()
+    for shard in shard_keys():
+        engine = engine_for(shard)
+        metadata.create_all(engine)
+        start = shard_id_start(shard, span)
+        with engine.begin() as connection:
+            for name in ID_TABLES:
+                table = metadata.tables[name]
+                if (connection.execute(select(func.max(table.c.id))).scalar() or 0) >= start:
+                    continue
+                if engine.dialect.name == 'sqlite':
+                    connection.execute(text('DELETE FROM sqlite_sequence WHERE name = :name'), {'name': name})
+                    connection.execute(text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+                                       {'name': name, 'seq': start - 1})
+                elif engine.dialect.name == 'mysql':
+                    connection.execute(text(f'ALTER TABLE {name} AUTO_INCREMENT = {start}'))
+                else:
+                    log(f'{shard}: cannot set the id counter of {name} on {engine.dialect.name}; set it to {start} by hand.')
+        log(f'{shard}: tenant tables ready, ids from {start}.')
+
+
+def status(log=print):
+    with db.engines[None].connect() as connection:
+        rows = connection.execute(select(AccountShard.account_id, AccountShard.shard, AccountShard.read_only)
+                                  .order_by(AccountShard.account_id)).all()
+    log(f'Shards: {", ".join([DEFAULT_SHARD] + shard_keys())}; accounts without a directory row are on {DEFAULT_SHARD}.')
+    for account_id, shard, read_only in rows:
+        log(f'account {account_id}: {shard}{" (read-only)" if read_only else ""}')
+
+
+def _directory_entry(account_id):
+    with db.engines[None].connect() as connection:
+        row = connection.execute(select(AccountShard.shard, AccountShard.read_only)
+                                 .where(AccountShard.account_id == account_id)).first()
+    return (row[0], bool(row[1])) if row else (DEFAULT_SHARD, False)
+
+
+def _set_directory(account_id, shard, read_only):
+    values = {'shard': shard, 'read_only': read_only, 'updated_at': datetime.datetime.now(datetime.timezone.utc)}
+    with db.engines[None].begin() as connection:
+        updated = connection.execute(update(AccountShard.__table__)
+                                     .where(AccountShard.account_id == account_id).values(**values)).rowcount
+        if not updated:
+            connection.execute(AccountShard.__table__.insert().values(account_id=account_id, **values))
+
+
+def _tables():
+    return {name: db.metadata.tables[name] for name in TENANT_TABLES}
+
+
+def _signatures(connection, account_id):
+    """project id -> (updated_at, change sequence): a project whose signature changed was written to."""
+    t = _tables()
+    rows = connection.execute(
+        select(t['projects'].c.id, t['projects'].c.updated_at, t['project_change_sequences'].c.seq)
+        .outerjoin(t['project_change_sequences'], t['project_change_sequences'].c.project_id == t['projects'].c.id)
+        .where(t['projects'].c.account_id == account_id)
+    ).all()
+    return {project_id: (str(updated_at), seq) for project_id, updated_at, seq in rows}
+
+
+def _parents_first(task_rows):
+    by_id = {row['id']: row for row in task_rows}
+    ordered, placed = [], set()
+
+    def place(row):
+        chain = []
+        while row is not None and row['id'] not in placed:
+            chain.append(row)
+            row = by_id.get(row['parent_id'])
+        for item in reversed(chain):
+            placed.add(item['id'])
+            ordered.append(item)
+
+    for row in task_rows:
+        place(row)
+    return ordered
+
+
+def _delete_project(connection, project_id):
+    t = _tables()
+    task_ids = select(t['tasks'].c.id).where(t['tasks'].c.project_id == project_id).scalar_subquery()
+    dependencies = t['task_dependencies']
+    connection.execute(delete(dependencies).where(dependencies.c.task_id.in_(task_ids) | dependencies.c.depends_on_task_id.in_(task_ids)))
+    connection.execute(delete(t['project_changes']).where(t['project_changes'].c.project_id == project_id))
+    connection.execute(delete(t['project_change_sequences']).where(t['project_change_sequences'].c.project_id == project_id))
+    # Detach children first so the self-referencing foreign key allows deleting in any order
+    connection.execute(update(t['tasks']).where(t['tasks'].c.project_id == project_id).values(parent_id=None))
+    connection.execute(delete(t['tasks']).where(t['tasks'].c.project_id == project_id))
+    connection.execute(delete(t['projects']).where(t['projects'].c.id == project_id))
+
+
+def _insert(connection, table, rows, batch_size):
+    for position in range(0, len(rows), batch_size):
+        connection.execute(table.insert(), rows[position:position + batch_size])
+
+
+def _copy_project(source, target, project_id, batch_size):
+    """Replaces the project's rows on target with those on source, from one source snapshot."""
+    t = _tables()
+    with source.begin() as reader, target.begin() as writer:
+        _delete_project(writer, project_id)
+        project = reader.execute(select(t['projects']).where(t['projects'].c.id == project_id)).mappings().first()
+        if project is None:
+            return
+        writer.execute(t['projects'].insert(), [dict(project)])
+        sequence = reader.execute(select(t['project_change_sequences'])
+                                  .where(t['project_change_sequences'].c.project_id == project_id)).mappings().all()
+        _insert(writer, t['project_change_sequences'], [dict(row) for row in sequence], batch_size)
+        tasks = [dict(row) for row in reader.execute(select(t['tasks']).where(t['tasks'].c.project_id == project_id)).mappings()]
+        _insert(writer, t['tasks'], _parents_first(tasks), batch_size)
+        dependencies = t['task_dependencies']
+        task_ids = select(t['tasks'].c.id).where(t['tasks'].c.project_id == project_id).scalar_subquery()
+        edges = reader.execute(select(dependencies).where(dependencies.c.task_id.in_(task_ids))).mappings().all()
+        _insert(writer, dependencies, [dict(row) for row in edges], batch_size)
+        changes = reader.execute(select(t['project_changes']).where(t['project_changes'].c.project_id == project_id)).mappings().all()
+        _insert(writer, t['project_changes'], [dict(row) for row in changes], batch_size)
+
+
+def _copy_auth_codes(source, target, account_id):
+    auth_codes = _tables()['auth_codes']
+    with source.connect() as reader, target.begin() as writer:
+        rows = [dict(row) for row in reader.execute(select(auth_codes).where(auth_codes.c.account_id == account_id)).mappings()]
+        writer.execute(delete(auth_codes).where(auth_codes.c.account_id == account_id))
+        if rows:
+            writer.execute(auth_codes.insert(), rows)
+
+
+def _sync_round(source, target, account_id, copied, batch_size):
+    """Copies projects created or changed since the last round and drops deleted ones; returns how many."""
+    with source.connect() as connection:
+        current = _signatures(connection, account_id)
+    changed = [project_id for project_id, signature in current.items() if copied.get(project_id) != signature]
+    removed = [project_id for project_id in copied if project_id not in current]
+    for project_id in changed:
+        # The signature was read before the copy, so a write racing the copy shows up next round
+        _copy_project(source, target, project_id, batch_size)
+        copied[project_id] = current[project_id]
+    for project_id in removed:
+        with target.begin() as writer:
+            _delete_project(writer, project_id)
+        del copied[project_id]
+    return len(changed) + len(removed)
+
+
+def account_row_counts(engine, account_id):
+    t = _tables()
+    project_ids = select(t['projects'].c.id).where(t['projects'].c.account_id == account_id).scalar_subquery()
+    task_ids = select(t['tasks'].c.id).where(t['tasks'].c.project_id.in_(project_ids)).scalar_subquery()
+    queries = {
+        'projects': select(func.count()).select_from(t['projects']).where(t['projects'].c.account_id == account_id),
+        'tasks': select(func.count()).select_from(t['tasks']).where(t['tasks'].c.project_id.in_(project_ids)),
+        'task_dependencies': select(func.count()).select_from(t['task_dependencies'])
+                             .where(t['task_dependencies'].c.task_id.in_(task_ids)),
+        'project_changes': select(func.count()).select_from(t['project_changes'])
+                           .where(t['project_changes'].c.project_id.in_(project_ids)),
+        'auth_codes': select(func.count()).select_from(t['auth_codes']).where(t['auth_codes'].c.account_id == account_id),
+    }
+    with engine.connect() as connection:
+        return {name: connection.execute(query).scalar() for name, query in queries.items()}
+
+
+def _delete_account(engine, account_id):
+    t = _tables()
+    with engine.begin() as connection:
+        project_ids = connection.execute(select(t['projects'].c.id).where(t['projects'].c.account_id == account_id)).scalars().all()
+        for project_id in project_ids:
+            _delete_project(connection, project_id)
+        connection.execute(delete(t['auth_codes']).where(t['auth_codes'].c.account_id == account_id))
+
+
+def move_account(account_id, target_shard, freeze_wait, batch_size=1000, max_rounds=5, keep_source=False, log=print):
+    if target_shard != DEFAULT_SHARD and target_shard not in shard_keys():
+        raise ValueError(f"Unknown shard '{target_shard}'; expected one of {', '.join([DEFAULT_SHARD] + shard_keys())}.")
+    source_shard, read_only = _directory_entry(account_id)
+    if read_only:
+        raise RuntimeError(f'Account {account_id} is read-only; another move may be running.')
+    if source_shard == target_shard:
+        log(f'Account {account_id} is already on {target_shard}.')
+        return
+    source, target = engine_for(source_shard), engine_for(target_shard)
+
+    # 1. Online copy, repeated until a round finds no project written meanwhile
+    copied = {}
+    for round_number in range(1, max_rounds + 1):
+        count = _sync_round(source, target, account_id, copied, batch_size)
+        log(f'Round {round_number}: copied or removed {count} projects.')
+        if count == 0:
+            break
+
+    # 2. Freeze writes, wait until every worker's directory cache has seen it, copy the rest
+    _set_directory(account_id, source_shard, read_only=True)
+    try:
+        log(f'Account {account_id} is read-only; waiting {freeze_wait}s for workers to notice.')
+        time.sleep(freeze_wait)
+        _sync_round(source, target, account_id, copied, batch_size)
+        _copy_auth_codes(source, target, account_id)
+        source_counts, target_counts = account_row_counts(source, account_id), account_row_counts(target, account_id)
+        if source_counts != target_counts:
+            raise RuntimeError(f'Row counts differ after the final copy: {source_counts} on {source_shard}, '
+                               f'{target_counts} on {target_shard}.')
+        # 3. Switch; workers still holding the old entry keep refusing writes until they reload
+        _set_directory(account_id, target_shard, read_only=False)
+    except BaseException:
+        _set_directory(account_id, source_shard, read_only=False)
+        raise
+    log(f'Account {account_id} now lives on {target_shard} ({target_counts}).')
+
+    if keep_source:
+        return
+    # 4. Old readers may use the source until their directory cache expires
+    time.sleep(freeze_wait)
+    _delete_account(source, account_id)
+    log(f'Removed account {account_id} from {source_shard}.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Provision shards and move accounts between them.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('provision', help='Create tenant tables and id ranges on every shard.')
+    subparsers.add_parser('status', help='List the accounts placed in the shard directory.')
+    move_parser = subparsers.add_parser('move', help='Move an account to another shard online.')
+    move_parser.add_argument('--account', type=int, required=True)
+    move_parser.add_argument('--to', required=True, help="Target shard, e.g. shard_2, or 'default'.")
+    move_parser.add_argument('--batch-size', type=int, default=1000)
+    move_parser.add_argument('--max-rounds', type=int, default=5, help='Online copy rounds before freezing writes.')
+    move_parser.add_argument('--freeze-wait', type=float, default=None,
+                             help='Seconds to wait for workers to see directory changes (default: SHARD_DIRECTORY_TTL + 5).')
+    move_parser.add_argument('--keep-source', action='store_true', help='Leave the copied rows on the source.')
+    args = parser.parse_args()
+
+    app = create_app()
+    if 'shards' not in app.extensions:
+        parser.error('SHARD_URLS is not configured.')
+    with app.app_context():
+        db.create_all(bind_key=None) # Makes sure account_shards exists on the default database
+        if args.command == 'provision':
+            provision(app.config['SHARD_ID_SPAN'])
+        elif args.command == 'status':
+            status()
+        else:
+            freeze_wait = args.freeze_wait if args.freeze_wait is not None else app.config['SHARD_DIRECTORY_TTL'] + 5
+            move_account(args.account, args.to, freeze_wait, args.batch_size, args.max_rounds, args.keep_source)
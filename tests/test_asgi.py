@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from app import db
+from app.asgi import AsgiApp, async_database_url
+from app import async_views
+from app.change_broker import init_change_broker
+from app.google_auth_service import GoogleAuthService
+from app.models import Organization, Account, User, UserAccount, ProjectTemplate, TaskTemplate
+from app.query_budget import QueryBudgetExceeded, init_query_budget
+from app.read_replicas import PRIMARY, ReplicaRouter
+from app.request_timing import init_request_timing
+from app.routes.auth_routes import auth_bp
+from app.routes.projects_routes import projects_bp, project_reads
+from app.routes.project_templates_routes import project_templates_bp
+from app.routes.events_routes import events_bp
+from app.transport import init_transport
+
+SECRET = 'asgi-test-secret-key-of-32-bytes!'
+
+
+class AsgiAppTestCase(unittest.IsolatedAsyncioTestCase):
+    """The ASGI app and the Flask test client share one SQLite file; their answers must match."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.flask_app = Flask(__name__)
+        self.flask_app.config.update(SECRET_KEY=SECRET, ASYNC_THREADPOOL_SIZE=4, SSE_HEARTBEAT_SECONDS=1,
+                                     SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.flask_app)
+        init_request_timing(self.flask_app)
+        init_transport(self.flask_app)
+        init_change_broker(self.flask_app, db)
+        self.flask_app.register_blueprint(auth_bp, url_prefix='/api/v1/auth')
+        self.flask_app.register_blueprint(events_bp, url_prefix='/api/v1')
+        self.flask_app.register_blueprint(projects_bp, url_prefix='/api/v1')
+        self.flask_app.register_blueprint(project_templates_bp, url_prefix='/api/v1')
+        with self.flask_app.app_context():
+            db.create_all()
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            account = Account(name='Acme', organization_id=organization.id)
+            user = User(email='pm@example.com', organization_id=organization.id)
+            user.set_password('correct horse')
+            db.session.add_all([account, user])
+            db.session.flush()
+            db.session.add(UserAccount(user_id=user.id, account_id=account.id, role='admin'))
+            template = ProjectTemplate(name='Launch', description='Go to market')
+            db.session.add(template)
+            db.session.flush()
+            phase = TaskTemplate(name='Plan', project_template_id=template.id)
+            db.session.add(phase)
+            db.session.flush()
+            db.session.add(TaskTemplate(name='Budget', project_template_id=template.id, parent_id=phase.id))
+            db.session.commit()
+            self.account_id, self.template_id = account.id, template.id
+        self.client = self.flask_app.test_client()
+        self.asgi = AsgiApp(self.flask_app)
+
+    async def asyncTearDown(self):
+        await self.asgi.database.dispose()
+        with self.flask_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        self.directory.cleanup()
+
+    async def call(self, method, path, query='', headers=None, body=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait() # The client never disconnects
+
+        async def send(message):
+            sent.append(message)
+
+        header_list = [(b'host', b'testserver')] + [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+        if body is not None:
+            header_list.append((b'content-type', b'application/json'))
+        await self.asgi({'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+                         'root_path': '', 'query_string': query.encode(), 'headers': header_list,
+                         'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}, receive, send)
+        status = sent[0]['status']
+        response_headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+        content = b''.join(message.get('body', b'') for message in sent[1:])
+        return status, response_headers, json.loads(content) if content else None
+
+    async def open_stream(self, path, headers):
+        """Starts a streamed request; returns the sent messages and a callable that disconnects the client."""
+        sent = []
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        disconnected = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        header_list = [(b'host', b'testserver')] + [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        task = asyncio.ensure_future(self.asgi({
+            'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': path, 'root_path': '',
+            'query_string': b'', 'headers': header_list, 'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)},
+            receive, send))
+
+        async def close():
+            disconnected.set()
+            await asyncio.wait_for(task, timeout=5)
+
+        return sent, close
+
+    async def login(self):
+        status, _, data = await self.call('POST', '/api/v1/auth/login',
+                                          body={'email': 'pm@example.com', 'password': 'correct horse'})
+        self.assertEqual(200, status, data)
+        return {'Authorization': f"Bearer {data['token']}"}
+
+    async def test_hot_endpoints_match_the_flask_views(self):
+        headers = await self.login()
+        self.assertIn(None, self.asgi.database._engines) # Served by the async view
+        status, _, _ = await self.call('POST', '/api/v1/auth/login', body={'email': 'pm@example.com', 'password': 'nope'})
+        self.assertEqual(401, status)
+
+        # Not a hot endpoint: the Flask view runs in the thread pool
+        status, _, created = await self.call('POST', '/api/v1/projects', headers=headers, body={
+            'name': 'Roadmap', 'account_id': self.account_id,
+            'tasks': [{'frontend_id': 'a', 'name': 'Design', 'start_date': '2026-01-05T09:00:00Z', 'duration': 86400},
+                      {'frontend_id': 'b', 'name': 'Build', 'start_date': '2026-01-06T09:00:00Z', 'duration': 86400,
+                       'parent_id': 'a', 'dependencies': [{'depends_on_task_id': 'a'}]}],
+        })
+        self.assertEqual(201, status, created)
+        project_id = created['project']['id']
+
+        for path, query in (('/api/v1/auth/me', ''), ('/api/v1/projects', f'account_id={self.account_id}'),
+                            (f'/api/v1/projects/{project_id}', ''), (f'/api/v1/projects/{project_id}', 'depth=1'),
+                            ('/api/v1/project-templates', ''), (f'/api/v1/project-templates/{self.template_id}', '')):
+            status, response_headers, data = await self.call('GET', path, query, headers)
+            expected = self.client.get(f'{path}?{query}', headers=headers)
+            self.assertEqual((expected.status_code, expected.get_json()), (status, data), path)
+            self.assertIn('server-timing', response_headers) # after_request hooks ran
+
+        status, _, data = await self.call('GET', '/api/v1/projects/9999', headers=headers)
+        self.assertEqual((404, 'Project not found'), (status, data['message']))
+        status, _, data = await self.call('GET', '/api/v1/auth/me')
+        self.assertEqual((401, 'Token is missing!'), (status, data['message']))
+
+    async def test_preflight_is_answered_without_flask(self):
+        self.flask_app.before_request(lambda: self.fail('preflight reached Flask'))
+        status, response_headers, _ = await self.call('OPTIONS', '/api/v1/auth/me', headers={
+            'Origin': 'https://app.example.com', 'Access-Control-Request-Method': 'GET',
+            'Access-Control-Request-Headers': 'authorization'})
+        self.assertEqual(204, status)
+        self.assertEqual('authorization', response_headers['access-control-allow-headers'])
+        self.assertEqual('86400', response_headers['access-control-max-age'])
+
+    async def test_many_requests_in_flight_with_few_threads(self):
+        headers = await self.login()
+        responses = await asyncio.gather(*[self.call('GET', '/api/v1/auth/me', headers=headers) for _ in range(50)])
+        self.assertEqual({200}, {status for status, _, _ in responses})
+        self.assertEqual({'pm@example.com'}, {data['email'] for _, _, data in responses})
+
+    async def test_open_streams_do_not_take_request_threads(self):
+        self.flask_app.config['ASYNC_THREADPOOL_SIZE'] = 1
+        self.flask_app.add_url_rule('/sync', 'sync', lambda: {'ok': True})
+        headers = await self.login()
+        streams = [await self.open_stream(f'/api/v1/accounts/{self.account_id}/events', headers) for _ in range(2)]
+        try:
+            for _ in range(50):
+                if all(len(sent) >= 2 for sent, _ in streams):
+                    break
+                await asyncio.sleep(0.02)
+            self.assertEqual([200, 200], [sent[0]['status'] for sent, _ in streams])
+            self.assertIn(b'event: hello', streams[0][0][1]['body'])
+            # Both streams are now blocked waiting for events; the one request thread stays free
+            status, _, _ = await asyncio.wait_for(self.call('GET', '/sync'), timeout=0.5)
+            self.assertEqual(200, status)
+        finally:
+            for _, close in streams:
+                await close()
+
+    async def test_project_reads_are_coalesced_and_budgeted(self):
+        self.flask_app.config['TESTING'] = True
+        init_query_budget(self.flask_app)
+        headers = await self.login()
+        status, _, created = await self.call('POST', '/api/v1/projects', headers=headers, body={
+            'name': 'Roadmap', 'account_id': self.account_id,
+            'tasks': [{'frontend_id': 'a', 'name': 'Design', 'start_date': '2026-01-05T09:00:00Z', 'duration': 86400}],
+        })
+        self.assertEqual(201, status, created)
+        path = f"/api/v1/projects/{created['project']['id']}"
+
+        render = async_views._render_project
+        release = asyncio.Event()
+        renders = []
+
+        async def gated_render(project, shard):
+            renders.append(project.id)
+            await release.wait()
+            return await render(project, shard)
+
+        before = project_reads.stats()
+        with mock.patch.object(async_views, '_render_project', gated_render):
+            readers = asyncio.gather(*[self.call('GET', path, headers=headers) for _ in range(5)])
+            while project_reads.stats()['coalesced'] - before['coalesced'] < 4:
+                await asyncio.sleep(0.01)
+            release.set()
+            responses = await readers
+
+        self.assertEqual(1, len(renders))
+        expected = self.client.get(path, headers=headers)
+        self.assertEqual([(200, expected.get_json())] * 5, [(status, data) for status, _, data in responses])
+        # The Flask view's @query_budget is checked for the async twin too; going over it fails the request
+        with mock.patch.object(self.flask_app.view_functions['projects_bp.get_project'], '_query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.call('GET', path, headers=headers)
+
+    async def test_new_google_user_reads_from_the_primary(self):
+        router = self.flask_app.extensions['read_replicas'] = ReplicaRouter(['replica_0'])
+        with mock.patch.object(GoogleAuthService, 'verify_token', return_value={'email': 'new@example.com', 'name': 'New'}):
+            status, _, data = await self.call('POST', '/api/v1/auth/google', body={'token': 'google-token'})
+        self.assertEqual((200, True), (status, data['user']['newuser']))
+        self.assertEqual(PRIMARY, router.choose(str(data['user']['id'])))
+
+
+class AsyncDatabaseUrlTestCase(unittest.TestCase):
+    def test_sync_drivers_are_swapped_for_async_ones(self):
+        self.assertEqual('mysql+aiomysql', async_database_url('mysql+pymysql://u:p@db/app').drivername)
+        self.assertEqual('sqlite+aiosqlite', async_database_url('sqlite:///app.db').drivername)
+        self.assertEqual('sqlite+aiosqlite', async_database_url('sqlite+aiosqlite:///app.db').drivername)
+        with self.assertRaises(ValueError):
+            async_database_url('oracle://db/app')
+
+
+if __name__ == '__main__':
+    unittest.main()
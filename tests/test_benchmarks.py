@@ -0,0 +1,34 @@
+import unittest
+from run_benchmarks import compare_results, _measure
+
+
+def _results(**medians):
+    return {'meta': {}, 'results': {name: {'median': median} for name, median in medians.items()}}
+
+
+class CompareResultsTestCase(unittest.TestCase):
+    def test_flags_only_slowdowns_above_threshold(self):
+        baseline = _results(fast=1.0, steady=1.0, slower=1.0, gone=1.0)
+        current = _results(fast=0.5, steady=1.05, slower=1.5, new=2.0)
+        rows = {name: (ratio, regressed) for name, _, _, ratio, regressed in compare_results(baseline, current, 0.10)}
+        self.assertEqual({'fast', 'steady', 'slower'}, set(rows))
+        self.assertFalse(rows['fast'][1])
+        self.assertFalse(rows['steady'][1])
+        self.assertTrue(rows['slower'][1])
+        self.assertAlmostEqual(1.5, rows['slower'][0])
+
+    def test_skipped_benchmarks_are_ignored(self):
+        baseline = _results(submit_test=1.0)
+        current = {'meta': {}, 'results': {'submit_test': {'skipped': 'no models'}}}
+        self.assertEqual([], compare_results(baseline, current))
+
+    def test_measure_reports_per_call_times(self):
+        calls = []
+        result = _measure(lambda: calls.append(1), number=10, repeat=3)
+        self.assertEqual(1 + 10 * 3, len(calls))
+        self.assertLessEqual(result['min'], result['median'])
+        self.assertLessEqual(result['median'], result['max'])
+
+
+if __name__ == '__main__':
+    unittest.main()
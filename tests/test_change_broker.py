@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from app.change_broker import ChangeBroker, SQLiteBackend, SubscriptionLimitReached, project_topic, account_topic
+
+
+def _change_event(project_id, account_id, seq):
+    return {
+        'topics': [project_topic(project_id), account_topic(account_id)],
+        'event': 'change',
+        'id': seq,
+        'data': {'project_id': project_id, 'seq': seq},
+    }
+
+
+class ChangeBrokerTestCase(unittest.TestCase):
+    def test_fans_out_to_matching_topics_only(self):
+        broker = ChangeBroker()
+        project_subscriber = broker.subscribe([project_topic(1)])
+        account_subscriber = broker.subscribe([account_topic(7)])
+        other_subscriber = broker.subscribe([project_topic(2)])
+
+        broker.publish(_change_event(1, 7, 3))
+
+        self.assertEqual(3, project_subscriber.get(timeout=0.1)['id'])
+        self.assertEqual(3, account_subscriber.get(timeout=0.1)['id'])
+        self.assertIsNone(other_subscriber.get(timeout=0.01))
+
+    def test_unsubscribe_and_slow_consumers(self):
+        broker = ChangeBroker(queue_size=1)
+        subscription = broker.subscribe([project_topic(1)])
+        broker.publish(_change_event(1, 7, 1))
+        broker.publish(_change_event(1, 7, 2))
+        self.assertEqual(1, subscription.dropped)
+
+        broker.unsubscribe(subscription)
+        self.assertEqual({}, broker._subscribers)
+
+    def test_subscription_limit(self):
+        broker = ChangeBroker(max_subscriptions=2)
+        first = broker.subscribe([project_topic(1)])
+        broker.subscribe([project_topic(2)])
+        with self.assertRaises(SubscriptionLimitReached):
+            broker.subscribe([project_topic(3)])
+        broker.unsubscribe(first)
+        broker.unsubscribe(first)
+        broker.subscribe([project_topic(3)])
+        with self.assertRaises(SubscriptionLimitReached):
+            broker.subscribe([project_topic(4)])
+
+    def test_sqlite_backend_crosses_broker_instances(self):
+        path = os.path.join(tempfile.mkdtemp(), 'events.sqlite')
+        publisher = ChangeBroker(SQLiteBackend(path, poll_interval=0.05))
+        listener = ChangeBroker(SQLiteBackend(path, poll_interval=0.05))
+        subscription = listener.subscribe([project_topic(1)])
+
+        publisher.publish(_change_event(1, 7, 5))
+
+        self.assertEqual(5, subscription.get(timeout=2)['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
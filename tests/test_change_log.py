@@ -0,0 +1,170 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from app import db, change_log
+from app.change_log import record_changes
+from app.models import Organization, Account, User, UserAccount, Project, ProjectChangeSequence
+from app.routes.projects_routes import projects_bp
+from app.utils import generate_token
+
+SECRET = 'change-log-test-secret-of-32-bytes!'
+
+
+def _task(frontend_id, name, day, dependencies=()):
+    return {'frontend_id': frontend_id, 'name': name, 'start_date': f'2026-01-{day:02d}T09:00:00Z', 'duration': 86400,
+            'dependencies': [{'depends_on_task_id': dependency} for dependency in dependencies]}
+
+
+class ProjectChangesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET, CHANGE_LOG_RETENTION=500,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        self.app.register_blueprint(projects_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            account, other_account = Account(name='Acme', organization_id=organization.id), Account(name='Other', organization_id=organization.id)
+            user, outsider = User(email='pm@example.com', organization_id=organization.id), User(email='x@example.com', organization_id=organization.id)
+            db.session.add_all([account, other_account, user, outsider])
+            db.session.flush()
+            db.session.add_all([UserAccount(user_id=user.id, account_id=account.id, role='admin'),
+                                UserAccount(user_id=outsider.id, account_id=other_account.id, role='admin')])
+            db.session.commit()
+            self.account_id = account.id
+            self.headers = {'Authorization': f'Bearer {generate_token(user.id, user.email, SECRET)}'}
+            self.outsider_headers = {'Authorization': f'Bearer {generate_token(outsider.id, outsider.email, SECRET)}'}
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/projects', headers=self.headers, json={
+            'name': 'Roadmap', 'account_id': self.account_id,
+            'tasks': [_task('a', 'Design', 5), _task('b', 'Build', 6, dependencies=['a'])]})
+        self.assertEqual(201, response.status_code, response.get_json())
+        self.project_id = response.get_json()['project']['id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def changes(self, since, headers=None):
+        return self.client.get(f'/api/v1/projects/{self.project_id}/changes?since={since}', headers=headers or self.headers)
+
+    def update(self, *tasks):
+        response = self.client.put(f'/api/v1/projects/{self.project_id}', headers=self.headers,
+                                   json={'name': 'Roadmap', 'tasks': list(tasks)})
+        self.assertEqual(200, response.status_code, response.get_json())
+        return response.get_json()['seq']
+
+    def test_changes_are_collapsed_per_entity(self):
+        created = self.changes(0).get_json()
+        self.assertEqual((1, False), (created['seq'], created['full_resync']))
+        original_ids = sorted(task['id'] for task in created['tasks']['upserted'])
+        self.assertEqual(2, len(original_ids))
+        self.assertEqual([{'taskId': original_ids[1], 'dependsOnTaskId': original_ids[0]}], created['edges']['upserted'])
+
+        self.assertEqual(2, self.update(_task('c', 'Launch', 9)))
+        latest = self.changes(1).get_json()
+        self.assertEqual(['Launch'], [task['name'] for task in latest['tasks']['upserted']])
+        launch_id = latest['tasks']['upserted'][0]['id']
+        # A deleted id that the database hands out again (SQLite does) nets out to an upsert
+        gone = sorted(set(original_ids) - {launch_id})
+        self.assertEqual(gone, sorted(latest['tasks']['deleted']))
+        self.assertEqual([{'taskId': original_ids[1], 'dependsOnTaskId': original_ids[0]}], latest['edges']['deleted'])
+
+        # From the start, tasks created and then deleted net out to deletes; only the survivor is upserted
+        collapsed = self.changes(0).get_json()
+        self.assertEqual(['Launch'], [task['name'] for task in collapsed['tasks']['upserted']])
+        self.assertEqual(gone, sorted(collapsed['tasks']['deleted']))
+        self.assertEqual([], collapsed['edges']['upserted'])
+        self.assertEqual(1, len(collapsed['edges']['deleted']))
+
+        nothing = self.changes(2).get_json()
+        self.assertEqual(([], [], 2), (nothing['tasks']['upserted'], nothing['tasks']['deleted'], nothing['seq']))
+
+    def test_compacted_or_future_positions_get_a_full_resync(self):
+        self.app.config['CHANGE_LOG_RETENTION'] = 1
+        self.update(_task('c', 'Launch', 9))
+        self.update(_task('c', 'Launch', 9), _task('d', 'Review', 12, dependencies=['c']))
+
+        stale = self.changes(0).get_json()
+        self.assertTrue(stale['full_resync'])
+        self.assertEqual(3, stale['seq'])
+        tasks = {task['name']: task for task in stale['tasks']}
+        self.assertEqual(['Launch', 'Review'], sorted(tasks))
+        self.assertEqual(([], [tasks['Launch']['id']]), (tasks['Launch']['dependencyIds'], tasks['Review']['dependencyIds']))
+        self.assertFalse(self.changes(2).get_json()['full_resync'])
+        self.assertTrue(self.changes(99).get_json()['full_resync'])
+
+    def test_access_and_validation(self):
+        self.assertEqual(403, self.changes(0, headers=self.outsider_headers).status_code)
+        self.assertEqual(400, self.changes('abc').status_code)
+        self.assertEqual(404, self.client.get('/api/v1/projects/9999/changes', headers=self.headers).status_code)
+
+
+class RecordChangesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'app.db')
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all(bind_key=None)
+        organization = Organization(name='Org')
+        db.session.add(organization)
+        db.session.flush()
+        account = Account(name='Acme', organization_id=organization.id)
+        user = User(email='pm@example.com', organization_id=organization.id)
+        db.session.add_all([account, user])
+        db.session.flush()
+        project = Project(name='Seeded', account_id=account.id, created_by=user.id) # No sequence row, as after a bulk seed
+        db.session.add(project)
+        db.session.commit()
+        self.project_id = project.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def test_losing_the_race_to_create_the_sequence_row(self):
+        # Another writer created and committed the row between our lookup and our insert
+        with db.engine.begin() as connection:
+            connection.execute(ProjectChangeSequence.__table__.insert(), {'project_id': self.project_id, 'seq': 4, 'compacted_seq': 0})
+        with mock.patch.object(change_log, '_sequence_exists', return_value=False):
+            seq = record_changes(self.project_id, task_upserts=[1])
+        db.session.commit()
+        self.assertEqual(5, seq)
+        self.assertEqual(5, db.session.get(ProjectChangeSequence, self.project_id).seq)
+
+    def test_missing_row_is_inserted_before_the_locking_read(self):
+        locked = change_log._locked_sequence
+
+        def locked_sequence(project_id):
+            # A locking read of a missing row would take a gap lock on MySQL
+            self.assertIsNotNone(db.session.get(ProjectChangeSequence, project_id))
+            return locked(project_id)
+
+        with mock.patch.object(change_log, '_locked_sequence', side_effect=locked_sequence) as patched:
+            self.assertEqual(1, record_changes(self.project_id, task_upserts=[1]))
+        self.assertEqual(1, patched.call_count)
+
+    def test_first_write_creates_the_sequence_row(self):
+        self.assertEqual(1, record_changes(self.project_id, task_upserts=[1]))
+        self.assertEqual(2, record_changes(self.project_id, task_upserts=[1]))
+        db.session.commit()
+        self.assertEqual(2, db.session.get(ProjectChangeSequence, self.project_id).seq)
+
+
+if __name__ == '__main__':
+    unittest.main()
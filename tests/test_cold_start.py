@@ -0,0 +1,29 @@
+import os
+import tempfile
+import unittest
+from run_benchmarks import measure_cold_start
+
+# Generous enough for a loaded CI runner; the app itself starts in well under half of it
+IMPORT_BUDGET_SECONDS = float(os.environ.get('COLD_START_IMPORT_BUDGET', 1.5))
+
+
+class ColdStartTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.result = measure_cold_start('sqlite:///' + os.path.join(cls.directory.name, 'cold.db'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_first_response_without_heavy_imports(self):
+        self.assertEqual(200, self.result['status'])
+        self.assertEqual([], self.result['deferred_loaded'])
+
+    def test_import_stays_within_budget(self):
+        self.assertLess(self.result['import'] + self.result['create_app'], IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc, text
+from app.db_pool import init_db_pool, pool_engine_options, TimedQueuePool
+
+
+class PoolOptionsTestCase(unittest.TestCase):
+    def test_profile_with_overrides(self):
+        options = pool_engine_options({'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://db/app',
+                                       'DB_POOL_PROFILE': 'web', 'DB_POOL_SIZE': 4, 'DB_POOL_USE_LIFO': None})
+        self.assertEqual(4, options['pool_size'])
+        self.assertEqual(280, options['pool_recycle'])
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertTrue(options['pool_use_lifo'])
+        self.assertIs(TimedQueuePool, options['poolclass'])
+
+    def test_in_memory_sqlite_and_unknown_profile(self):
+        self.assertEqual({}, pool_engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}))
+        with self.assertRaises(ValueError):
+            pool_engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'DB_POOL_PROFILE': 'huge'})
+
+
+class PoolMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'pool.db'),
+                               DB_POOL_SIZE=1, DB_POOL_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=1)
+        self.db = SQLAlchemy()
+        init_db_pool(self.app, self.db)
+        self.db.init_app(self.app)
+        with self.app.app_context():
+            self.engine = self.db.engine
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_gauges_and_checkout_wait(self):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+            metrics = self.app.extensions['db_pool_metrics']()
+            self.assertIn('db_pool_in_use{bind="default"} 1', metrics)
+            self.assertIn('db_pool_size{bind="default"} 1', metrics)
+        metrics = self.app.extensions['db_pool_metrics']()
+        self.assertIn('db_pool_in_use{bind="default"} 0', metrics)
+        self.assertIn('db_pool_checkout_wait_seconds_count{bind="default"} 1', metrics)
+
+    def test_checkout_timeout_is_counted(self):
+        pool = self.engine.pool
+        pool._timeout = 0.05
+        with self.engine.connect():
+            with self.assertRaises(exc.TimeoutError):
+                self.engine.connect()
+        self.assertEqual(1, pool.timeouts)
+        self.assertIn('db_pool_checkout_timeouts_total{bind="default"} 1', self.app.extensions['db_pool_metrics']())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def test_forked_child_gets_a_fresh_pool(self):
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        parent_pool = self.engine.pool
+        self.assertEqual(1, parent_pool.checkedin())
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            fresh = self.engine.pool is not parent_pool and self.engine.pool.checkedin() == 0
+            os.write(write_end, b'1' if fresh else b'0')
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(b'1', os.read(read_end, 1))
+        os.close(read_end)
+        os.close(write_end)
+        # The parent keeps its pooled connection
+        self.assertEqual(1, parent_pool.checkedin())
+
+
+if __name__ == '__main__':
+    unittest.main()
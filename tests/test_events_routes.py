@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from app import db
+from app.change_broker import init_change_broker
+from app.models import Organization, Account, User, UserAccount, Project
+from app.routes.events_routes import events_bp
+from app.utils import generate_token, generate_stream_token
+
+SECRET = 'events-routes-test-secret-32-bytes'
+
+
+class EventStreamAuthTestCase(unittest.TestCase):
+    """EventSource cannot send headers, so the SSE routes also take a short-lived ?token=."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET, SSE_TOKEN_SECONDS=30,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        init_change_broker(self.app, db)
+        self.app.register_blueprint(events_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            account = Account(name='Acme', organization_id=organization.id)
+            other_account = Account(name='Other', organization_id=organization.id)
+            user = User(email='pm@example.com', organization_id=organization.id)
+            db.session.add_all([account, other_account, user])
+            db.session.flush()
+            db.session.add(UserAccount(user_id=user.id, account_id=account.id, role='editor'))
+            project = Project(name='Roadmap', account_id=account.id, created_by=user.id)
+            db.session.add(project)
+            db.session.commit()
+            self.user_id = user.id
+            self.account_id = account.id
+            self.other_account_id = other_account.id
+            self.project_id = project.id
+            self.login_token = generate_token(user.id, user.email, SECRET)
+        self.headers = {'Authorization': f'Bearer {self.login_token}'}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def stream_token(self):
+        response = self.client.post('/api/v1/events/token', headers=self.headers)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(30, response.get_json()['expires_in'])
+        return response.get_json()['token']
+
+    def first_event(self, url, **kwargs):
+        response = self.client.get(url, buffered=False, **kwargs)
+        try:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual('text/event-stream', response.mimetype)
+            return next(iter(response.response)).decode()
+        finally:
+            response.close()
+
+    def test_project_stream_with_query_token(self):
+        token = self.stream_token()
+        event = self.first_event(f'/api/v1/projects/{self.project_id}/events?token={token}')
+        self.assertIn('event: hello', event)
+        self.assertIn(f'"project_id": {self.project_id}', event)
+
+    def test_account_stream_with_query_token(self):
+        token = self.stream_token()
+        self.assertIn('event: hello', self.first_event(f'/api/v1/accounts/{self.account_id}/events?token={token}'))
+        response = self.client.get(f'/api/v1/accounts/{self.other_account_id}/events?token={token}')
+        self.assertEqual(403, response.status_code)
+
+    def test_authorization_header_still_works(self):
+        self.assertIn('event: hello', self.first_event(f'/api/v1/projects/{self.project_id}/events', headers=self.headers))
+
+    def test_login_token_is_not_accepted_in_the_url(self):
+        response = self.client.get(f'/api/v1/projects/{self.project_id}/events?token={self.login_token}')
+        self.assertEqual(401, response.status_code)
+
+    def test_stream_token_only_opens_streams(self):
+        token = self.stream_token()
+        response = self.client.post('/api/v1/events/token', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(401, response.status_code)
+        response = self.client.get(f'/api/v1/projects/{self.project_id}/events',
+                                   headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(401, response.status_code)
+
+    def test_streams_beyond_the_worker_limit_get_503(self):
+        self.app.extensions['change_broker'].max_subscriptions = 1
+        url = f'/api/v1/projects/{self.project_id}/events'
+        open_stream = self.client.get(url, headers=self.headers, buffered=False)
+        try:
+            refused = self.client.get(url, headers=self.headers)
+            self.assertEqual(503, refused.status_code)
+            self.assertEqual('5', refused.headers['Retry-After'])
+        finally:
+            # Closing before the stream was read still frees the slot
+            open_stream.close()
+        self.assertIn('event: hello', self.first_event(url, headers=self.headers))
+
+    def test_expired_and_tampered_stream_tokens(self):
+        # Beyond the 60 second leeway decode_token allows
+        expired = generate_stream_token(self.user_id, SECRET, expires_in=-120)
+        response = self.client.get(f'/api/v1/projects/{self.project_id}/events?token={expired}')
+        self.assertEqual(401, response.status_code)
+        forged = generate_stream_token(self.user_id, 'another-secret-that-is-32-bytes-long', expires_in=30)
+        response = self.client.get(f'/api/v1/projects/{self.project_id}/events?token={forged}')
+        self.assertEqual(401, response.status_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import datetime
+import unittest
+from unittest.mock import patch, MagicMock
+from app.gantt_lod import aggregate_tasks, build_lod_overview, STATUS_NAMES
+from app.models import TaskStatusEnum
+
+DAY = 86400
+JAN_1_2026 = 1767225600
+FEB_1_2026 = JAN_1_2026 + 31 * DAY
+
+
+class GanttLodTestCase(unittest.TestCase):
+    def setUp(self):
+        # 1 and 2 are top-level tasks; 3 and 4 are children of 1; 5 is a grandchild under 3.
+        self.ids = [1, 2, 3, 4, 5]
+        self.parent_ids = [-1, -1, 1, 1, 3]
+        self.starts = [JAN_1_2026, JAN_1_2026, JAN_1_2026 + DAY, FEB_1_2026, FEB_1_2026 + DAY]
+        self.durations = [60 * DAY, 5 * DAY, 2 * DAY, 3 * DAY, DAY]
+        completed = STATUS_NAMES.index('COMPLETED')
+        not_started = STATUS_NAMES.index('NOT_STARTED')
+        self.statuses = [not_started, completed, completed, not_started, not_started]
+
+    def _aggregate(self, granularity, depth):
+        return aggregate_tasks(self.ids, self.parent_ids, self.starts, self.durations,
+                               self.statuses, granularity, depth)
+
+    def test_project_wide_year_bucket(self):
+        buckets = self._aggregate('year', 0)
+        self.assertEqual(1, len(buckets))
+        self.assertIsNone(buckets[0]['groupId'])
+        self.assertEqual(5, buckets[0]['count'])
+        self.assertEqual({'NOT_STARTED': 3, 'COMPLETED': 2}, buckets[0]['statusMix'])
+        self.assertEqual('2026-01-01', buckets[0]['bucketStart'])
+
+    def test_groups_by_top_level_task_and_month(self):
+        buckets = self._aggregate('month', 1)
+        cells = {(b['groupId'], b['bucketStart']): b for b in buckets}
+        self.assertEqual({(1, '2026-01-01'), (1, '2026-02-01'), (2, '2026-01-01')}, set(cells))
+        self.assertEqual(2, cells[(1, '2026-01-01')]['count'])
+        self.assertEqual(2, cells[(1, '2026-02-01')]['count'])
+        # The span covers the longest member of the bucket.
+        self.assertEqual('2026-03-02T00:00:00+00:00', cells[(1, '2026-01-01')]['endDate'])
+
+    def test_deeper_levels_keep_their_own_groups(self):
+        buckets = self._aggregate('quarter', 2)
+        group_counts = {}
+        for bucket in buckets:
+            group_counts[bucket['groupId']] = group_counts.get(bucket['groupId'], 0) + bucket['count']
+        self.assertEqual({1: 1, 2: 1, 3: 2, 4: 1}, group_counts)
+
+    def test_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            self._aggregate('decade', 1)
+
+
+class BuildLodOverviewTestCase(unittest.TestCase):
+    def setUp(self):
+        # 50 top-level tasks in different years: more buckets than allowed at every granularity
+        rows = [(task_id, None, datetime.datetime(2000 + task_id, 1, 1), DAY, TaskStatusEnum.NOT_STARTED) for task_id in range(1, 51)]
+        session = MagicMock()
+        session.query.return_value.filter.return_value.all.side_effect = [rows, []]
+        patcher = patch('app.gantt_lod.db', MagicMock(session=session))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_negative_depth_is_rejected(self):
+        with self.assertRaises(ValueError):
+            build_lod_overview(1, depth=-1, max_buckets=10)
+
+    def test_stops_at_depth_zero_when_still_over_budget(self):
+        overview = build_lod_overview(1, granularity='day', depth=3, max_buckets=10)
+        self.assertEqual(('year', 0), (overview['granularity'], overview['depth']))
+        self.assertEqual(50, len(overview['buckets']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import argparse
+import unittest
+from generate_dataset import generate, TABLE_COLUMNS
+
+
+class _MemorySink:
+    def __init__(self):
+        self.rows = {table: [] for table in TABLE_COLUMNS}
+
+    def write(self, table, rows):
+        self.rows[table].extend(rows)
+
+    def close(self):
+        pass
+
+
+class _ForeignKeySink(_MemorySink):
+    """Fails as a database would when a row is written before the row it references."""
+
+    FOREIGN_KEYS = {
+        'accounts': [('organization_id', 'organizations')],
+        'users': [('organization_id', 'organizations')],
+        'user_accounts': [('user_id', 'users'), ('account_id', 'accounts')],
+        'projects': [('account_id', 'accounts'), ('created_by', 'users')],
+        'tasks': [('project_id', 'projects'), ('assigned_to', 'users'), ('parent_id', 'tasks')],
+        'task_dependencies': [('task_id', 'tasks'), ('depends_on_task_id', 'tasks')],
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.written_ids = {table: set() for table in TABLE_COLUMNS}
+
+    def write(self, table, rows):
+        for row in rows:
+            for column, parent in self.FOREIGN_KEYS.get(table, []):
+                if row[column] is not None and row[column] not in self.written_ids[parent]:
+                    raise AssertionError(f'{table}.{column}={row[column]} written before its {parent} row')
+            if 'id' in row:
+                self.written_ids[table].add(row['id'])
+        super().write(table, rows)
+
+
+def _generate(sink=None, **overrides):
+    options = dict(
+        seed=7, orgs=1, accounts_per_org=2, users_per_account=5, projects_per_account=2,
+        tasks_per_project=300, max_depth=6, fanout=3, edge_density=1.5, dependency_window=20,
+        assignee_distribution='zipf', zipf_s=1.1, unassigned_fraction=0.1, batch_size=64,
+        id_start={table: 1 for table in ['organizations', 'accounts', 'users', 'projects', 'tasks']},
+    )
+    options.update(overrides)
+    sink = sink or _MemorySink()
+    generate(sink, argparse.Namespace(**options))
+    return sink.rows
+
+
+class GenerateDatasetTestCase(unittest.TestCase):
+    def test_same_seed_gives_same_dataset(self):
+        self.assertEqual(_generate(), _generate())
+        self.assertNotEqual(_generate()['tasks'], _generate(seed=8)['tasks'])
+
+    def test_parent_rows_are_written_before_their_children(self):
+        for batch_size in (1, 7, 64, 100000):
+            rows = _generate(sink=_ForeignKeySink(), batch_size=batch_size)
+            self.assertEqual(1200, len(rows['tasks']))
+
+    def test_sizes(self):
+        rows = _generate()
+        self.assertEqual(2, len(rows['accounts']))
+        self.assertEqual(10, len(rows['users']))
+        self.assertEqual(10, len(rows['user_accounts']))
+        self.assertEqual(4, len(rows['projects']))
+        self.assertEqual(1200, len(rows['tasks']))
+
+    def test_hierarchy_respects_depth_and_project(self):
+        tasks = {task['id']: task for task in _generate()['tasks']}
+        for task in tasks.values():
+            depth = 0
+            parent_id = task['parent_id']
+            while parent_id is not None:
+                self.assertLess(parent_id, task['id'])
+                self.assertEqual(task['project_id'], tasks[parent_id]['project_id'])
+                parent_id = tasks[parent_id]['parent_id']
+                depth += 1
+            self.assertLess(depth, 6)
+
+    def test_dependencies_form_a_dag_within_projects(self):
+        rows = _generate()
+        tasks = {task['id']: task for task in rows['tasks']}
+        edges = rows['task_dependencies']
+        self.assertGreater(len(edges), 1000)
+        self.assertEqual(len(edges), len({(edge['task_id'], edge['depends_on_task_id']) for edge in edges}))
+        for edge in edges:
+            # Edges always point to an earlier task, so no cycle can form.
+            self.assertLess(edge['depends_on_task_id'], edge['task_id'])
+            task, predecessor = tasks[edge['task_id']], tasks[edge['depends_on_task_id']]
+            self.assertEqual(task['project_id'], predecessor['project_id'])
+            self.assertGreaterEqual(task['start_date'].timestamp(),
+                                    predecessor['start_date'].timestamp() + predecessor['duration'])
+
+    def test_assignees_belong_to_the_project_account(self):
+        rows = _generate()
+        members = {}
+        for membership in rows['user_accounts']:
+            members.setdefault(membership['account_id'], set()).add(membership['user_id'])
+        project_accounts = {project['id']: project['account_id'] for project in rows['projects']}
+        for task in rows['tasks']:
+            if task['assigned_to'] is not None:
+                self.assertIn(task['assigned_to'], members[project_accounts[task['project_id']]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import argparse
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from run_load_test import _Stats, _parse_mix, _fake_verify_token, _GunicornServer
+
+
+class LoadTestReportTestCase(unittest.TestCase):
+    def test_percentiles_and_error_rates_per_endpoint(self):
+        stats = _Stats()
+        for millis in range(1, 101):
+            stats.record('GET /projects', millis / 1000, 200)
+        stats.record('PUT /projects/<id>', 0.5, 500)
+        stats.record('PUT /projects/<id>', 0.7, 'error')
+        stats.record('PUT /projects/<id>', 0.1, 200)
+
+        report = stats.report(elapsed=10)
+        projects = report['endpoints']['GET /projects']
+        self.assertEqual(100, projects['requests'])
+        self.assertAlmostEqual(10.0, projects['throughput_rps'])
+        self.assertAlmostEqual(50.5, projects['p50_ms'])
+        self.assertAlmostEqual(99.01, projects['p99_ms'])
+        self.assertEqual(0, projects['error_rate'])
+
+        updates = report['endpoints']['PUT /projects/<id>']
+        self.assertAlmostEqual(2 / 3, updates['error_rate'])
+        self.assertEqual({'500': 1, 'error': 1, '200': 1}, updates['statuses'])
+        self.assertEqual(103, report['total']['requests'])
+
+    def test_mix_parsing(self):
+        self.assertEqual({'open_project': 5.0, 'edit_tasks': 1.0}, _parse_mix('open_project=5,edit_tasks'))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            _parse_mix('delete_everything=1')
+
+    def test_fake_google_tokens(self):
+        self.assertEqual('a@b.com', _fake_verify_token('loadtest:a@b.com')['email'])
+        with self.assertRaises(ValueError):
+            _fake_verify_token('real-google-token')
+
+
+class GunicornServerTestCase(unittest.TestCase):
+    def test_waits_between_unhealthy_answers(self):
+        statuses = iter([500, 500, 200])
+        connections = []
+
+        def connect(*args, **kwargs):
+            connection = mock.Mock()
+            connection.getresponse.return_value = SimpleNamespace(status=next(statuses))
+            connections.append(connection)
+            return connection
+
+        server = _GunicornServer(8099, workers=1, worker_class='gthread', threads=1)
+        with mock.patch('run_load_test.subprocess.Popen'), \
+                mock.patch('run_load_test.http.client.HTTPConnection', side_effect=connect), \
+                mock.patch('run_load_test.time.sleep') as sleep:
+            self.assertIs(server, server.__enter__())
+        self.assertEqual(2, sleep.call_count)
+        self.assertEqual(3, len(connections))
+        for connection in connections:
+            connection.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
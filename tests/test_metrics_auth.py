@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from app import db
+from app.models import Organization, User
+from app.utils import generate_token, metrics_auth_required
+
+SECRET = 'metrics-auth-test-secret-32-bytes'
+
+
+class MetricsAuthTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET, ADMIN_EMAILS=['admin@example.com'], METRICS_TOKEN='scrape-me',
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+
+        @self.app.route('/metrics')
+        @metrics_auth_required
+        def metrics():
+            return 'requests_total 1\n'
+
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            admin = User(email='admin@example.com', organization_id=organization.id)
+            member = User(email='member@example.com', organization_id=organization.id)
+            db.session.add_all([admin, member])
+            db.session.commit()
+            self.admin_token = generate_token(admin.id, admin.email, SECRET)
+            self.member_token = generate_token(member.id, member.email, SECRET)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def get(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.get('/metrics', headers=headers)
+
+    def test_anonymous_and_wrong_tokens_are_refused(self):
+        self.assertEqual(401, self.get().status_code)
+        self.assertEqual(401, self.get('scrape-you').status_code)
+        self.assertEqual(403, self.get(self.member_token).status_code)
+
+    def test_metrics_token_and_administrators(self):
+        self.assertEqual(b'requests_total 1\n', self.get('scrape-me').data)
+        self.assertEqual(200, self.get(self.admin_token).status_code)
+
+    def test_without_metrics_token_only_administrators(self):
+        self.app.config['METRICS_TOKEN'] = None
+        self.assertEqual(401, self.get('scrape-me').status_code)
+        self.assertEqual(200, self.get(self.admin_token).status_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from app import rules_engine
+
+
+class PresignedUrlCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['PRESIGNED_URL_CACHE_SIZE'] = 2
+        self.app.config['PRESIGNED_URL_SAFETY_MARGIN'] = 300
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        rules_engine._presigned_url_cache.clear()
+        rules_engine._s3_client = None
+
+        self.client = MagicMock()
+        self.client.generate_presigned_url.side_effect = lambda op, Params, ExpiresIn: f"https://signed/{Params['Key']}"
+        self.env = patch.dict(os.environ, {'S3_BUCKET_NAME': 'bucket'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        rules_engine._presigned_url_cache.clear()
+        rules_engine._s3_client = None
+        self.app_context.pop()
+
+    @patch('boto3.client')
+    def test_client_is_shared_and_urls_are_reused(self, mock_client):
+        mock_client.return_value = self.client
+        first = rules_engine._generate_presigned_s3_url('videos/a.mp4')
+        second = rules_engine._generate_presigned_s3_url('videos/a.mp4')
+
+        self.assertEqual('https://signed/videos/a.mp4', first)
+        self.assertEqual(first, second)
+        self.assertEqual(1, mock_client.call_count)
+        self.assertEqual(1, self.client.generate_presigned_url.call_count)
+
+    @patch('app.rules_engine.time.time')
+    @patch('boto3.client')
+    def test_url_is_regenerated_inside_safety_margin(self, mock_client, mock_time):
+        mock_client.return_value = self.client
+        mock_time.return_value = 1000
+        rules_engine._generate_presigned_s3_url('a', expiration=3600)
+        mock_time.return_value = 1000 + 3600 - 301
+        rules_engine._generate_presigned_s3_url('a', expiration=3600)
+        self.assertEqual(1, self.client.generate_presigned_url.call_count)
+
+        mock_time.return_value = 1000 + 3600 - 299
+        rules_engine._generate_presigned_s3_url('a', expiration=3600)
+        self.assertEqual(2, self.client.generate_presigned_url.call_count)
+
+    @patch('boto3.client')
+    def test_cache_is_bounded(self, mock_client):
+        mock_client.return_value = self.client
+        for key in ['a', 'b', 'c']:
+            rules_engine._generate_presigned_s3_url(key)
+        self.assertEqual(2, len(rules_engine._presigned_url_cache))
+        rules_engine._generate_presigned_s3_url('a')
+        self.assertEqual(4, self.client.generate_presigned_url.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import time
+import unittest
+from flask import Flask
+from app import db
+from app.models import Organization, User
+from app.profiler import init_profiler, Profiler, ProfilingError
+from app.routes.admin_routes import admin_bp
+from app.utils import generate_token
+
+SECRET = 'profiler-test-secret-32-bytes-long'
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+class ProfilerLimitsTestCase(unittest.TestCase):
+    def test_validation_and_rate_limit(self):
+        profiler = Profiler(min_interval=60, max_requests=10, max_seconds=30)
+        with self.assertRaises(ProfilingError):
+            profiler.start(count=5, seconds=5)
+        with self.assertRaises(ProfilingError):
+            profiler.start(count=11)
+        with self.assertRaises(ProfilingError):
+            profiler.start(count=1, profiler='perf')
+
+        session = profiler.start(count=1)
+        with self.assertRaises(ProfilingError) as raised:
+            profiler.start(count=1)
+        self.assertEqual(409, raised.exception.status)
+        session.finish()
+        with self.assertRaises(ProfilingError) as raised:
+            profiler.start(count=1)
+        self.assertEqual(429, raised.exception.status)
+
+    def test_count_session_expires_when_no_request_matches(self):
+        profiler = Profiler(min_interval=0, max_seconds=0.2, sample_interval=0.001)
+        session = profiler.start(endpoint='/typo', count=5)
+        time.sleep(0.4)
+        self.assertEqual('expired', session.status)
+        self.assertFalse(session.claim())
+        # The next session is no longer blocked
+        self.assertEqual('running', profiler.start(profiler='cprofile', count=1).status)
+
+    def test_cancel(self):
+        profiler = Profiler(min_interval=0)
+        session = profiler.start(count=1)
+        self.assertIs(session, profiler.cancel(session.id))
+        self.assertEqual('cancelled', session.status)
+        self.assertIsNotNone(session.finished_at)
+        self.assertIsNone(profiler.cancel(session.id + 100))
+        profiler.start(count=1).cancel()
+
+
+class ProfilingSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(PROFILING_MIN_INTERVAL=0, PROFILING_SAMPLE_INTERVAL_MS=1)
+        init_profiler(self.app)
+        self.profiler = self.app.extensions['profiler']
+
+        @self.app.route('/slow')
+        def slow():
+            _busy(0.05)
+            return 'ok'
+
+        @self.app.route('/other')
+        def other():
+            return 'ok'
+
+        self.client = self.app.test_client()
+
+    def test_sampling_next_requests_of_an_endpoint(self):
+        session = self.profiler.start(endpoint='/slow', method='get', count=2, memory=True)
+        self.client.get('/other')
+        self.client.get('/slow')
+        self.assertEqual('running', session.status)
+        self.client.get('/slow')
+        self.assertEqual('finished', session.status)
+        self.assertEqual(2, session.completed)
+
+        collapsed = session.collapsed().splitlines()
+        self.assertTrue(collapsed)
+        stack, count = collapsed[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any('_busy' in line for line in collapsed))
+        summary = session.to_dict()
+        self.assertGreater(summary['samples'], 0)
+        self.assertIn('memory_top', summary)
+
+    def test_cprofile_time_window(self):
+        session = self.profiler.start(profiler='cprofile', seconds=0.3)
+        self.client.get('/slow')
+        self.client.get('/other')
+        time.sleep(0.4)
+        self.assertEqual('finished', session.status)
+        self.assertEqual(2, session.completed)
+        self.assertIn('_busy', session.pstats_text())
+        # Requests after the window are not profiled
+        self.client.get('/slow')
+        self.assertEqual(2, session.completed)
+
+
+class ProfileRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET, ADMIN_EMAILS=['admin@example.com'], PROFILING_MIN_INTERVAL=0,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        init_profiler(self.app)
+        self.app.register_blueprint(admin_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            admin = User(email='admin@example.com', organization_id=organization.id)
+            member = User(email='member@example.com', organization_id=organization.id)
+            db.session.add_all([admin, member])
+            db.session.commit()
+            self.headers = {'Authorization': f'Bearer {generate_token(admin.id, admin.email, SECRET)}'}
+            self.member_headers = {'Authorization': f'Bearer {generate_token(member.id, member.email, SECRET)}'}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_cancel_lets_a_new_session_start(self):
+        started = self.client.post('/api/v1/admin/profiles', headers=self.headers,
+                                   json={'endpoint': '/api/v1/typo', 'count': 3})
+        self.assertEqual(202, started.status_code)
+        session_id = started.get_json()['id']
+        self.assertEqual(409, self.client.post('/api/v1/admin/profiles', headers=self.headers,
+                                               json={'count': 1}).status_code)
+
+        self.assertEqual(403, self.client.delete(f'/api/v1/admin/profiles/{session_id}',
+                                                 headers=self.member_headers).status_code)
+        cancelled = self.client.delete(f'/api/v1/admin/profiles/{session_id}', headers=self.headers)
+        self.assertEqual(200, cancelled.status_code)
+        self.assertEqual('cancelled', cancelled.get_json()['status'])
+        self.assertEqual(409, self.client.delete(f'/api/v1/admin/profiles/{session_id}',
+                                                 headers=self.headers).status_code)
+        self.assertEqual(404, self.client.delete('/api/v1/admin/profiles/999999', headers=self.headers).status_code)
+
+        restarted = self.client.post('/api/v1/admin/profiles', headers=self.headers, json={'count': 1})
+        self.assertEqual(202, restarted.status_code)
+        self.client.delete(f"/api/v1/admin/profiles/{restarted.get_json()['id']}", headers=self.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
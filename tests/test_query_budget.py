@@ -0,0 +1,63 @@
+import unittest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from app.query_budget import init_query_budget, query_budget, fingerprint, QueryBudgetExceeded
+
+
+class FingerprintTestCase(unittest.TestCase):
+    def test_literals_placeholders_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM tasks WHERE id IN (?, ?, ?) AND name = 'a'"),
+            fingerprint("SELECT *  FROM tasks\nWHERE id IN (?) AND name = 'b''c'")
+        )
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id = 5'), fingerprint('SELECT * FROM t WHERE id = %s'))
+        self.assertNotEqual(fingerprint('SELECT * FROM tasks'), fingerprint('SELECT * FROM projects'))
+        self.assertIn('tasks_1', fingerprint('SELECT tasks_1.id FROM tasks AS tasks_1'))
+
+
+class QueryBudgetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_query_budget(self.app)
+        engine = create_engine('sqlite://')
+
+        def run_queries(count):
+            with engine.connect() as connection:
+                for value in range(count):
+                    connection.execute(text('SELECT :value'), {'value': value}).scalar()
+            return 'ok'
+
+        @self.app.route('/cheap')
+        @query_budget(3)
+        def cheap():
+            return run_queries(2)
+
+        @self.app.route('/chatty')
+        @query_budget(3)
+        def chatty():
+            return run_queries(8)
+
+        self.client = self.app.test_client()
+
+    def test_budget_fails_requests_in_test_mode(self):
+        self.app.config['TESTING'] = True
+        self.assertEqual(200, self.client.get('/cheap').status_code)
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            self.client.get('/chatty')
+        self.assertIn('executed 8 SQL statements, over its budget of 3', str(raised.exception))
+
+    def test_repeated_statements_are_logged_with_call_sites(self):
+        self.app.config['N_PLUS_ONE_DETECTION'] = True
+        with self.assertLogs(self.app.logger, level='WARNING') as logs:
+            self.assertEqual(200, self.client.get('/chatty').status_code)
+        output = '\n'.join(logs.output)
+        self.assertIn('N+1 suspected on GET /chatty: 8x SELECT ?', output)
+        self.assertIn('over its budget of 3', output)
+
+    def test_inactive_by_default(self):
+        with self.assertNoLogs(self.app.logger, level='WARNING'):
+            self.assertEqual(200, self.client.get('/chatty').status_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from app.question_pool import QuestionPool
+
+
+class QuestionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        # ids 1-6 in module 1 (PT: 1-4, PSQ: 5-6), ids 7-9 in module 2 (PT)
+        self.pool = QuestionPool(
+            ids=[9, 8, 7, 6, 5, 4, 3, 2, 1],
+            module_ids=[2, 2, 2, 1, 1, 1, 1, 1, 1],
+            concept_ids=[30, 30, 20, 10, 10, 20, 20, 10, 10],
+            slugs=['PT', 'PT', 'PT', 'PSQ', 'PSQ', 'PT', 'PT', 'PT', 'PT'],
+        )
+        self.rng = np.random.default_rng(42)
+
+    def test_pools_by_module_and_slug(self):
+        self.assertEqual([1, 2, 3, 4], sorted(self.pool.ids[self.pool.rows_for(module_id=1, slug='PT')]))
+        self.assertEqual([5, 6], sorted(self.pool.ids[self.pool.rows_for(module_id=1, slug='PSQ')]))
+        self.assertEqual([7, 8, 9], sorted(self.pool.ids[self.pool.rows_for(module_id=2)]))
+        self.assertEqual(0, len(self.pool.rows_for(module_id=1, slug='UNKNOWN')))
+
+    def test_concepts_and_id_lookup(self):
+        rows = self.pool.rows_of_ids([7, 3, 99])
+        self.assertEqual([3, 7], sorted(self.pool.ids[rows]))
+        self.assertEqual([3, 4, 7], sorted(self.pool.ids[self.pool.rows_for_concepts([20])]))
+
+    def test_sample_is_without_replacement(self):
+        rows = self.pool.rows_for(module_id=1)
+        sample = self.pool.sample(rows, 4, rng=self.rng)
+        self.assertEqual(4, len(set(sample.tolist())))
+        self.assertTrue(set(sample.tolist()) <= {1, 2, 3, 4, 5, 6})
+        self.assertEqual(6, len(self.pool.sample(rows, 50, rng=self.rng)))
+
+    def test_weighted_sample_skips_zero_weights_and_favours_heavy_rows(self):
+        rows = self.pool.rows_for(module_id=2)
+        weights = np.array([1000.0 if self.pool.ids[r] == 9 else 1.0 for r in rows])
+        firsts = [self.pool.sample(rows, 1, weights=weights, rng=self.rng)[0] for _ in range(50)]
+        self.assertGreater(firsts.count(9), 40)
+
+        zero = np.array([0.0 if self.pool.ids[r] == 9 else 1.0 for r in rows])
+        self.assertNotIn(9, self.pool.sample(rows, 3, weights=zero, rng=self.rng).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from flask import Flask, g, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from app.read_replicas import init_read_replicas, read_replica, ReplicaRouter, RoutingSession, PRIMARY
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    """Two SQLite files stand in for the primary and its replica; their rows differ on purpose."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.primary_path = os.path.join(self.directory.name, 'primary.db')
+        self.replica_path = os.path.join(self.directory.name, 'replica.db')
+        self.app = Flask(__name__)
+        self.app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + self.primary_path,
+                               READ_REPLICA_URLS='sqlite:///' + self.replica_path,
+                               READ_YOUR_WRITES_SECONDS=60)
+        db = self.db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+        class Note(db.Model):
+            id = db.Column(db.Integer, primary_key=True)
+            text = db.Column(db.String(50))
+
+        init_read_replicas(self.app)
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            db.session.add(Note(text='primary'))
+            db.session.commit()
+        shutil.copy(self.primary_path, self.replica_path)
+        connection = sqlite3.connect(self.replica_path)
+        connection.execute("UPDATE note SET text = 'replica'")
+        connection.commit()
+        connection.close()
+
+        @self.app.route('/notes')
+        @read_replica
+        def list_notes():
+            g._token_subject = request.headers.get('X-User')
+            return jsonify([note.text for note in Note.query.order_by(Note.id)])
+
+        @self.app.route('/notes', methods=['POST'])
+        def add_note():
+            g._token_subject = request.headers.get('X-User')
+            db.session.add(Note(text='new'))
+            db.session.commit()
+            return '', 201
+
+        self.client = self.app.test_client()
+        self.router = self.app.extensions['read_replicas']
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in self.db.engines.values():
+                engine.dispose()
+        self.directory.cleanup()
+
+    def test_reads_replica_until_the_user_writes(self):
+        self.assertEqual(['replica'], self.client.get('/notes', headers={'X-User': '1'}).get_json())
+        self.assertEqual(201, self.client.post('/notes', headers={'X-User': '1'}).status_code)
+        # The writer reads its own write from the primary; other users keep using the replica
+        self.assertEqual(['primary', 'new'], self.client.get('/notes', headers={'X-User': '1'}).get_json())
+        self.assertEqual(['replica'], self.client.get('/notes', headers={'X-User': '2'}).get_json())
+        self.assertEqual({PRIMARY: 1, 'replica_0': 2}, self.router.stats()['routed'])
+
+    def test_fails_over_to_primary(self):
+        os.remove(self.replica_path)
+        os.mkdir(self.replica_path) # SQLite cannot open a directory
+        self.assertEqual(['primary'], self.client.get('/notes').get_json())
+        self.assertEqual(['replica_0'], self.router.stats()['down'])
+        self.assertEqual(['primary'], self.client.get('/notes').get_json())
+        self.assertEqual(1, self.router.stats()['failovers'])
+
+
+class ReplicaRouterTestCase(unittest.TestCase):
+    def test_round_robin_skips_replicas_marked_down(self):
+        router = ReplicaRouter(['replica_0', 'replica_1'], retry_seconds=60)
+        self.assertEqual(['replica_0', 'replica_1', 'replica_0'], [router.choose() for _ in range(3)])
+        router.mark_down('replica_0')
+        self.assertEqual(['replica_1', 'replica_1'], [router.choose() for _ in range(2)])
+        router.mark_down('replica_1')
+        self.assertEqual(PRIMARY, router.choose())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from app.request_timing import init_request_timing, Histogram
+
+
+class RequestTimingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_request_timing(self.app)
+        engine = create_engine('sqlite://')
+
+        @self.app.route('/items/<int:item_id>')
+        def item(item_id):
+            with engine.connect() as connection:
+                for _ in range(3):
+                    connection.execute(text('SELECT 1')).scalar()
+            return jsonify({'id': item_id, 'values': list(range(100))})
+
+        self.client = self.app.test_client()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/items/1')
+        header = response.headers['Server-Timing']
+        self.assertIn('app;dur=', header)
+        self.assertIn('desc="3 queries"', header)
+        self.assertIn('serialize;dur=', header)
+
+    def test_histograms_are_labelled_by_url_rule(self):
+        self.client.get('/items/1')
+        self.client.get('/items/2')
+        body = self.app.extensions['request_metrics'].render()
+        labels = 'endpoint="/items/<int:item_id>",method="GET"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'http_request_queries_sum{{{labels}}} 6.0', body)
+        self.assertIn(f'http_request_queries_bucket{{{labels},le="2"}} 0', body)
+        self.assertIn(f'http_request_queries_bucket{{{labels},le="5"}} 2', body)
+        self.assertIn('# TYPE http_response_size_bytes histogram', body)
+
+    def test_disabled(self):
+        app = Flask(__name__)
+        app.config['REQUEST_TIMING_ENABLED'] = False
+        init_request_timing(app)
+        app.add_url_rule('/', 'index', lambda: 'ok')
+        self.assertNotIn('Server-Timing', app.test_client().get('/').headers)
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', (0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(('x',), value)
+        lines = histogram.render(('endpoint',))
+        self.assertIn('latency_seconds_bucket{endpoint="x",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{endpoint="x",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{endpoint="x",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{endpoint="x"} 3', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from app.rule_compiler import compile_rules, RuleDefinitionError
+from app.rule_definitions import RULE_DEFINITIONS
+
+
+def _user(slug, module_id=1, user_id=1):
+    return SimpleNamespace(id=user_id, email=f'user{user_id}@example.com', current_problem_category_slug=slug,
+                           current_learning_focus_module_id=module_id, next_recommended_lesson_id=42)
+
+
+class RuleCompilerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app_context = Flask(__name__).app_context()
+        self.app_context.push()
+        self.db = MagicMock()
+        self.rules = compile_rules(RULE_DEFINITIONS, module_path=[1, 5, 9])
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    @patch('app.rule_compiler.UserCompletedModules', create=True)
+    def test_completed_learning_transitions(self, completed_modules):
+        user = _user('PT')
+        result, status = self.rules['completed_learning'](user, self.db)
+        self.assertEqual(200, status)
+        self.assertEqual('PSQ', user.current_problem_category_slug)
+        self.assertIsNone(user.next_recommended_lesson_id)
+
+        # PSQ follows the declared module path instead of assuming module_id + 1
+        self.rules['completed_learning'](user, self.db)
+        self.assertEqual(('PT', 5), (user.current_problem_category_slug, user.current_learning_focus_module_id))
+        self.assertEqual(2, completed_modules.call_count)
+        self.assertEqual(2, self.db.session.commit.call_count)
+
+    def test_unmatched_rule_returns_default(self):
+        result, status = self.rules['completed_learning'](_user(None), self.db)
+        self.assertEqual(({'message': 'No change needed for problem category.'}, 200), (result, status))
+        self.db.session.commit.assert_not_called()
+
+    def test_test_progression_uses_context(self):
+        rule = self.rules['test_progression']
+        mastered = _user('PT')
+        self.assertEqual('pt_mastered', rule(mastered, self.db, {'score_percentage': 100, 'first_content_id': 7}))
+        self.assertEqual('PSQ', mastered.current_problem_category_slug)
+
+        struggling = _user('PT')
+        self.assertEqual('pt_recommend_lesson', rule(struggling, self.db, {'score_percentage': 40, 'first_content_id': 7}))
+        self.assertEqual(7, struggling.next_recommended_lesson_id)
+        self.assertIsNone(rule(_user('PSQ'), self.db, {'score_percentage': 100}))
+
+    def test_batch_decides_each_snapshot_once(self):
+        rule = self.rules['completed_learning']
+        users = [_user('PT', user_id=i) for i in range(5)] + [_user('PSQ', user_id=9), _user('OTHER', user_id=10)]
+        rule._decide_snapshot.cache_clear()
+        names = rule.evaluate_batch(users)
+        self.assertEqual(['pt_to_psq'] * 5 + ['psq_to_next_module', None], names)
+        self.assertEqual(3, rule._decide_snapshot.cache_info().misses)
+
+    def test_batch_tolerates_unhashable_snapshots(self):
+        rule = self.rules['completed_learning']
+        users = [_user('PT', user_id=1), _user(['PT', 'PSQ'], user_id=2), _user('PT', user_id=3)]
+        self.assertEqual(['pt_to_psq', None, 'pt_to_psq'], rule.evaluate_batch(users))
+
+    def test_malformed_definitions_fail_at_compile_time(self):
+        with self.assertRaises(RuleDefinitionError):
+            compile_rules({'bad': {'transitions': [{'name': 't', 'when': {'x': {'near': 1}}}]}})
+        with self.assertRaises(RuleDefinitionError):
+            compile_rules({'bad': {'transitions': [{'name': 't', 'then': [{'action': 'explode'}]}]}})
+
+
+if __name__ == '__main__':
+    unittest.main()
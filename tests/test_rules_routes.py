@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from app import db, rules_engine
+from app.models import Organization, User
+from app.rule_compiler import compile_rules
+from app.rule_definitions import RULE_DEFINITIONS
+from app.routes.rules_routes import rules_bp
+from app.utils import generate_token
+
+SECRET = 'rules-routes-test-secret-32-bytes'
+
+
+class RulesRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        self.app.register_blueprint(rules_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            user = User(email='learner@example.com', organization_id=organization.id)
+            db.session.add(user)
+            db.session.commit()
+            self.headers = {'Authorization': f'Bearer {generate_token(user.id, user.email, SECRET)}'}
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_rules_that_change_progress_are_post_only(self):
+        for rule_name in ('completed_learning', 'submit_test'):
+            response = self.client.get(f'/api/v1/rules/{rule_name}', headers=self.headers)
+            self.assertEqual(405, response.status_code, rule_name)
+        # Non-committing rules are only applied by other rules
+        self.assertEqual(404, self.client.get('/api/v1/rules/test_progression', headers=self.headers).status_code)
+
+    def test_compiled_rules_are_post_only(self):
+        compiled = compile_rules({'refresh_progress': RULE_DEFINITIONS['completed_learning']})
+        with patch.dict(rules_engine.COMPILED_RULES, compiled), \
+                patch('app.routes.rules_routes._rules', return_value=dict(compiled)):
+            response = self.client.get('/api/v1/rules/refresh_progress', headers=self.headers)
+        self.assertEqual(405, response.status_code)
+        self.assertEqual('Rule refresh_progress must be triggered with POST.', response.get_json()['message'])
+
+if __name__ == '__main__':
+    unittest.main()
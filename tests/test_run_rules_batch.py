@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from app import db
+from app.models import Organization, User
+from app.rule_compiler import compile_rules, RuleDefinitionError
+from app.rule_definitions import RULE_DEFINITIONS
+import run_rules_batch
+
+BATCH_RULES = {
+    'completed_learning': RULE_DEFINITIONS['completed_learning'],
+    'rename_guests': {
+        'commit': False,
+        'batch': True,
+        'transitions': [
+            {'name': 'renamed', 'when': {'user.name': 'Guest'}, 'then': [{'action': 'set', 'values': {'name': 'Member'}}]},
+        ],
+    },
+}
+
+
+class RunRulesBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'app.db')
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            db.session.add_all([User(email=f'user{n}@example.com', name='Guest' if n % 2 else 'Owner',
+                                     organization_id=organization.id) for n in range(1, 6)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def run_batch(self, rule_name, **kwargs):
+        output = io.StringIO()
+        with patch('run_rules_batch.create_app', return_value=self.app), \
+                patch('run_rules_batch.COMPILED_RULES', compile_rules(BATCH_RULES)), contextlib.redirect_stdout(output):
+            run_rules_batch.run_rule_batch(rule_name, batch_size=2, **kwargs)
+        return output.getvalue()
+
+    def names(self):
+        with self.app.app_context():
+            return sorted(user.name for user in User.query.all())
+
+    def test_dry_run_is_the_default(self):
+        output = self.run_batch('rename_guests')
+        self.assertIn('renamed: 3 (dry run)', output)
+        self.assertEqual(['Guest'] * 3 + ['Owner'] * 2, self.names())
+
+    def test_apply_commits_the_transitions(self):
+        output = self.run_batch('rename_guests', apply=True)
+        self.assertIn('renamed: 3\n', output)
+        self.assertEqual(['Member'] * 3 + ['Owner'] * 2, self.names())
+
+    def test_per_request_rules_are_refused(self):
+        output = self.run_batch('completed_learning', apply=True)
+        self.assertIn("Rule 'completed_learning' is not marked 'batch': True", output)
+        self.assertIn('Batch rules: rename_guests', output)
+
+    def test_batch_rules_cannot_read_context(self):
+        definition = dict(BATCH_RULES['rename_guests'], transitions=[
+            {'name': 'scored', 'when': {'score_percentage': {'gte': 100}}, 'then': []}])
+        with self.assertRaises(RuleDefinitionError):
+            compile_rules({'scored': definition})
+
+
+if __name__ == '__main__':
+    unittest.main()
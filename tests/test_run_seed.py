@@ -0,0 +1,125 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from sqlalchemy import select
+from app import db
+from app.models import Organization, Account, User, Project, Task, ProjectTemplate, TaskTemplate, task_template_dependencies
+import run_seed
+
+
+def _write_csv(path, header, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_file.write('\n'.join([header] + rows) + '\n')
+
+
+class RunSeedTestCase(unittest.TestCase):
+    """Streaming CSV seeding: batching, skip reporting, explicit ids and the template parent-link pass."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.directory.name, 'data')
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'app.db')
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+        _write_csv(os.path.join(self.data_dir, 'organizations.csv'), 'name', ['Org One', '', 'Org Two'])
+        _write_csv(os.path.join(self.data_dir, 'accounts.csv'), 'name, organization_id',
+                   ['Alpha, 1', 'Beta, 2', 'Gamma, 9', 'Delta, 1', 'Epsilon, 2'])
+        _write_csv(os.path.join(self.data_dir, 'auth_codes.csv'), 'auth_code,account_id,role',
+                   ['CODE1,1,admin', 'CODE2,7,viewer'])
+        templates_dir = os.path.join(self.data_dir, 'templates')
+        _write_csv(os.path.join(templates_dir, 'project_templates.csv'), 'id,name,description', ['1,Launch,'])
+        # The child (11) comes before its parent (10); 12 names a parent that does not exist
+        _write_csv(os.path.join(templates_dir, 'task_templates.csv'), 'id,project_template_id,name,duration_days,parent_id',
+                   ['11,1,Design,2,10', '10,1,Plan,,', '12,1,Orphan,1,99', '13,5,Elsewhere,1,'])
+        _write_csv(os.path.join(templates_dir, 'task_template_dependencies.csv'),
+                   'task_template_id,depends_on_task_template_id', ['12,11', '12,13'])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def seed(self, **kwargs):
+        output = io.StringIO()
+        with patch('run_seed.create_app', return_value=self.app), contextlib.redirect_stdout(output):
+            run_seed.seed_data(data_dir=self.data_dir, **kwargs)
+        return output.getvalue()
+
+    def test_base_files_without_ids_use_autoincrement(self):
+        output = self.seed()
+        with self.app.app_context():
+            self.assertEqual({1: 'Org One', 2: 'Org Two'}, {org.id: org.name for org in Organization.query.all()})
+            accounts = {account.name: account.organization_id for account in Account.query.all()}
+        self.assertEqual({'Alpha': 1, 'Beta': 2, 'Delta': 1, 'Epsilon': 2}, accounts)
+        self.assertIn('Skipping Accounts: Account Gamma: Organization with ID 9 not found.', output)
+        self.assertIn('Seeded 4 Accounts (1 skipped)', output)
+        self.assertIn('Seeded 1 Auth Codes (1 skipped)', output)
+
+    def test_each_batch_is_one_insert(self):
+        with patch('run_seed._insert_rows', wraps=run_seed._insert_rows) as insert_rows:
+            self.seed(batch_size=2)
+        account_batches = [call.args[1] for call in insert_rows.call_args_list if call.args[0] is Account.__table__]
+        # Five rows in batches of two; the skipped row leaves its batch one short
+        self.assertEqual([2, 1, 1], [len(rows) for rows in account_batches])
+
+    def test_template_parents_are_linked_after_insert(self):
+        output = self.seed(batch_size=1)
+        with self.app.app_context():
+            parents = {template.id: template.parent_id for template in TaskTemplate.query.all()}
+            dependencies = db.session.execute(select(task_template_dependencies)).all()
+        self.assertEqual({10: None, 11: 10, 12: None}, parents)
+        self.assertIn('1 Task Templates reference a missing parent and were left top-level', output)
+        self.assertIn('Linked 1 Task Template parents', output)
+        self.assertIn('Seeded 3 Task Templates (1 skipped)', output)
+        self.assertEqual([(12, 11)], [tuple(row) for row in dependencies])
+        self.assertIn('Seeded 1 Template Dependencies (1 skipped)', output)
+
+    def test_generated_tables_keep_their_ids(self):
+        _write_csv(os.path.join(self.data_dir, 'organizations.csv'), 'id,name', ['40,Perf Org 40'])
+        _write_csv(os.path.join(self.data_dir, 'accounts.csv'), 'id,name,organization_id', ['70,Perf Account 70,40'])
+        _write_csv(os.path.join(self.data_dir, 'users.csv'), 'id,name,email,auth_source,organization_id,created_at,updated_at',
+                   ['500,Dev,dev@example.com,LOCAL,40,,'])
+        _write_csv(os.path.join(self.data_dir, 'projects.csv'),
+                   'id,name,description,start_date,end_date,account_id,created_by,created_at,updated_at',
+                   ['900,Perf Project,,2026-01-05T09:00:00,,70,500,,'])
+        # 1002 names a parent that is only listed after it, so it is skipped
+        _write_csv(os.path.join(self.data_dir, 'tasks.csv'),
+                   'id,name,status,start_date,duration,project_id,assigned_to,parent_id,created_at,updated_at',
+                   ['1000,Root,NOT_STARTED,2026-01-05T09:00:00,86400,900,500,,,',
+                    '1001,Child,COMPLETED,2026-01-05T09:00:00,,900,999,1000,,',
+                    '1002,Early,NOT_STARTED,2026-01-05T09:00:00,86400,900,,1003,,',
+                    '1003,Late,NOT_STARTED,2026-01-05T09:00:00,86400,900,,,,'])
+        _write_csv(os.path.join(self.data_dir, 'task_dependencies.csv'), 'task_id,depends_on_task_id',
+                   ['1001,1000', '1003,1002'])
+
+        output = self.seed()
+        with self.app.app_context():
+            self.assertEqual([(40, 'Perf Org 40')], [(org.id, org.name) for org in Organization.query.all()])
+            self.assertEqual(500, User.query.one().id)
+            self.assertEqual(70, Project.query.one().account_id)
+            tasks = {task.id: (task.parent_id, task.assigned_to, task.duration) for task in Task.query.all()}
+            # New rows continue after the seeded ids
+            organization = Organization(name='Created later')
+            db.session.add(organization)
+            db.session.commit()
+            self.assertEqual(41, organization.id)
+        self.assertEqual({1000: (None, 500, 86400), 1001: (1000, None, 86400), 1003: (None, None, 86400)}, tasks)
+        self.assertIn('Task 1002: parent 1003 not listed earlier in project 900.', output)
+        self.assertIn('Seeded 1 Task Dependencies (1 skipped)', output)
+
+    def test_tables_with_rows_are_not_seeded_again(self):
+        self.seed()
+        output = self.seed()
+        self.assertNotIn('Seeded', output)
+        with self.app.app_context():
+            self.assertEqual(4, Account.query.count())
+            self.assertEqual(1, ProjectTemplate.query.count())
@@ -0,0 +1,125 @@
+import os
+import runpy
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from flask import Flask
+from app import db
+from app.google_auth_service import CachingRequest
+from app.models import Organization, User, ProjectTemplate, TaskTemplate, task_template_dependencies
+from app.routes.project_templates_routes import project_templates_bp
+from app.template_catalog import init_template_catalog
+from app.utils import generate_token
+from app.warmup import warm_caches
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+SECRET = 'server-profile-test-secret-of-32-bytes'
+
+
+class GunicornConfTestCase(unittest.TestCase):
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(CONF_PATH)
+
+    def test_binds_to_port_with_preload_and_threads(self):
+        conf = self.load(PORT='9000', GUNICORN_WORKER_CLASS='gevent')
+        self.assertEqual('0.0.0.0:9000', conf['bind'])
+        self.assertTrue(conf['preload_app'])
+        self.assertEqual('gevent', conf['worker_class'])
+        self.assertEqual('gthread', self.load()['worker_class'])
+
+    def test_worker_is_recycled_after_memory_growth(self):
+        conf = self.load(GUNICORN_MAX_MEMORY_GROWTH_MB='100', GUNICORN_MEMORY_CHECK_INTERVAL='2')
+        post_request = conf['post_request']
+        worker = SimpleNamespace(alive=True, pid=42, log=mock.Mock(), baseline_rss=500 * 1024 * 1024)
+        with mock.patch.dict(post_request.__globals__, rss_bytes=lambda: 650 * 1024 * 1024):
+            post_request(worker, None, None, None)
+            self.assertTrue(worker.alive) # Only checked every second request
+            post_request(worker, None, None, None)
+        self.assertFalse(worker.alive)
+
+        worker = SimpleNamespace(alive=True, pid=43, log=mock.Mock(), baseline_rss=500 * 1024 * 1024)
+        with mock.patch.dict(post_request.__globals__, rss_bytes=lambda: 550 * 1024 * 1024):
+            for _ in range(4):
+                post_request(worker, None, None, None)
+        self.assertTrue(worker.alive)
+
+
+class WarmCachesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET, TEMPLATE_CACHE_SECONDS=60,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        init_template_catalog(self.app)
+        self.app.register_blueprint(project_templates_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all()
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            user = User(email='pm@example.com', organization_id=organization.id)
+            template = ProjectTemplate(name='Launch', description='Go to market')
+            db.session.add_all([user, template])
+            db.session.flush()
+            plan = TaskTemplate(name='Plan', project_template_id=template.id)
+            db.session.add(plan)
+            db.session.flush()
+            build = TaskTemplate(name='Build', project_template_id=template.id, parent_id=plan.id)
+            db.session.add(build)
+            db.session.flush()
+            db.session.execute(task_template_dependencies.insert().values(
+                task_template_id=build.id, depends_on_task_template_id=plan.id))
+            db.session.commit()
+            self.template_id = template.id
+            self.headers = {'Authorization': f'Bearer {generate_token(user.id, user.email, SECRET)}'}
+        self.client = self.app.test_client()
+        self.catalog = self.app.extensions['template_catalog']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_warmed_catalog_matches_the_routes(self):
+        cold_list = self.client.get('/api/v1/project-templates', headers=self.headers).get_json()
+        cold_details = self.client.get(f'/api/v1/project-templates/{self.template_id}', headers=self.headers).get_json()
+        self.catalog.clear()
+
+        results = warm_caches(self.app)
+        self.assertIsNotNone(results['database'])
+        self.assertIsNotNone(results['template_catalog'])
+        self.assertNotIn('google_certs', results) # GOOGLE_CLIENT_ID is not configured
+
+        hits = self.catalog.hits
+        self.assertEqual(cold_list, self.client.get('/api/v1/project-templates', headers=self.headers).get_json())
+        self.assertEqual(cold_details, self.client.get(f'/api/v1/project-templates/{self.template_id}',
+                                                       headers=self.headers).get_json())
+        self.assertEqual(hits + 2, self.catalog.hits)
+
+
+class CachingRequestTestCase(unittest.TestCase):
+    def test_keeps_responses_for_their_max_age(self):
+        calls = []
+
+        def transport(url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+            calls.append(url)
+            return SimpleNamespace(status=200, headers={'cache-control': 'public, max-age=600'}, data=b'{}')
+
+        request = CachingRequest(transport)
+        with mock.patch('app.google_auth_service.time.monotonic', return_value=1000.0):
+            request('https://certs')
+            request('https://certs')
+        self.assertEqual(1, len(calls))
+        with mock.patch('app.google_auth_service.time.monotonic', return_value=1601.0):
+            request('https://certs')
+        self.assertEqual(2, len(calls))
+        request.invalidate()
+        request('https://certs')
+        self.assertEqual(3, len(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import time
+import unittest
+from flask import Flask
+from app import db
+from app.models import Organization, Account, User, UserAccount, AccountShard, Project, Task
+from app.routes.projects_routes import projects_bp
+from app.sharding import init_sharding, use_account, request_shard, AccountReadOnly, ShardDirectory
+from app.utils import generate_token
+from run_shard_migration import provision, move_account, account_row_counts
+
+SPAN = 1000
+SECRET = 'sharding-test-secret-key-of-32-bytes'
+
+
+class ShardingTestCase(unittest.TestCase):
+    """A default database and one shard, as SQLite files; one user belongs to two accounts."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'default.db'),
+                               SHARD_URLS='sqlite:///' + os.path.join(self.directory.name, 'shard_1.db'),
+                               SHARD_DIRECTORY_TTL=0)
+        init_sharding(self.app)
+        db.init_app(self.app)
+        self.app.register_blueprint(projects_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            provision(SPAN, log=lambda message: None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            self.accounts = []
+            for name in ('Stays', 'Moves'):
+                account = Account(name=name, organization_id=organization.id)
+                db.session.add(account)
+                db.session.flush()
+                self.accounts.append(account.id)
+            user = User(email='pm@example.com', organization_id=organization.id)
+            db.session.add(user)
+            db.session.flush()
+            for account_id in self.accounts:
+                db.session.add(UserAccount(user_id=user.id, account_id=account_id, role='admin'))
+            db.session.commit()
+            self.token = generate_token(user.id, user.email, SECRET)
+        self.client = self.app.test_client()
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        self.directory.cleanup()
+
+    def _create_project(self, account_id, name):
+        response = self.client.post('/api/v1/projects', headers=self.headers, json={
+            'name': name, 'account_id': account_id,
+            'tasks': [
+                {'frontend_id': 'a', 'name': 'Design', 'start_date': '2026-01-05T09:00:00Z', 'duration': 86400},
+                {'frontend_id': 'b', 'name': 'Build', 'start_date': '2026-01-06T09:00:00Z', 'duration': 86400,
+                 'parent_id': 'a', 'dependencies': [{'depends_on_task_id': 'a'}]},
+            ],
+        })
+        self.assertEqual(201, response.status_code, response.get_json())
+        return response.get_json()['project']['id']
+
+    def _counts(self, shard, account_id):
+        with self.app.app_context():
+            engine = db.engines[None] if shard == 'default' else db.engines[shard]
+            return account_row_counts(engine, account_id)
+
+    def test_move_account_and_route_to_its_shard(self):
+        stays, moves = self.accounts
+        kept_id = self._create_project(stays, 'Kept')
+        moved_id = self._create_project(moves, 'Moved')
+        before = self._counts('default', moves)
+
+        with self.app.app_context():
+            move_account(moves, 'shard_1', freeze_wait=0, log=lambda message: None)
+            entry = db.session.get(AccountShard, moves)
+            self.assertEqual(('shard_1', False), (entry.shard, entry.read_only))
+        self.assertEqual(before, self._counts('shard_1', moves))
+        self.assertEqual(0, self._counts('default', moves)['projects'])
+
+        # Each project is found on its own database, by id, for the same user
+        self.assertEqual('Moved', self.client.get(f'/api/v1/projects/{moved_id}', headers=self.headers).get_json()['name'])
+        self.assertEqual('Kept', self.client.get(f'/api/v1/projects/{kept_id}', headers=self.headers).get_json()['name'])
+        listed = self.client.get(f'/api/v1/projects?account_id={moves}', headers=self.headers).get_json()
+        self.assertEqual([moved_id], [project['id'] for project in listed])
+
+        # New rows on the shard take ids from its own range
+        new_id = self._create_project(moves, 'Second')
+        self.assertGreater(new_id, SPAN)
+        with self.app.app_context():
+            use_account(moves)
+            self.assertGreater(min(task.id for task in Task.query.filter_by(project_id=new_id)), SPAN)
+            with db.engines[None].connect() as connection:
+                self.assertIsNone(connection.execute(db.select(Project.id).where(Project.id == new_id)).first())
+
+    def test_frozen_account_refuses_writes(self):
+        moves = self.accounts[1]
+        project_id = self._create_project(moves, 'Existing')
+        with self.app.app_context():
+            db.session.add(AccountShard(account_id=moves, shard='default', read_only=True))
+            db.session.commit()
+        response = self.client.post('/api/v1/projects', headers=self.headers, json={'name': 'New', 'account_id': moves})
+        self.assertEqual(503, response.status_code)
+        self.assertEqual('5', response.headers['Retry-After'])
+        self.assertIn('retry shortly', response.get_json()['message'])
+        response = self.client.put(f'/api/v1/projects/{project_id}', headers=self.headers, json={'name': 'Renamed'})
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(1, self._counts('default', moves)['projects'])
+        with self.app.app_context():
+            use_account(moves)
+            with self.assertRaises(AccountReadOnly):
+                request_shard(writing=True)
+            self.assertEqual('default', request_shard(writing=False))
+
+
+class ShardDirectoryTestCase(unittest.TestCase):
+    def test_entries_are_cached_for_the_ttl(self):
+        directory = ShardDirectory(['shard_1'], ttl=60)
+        loads = []
+
+        def reload():
+            loads.append(1)
+            directory._entries, directory._loaded_at = {7: ('shard_1', False)}, time.monotonic()
+            return directory._entries
+
+        directory.reload = reload
+        self.assertEqual(('shard_1', False), directory.lookup(7))
+        self.assertEqual(('default', False), directory.lookup(8))
+        self.assertEqual(1, len(loads))
+        directory.invalidate()
+        directory.lookup(7)
+        self.assertEqual(2, len(loads))
+
+
+if __name__ == '__main__':
+    unittest.main()
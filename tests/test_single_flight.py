@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import unittest
+from app.single_flight import SingleFlight
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def test_concurrent_callers_share_one_computation(self):
+        flight = SingleFlight('test_shared')
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(2)
+            return b'payload'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        # Wait until every follower has joined the in-flight call before releasing the leader.
+        while flight.stats()['coalesced'] < 4:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([b'payload'] * 5, results)
+        self.assertEqual({'executions': 1, 'coalesced': 4, 'errors': 0, 'timeouts': 0, 'in_flight': 0}, flight.stats())
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight('test_sequential')
+        self.assertEqual(1, flight.do('k', lambda: 1))
+        self.assertEqual(2, flight.do('k', lambda: 2))
+        self.assertEqual(0, flight.stats()['coalesced'])
+
+    def test_errors_propagate_and_clear(self):
+        flight = SingleFlight('test_errors')
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            flight.do('k', fail)
+        self.assertEqual('ok', flight.do('k', lambda: 'ok'))
+        self.assertEqual(1, flight.stats()['errors'])
+
+    def test_async_callers_share_one_computation(self):
+        flight = SingleFlight('test_async_shared')
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b'payload'
+
+        async def run():
+            return await asyncio.gather(*[flight.do_async('k', compute) for _ in range(5)])
+
+        self.assertEqual([b'payload'] * 5, asyncio.run(run()))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'executions': 1, 'coalesced': 4, 'errors': 0, 'timeouts': 0, 'in_flight': 0}, flight.stats())
+
+    def test_async_caller_joins_a_thread_leader(self):
+        flight = SingleFlight('test_async_joins_thread')
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do('k', lambda: release.wait(2) and b'from thread'))
+        leader.start()
+        while flight.stats()['in_flight'] < 1:
+            pass
+
+        async def follow():
+            waiter = asyncio.ensure_future(flight.do_async('k', self.fail))
+            while flight.stats()['coalesced'] < 1:
+                await asyncio.sleep(0.01)
+            release.set()
+            return await waiter
+
+        self.assertEqual(b'from thread', asyncio.run(follow()))
+        leader.join()
+        self.assertEqual(1, flight.stats()['executions'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+import unittest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from app import slow_query_log
+from app.slow_query_log import init_slow_query_log, parameter_shape
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_SIZE=5)
+        init_slow_query_log(self.app)
+        self.log = self.app.extensions['slow_query_log']
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.directory.name, 'slow.db'))
+        with self.engine.begin() as connection:
+            connection.execute(text('CREATE TABLE tasks (id INTEGER PRIMARY KEY, project_id INTEGER)'))
+        self.log.clear()
+
+    def tearDown(self):
+        # Let queued EXPLAINs finish before the database file is removed
+        for record in self.log.records():
+            self._wait_for_explain(record)
+        slow_query_log._active_log = None
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def _wait_for_explain(self, record):
+        deadline = time.monotonic() + 5
+        while record['explain_status'] == 'pending' and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_records_endpoint_parameter_types_and_plan(self):
+        @self.app.route('/projects/<int:project_id>/tasks')
+        def tasks(project_id):
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT id FROM tasks WHERE project_id = :project_id'), {'project_id': project_id}).all()
+            return 'ok'
+
+        self.app.test_client().get('/projects/7/tasks')
+        record = self.log.records()[0]
+        self.assertEqual('GET /projects/<int:project_id>/tasks', record['endpoint'])
+        self.assertEqual('SELECT id FROM tasks WHERE project_id = ?', record['sql'])
+        self.assertEqual(['int'], record['parameters'])
+        self._wait_for_explain(record)
+        self.assertEqual('done', record['explain_status'])
+        self.assertIn('SCAN tasks', record['explain'][0]['detail'])
+        # The EXPLAIN itself is never recorded
+        self.assertFalse(any('EXPLAIN' in entry['sql'] for entry in self.log.records()))
+
+    def test_ring_buffer_keeps_newest(self):
+        with self.engine.connect() as connection:
+            for value in range(8):
+                connection.execute(text(f'SELECT {value}')).scalar()
+        records = self.log.records()
+        self.assertEqual(5, len(records))
+        self.assertGreater(records[0]['id'], records[-1]['id'])
+        self.assertEqual(2, len(self.log.records(limit=2)))
+
+    def test_writes_are_not_explained(self):
+        with self.engine.begin() as connection:
+            connection.execute(text('INSERT INTO tasks (project_id) VALUES (:project_id)'), [{'project_id': 1}, {'project_id': 2}])
+        record = next(entry for entry in self.log.records() if entry['sql'].startswith('INSERT'))
+        self.assertEqual('skipped', record['explain_status'])
+        self.assertEqual({'rows': 2, 'row': ['int']}, record['parameters'])
+
+    def test_parameter_shape(self):
+        self.assertEqual({'a': 'int', 'b': 'str'}, parameter_shape({'a': 1, 'b': 'x'}))
+        self.assertEqual(['NoneType', 'float'], parameter_shape((None, 1.5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from flask import Flask
+from sqlalchemy import event
+from app import db, rules_engine
+
+
+# Stand-ins for the grading tables, which models.py does not define in this tree; they
+# carry the columns submit_test reads and writes.
+class _Question(db.Model):
+    __tablename__ = 'test_questions'
+    id = db.Column(db.Integer, primary_key=True)
+    correct_answer = db.Column(db.Integer, nullable=False)
+    wrong_answer_1 = db.Column(db.String(100))
+    wrong_answer_2 = db.Column(db.String(100))
+
+
+class _Attempt(db.Model):
+    __tablename__ = 'user_test_attempts'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    module_id = db.Column(db.Integer)
+
+
+class _Answer(db.Model):
+    __tablename__ = 'user_test_answers'
+    id = db.Column(db.Integer, primary_key=True)
+    user_test_attempt_id = db.Column(db.Integer, db.ForeignKey('user_test_attempts.id'), nullable=False)
+    question_id = db.Column(db.Integer, nullable=False)
+    submitted_answer = db.Column(db.String(100))
+    is_correct = db.Column(db.Boolean)
+
+
+class _LearningContent(db.Model):
+    __tablename__ = 'learning_content'
+    id = db.Column(db.Integer, primary_key=True)
+    test_questions_id = db.Column(db.Integer)
+    content_title = db.Column(db.String(100))
+    content_URL = db.Column(db.String(200))
+
+
+class SubmitTestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'app.db')
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all(bind_key=None)
+        # Correct answer of question n is 'right n' (in wrong_answer_<correct_answer>)
+        db.session.add_all([_Question(id=n, correct_answer=1 + n % 2, **{f'wrong_answer_{1 + n % 2}': f'right {n}',
+                                                                         f'wrong_answer_{2 - n % 2}': f'wrong {n}'})
+                            for n in range(1, 11)])
+        db.session.add_all([_LearningContent(id=100 + n, test_questions_id=n, content_title=f'Lesson {n}',
+                                             content_URL=f'https://example.com/{n}') for n in range(1, 11)])
+        db.session.commit()
+        self.models = patch.multiple(rules_engine, create=True, TestQuestion=_Question, UserTestAttempt=_Attempt,
+                                     UserTestAnswer=_Answer, LearningContent=_LearningContent)
+        self.models.start()
+        self.user = SimpleNamespace(id=7, email='pm@example.com', current_learning_focus_module_id=3,
+                                    current_problem_category_slug='PT', next_recommended_lesson_id=None)
+
+    def tearDown(self):
+        self.models.stop()
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def test_grades_in_batches_and_links_answers_to_the_attempt(self):
+        answers = [{'question_id': n, 'selected_answer': f'right {n}' if n <= 6 else f'wrong {n}'} for n in range(1, 11)]
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result, status = rules_engine.submit_test(self.user, answers, db)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(200, status, result)
+        self.assertEqual((6, 60.0), (result['correct_answers'], result['score_percentage']))
+        self.assertEqual([107, 108, 109, 110], [content['id'] for content in result['learning_content']])
+        self.assertEqual(107, self.user.next_recommended_lesson_id)
+        # One question load, one content load, the attempt and one executemany for the answers
+        self.assertEqual(1, sum('FROM test_questions' in statement for statement in statements))
+        self.assertEqual(1, sum(statement.startswith('INSERT INTO user_test_answers') for statement in statements))
+        self.assertEqual(4, len([s for s in statements if s.startswith(('SELECT', 'INSERT'))]))
+
+        attempt = db.session.scalars(db.select(_Attempt)).one()
+        self.assertEqual((7, 3), (attempt.user_id, attempt.module_id))
+        rows = db.session.scalars(db.select(_Answer).order_by(_Answer.question_id)).all()
+        self.assertEqual(list(range(1, 11)), [row.question_id for row in rows])
+        self.assertEqual({attempt.id}, {row.user_test_attempt_id for row in rows})
+        self.assertEqual([True] * 6 + [False] * 4, [row.is_correct for row in rows])
+
+    def test_string_ids_are_accepted_and_bad_ids_rejected(self):
+        result, status = rules_engine.submit_test(self.user, [{'question_id': '5', 'selected_answer': 'right 5'}], db)
+        self.assertEqual(200, status, result)
+        self.assertEqual(5, result['results'][0]['question_id'])
+        self.assertEqual('PSQ', self.user.current_problem_category_slug) # Perfect score
+
+        result, status = rules_engine.submit_test(self.user, [{'question_id': 'five', 'selected_answer': 'x'}], db)
+        self.assertEqual(400, status)
+        result, status = rules_engine.submit_test(self.user, [{'question_id': 99, 'selected_answer': 'x'}], db)
+        self.assertEqual(404, status)
+        self.assertEqual(1, db.session.query(_Attempt).count())
+
+
+if __name__ == '__main__':
+    unittest.main()
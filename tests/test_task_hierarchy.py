@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from flask import Flask
+from app import db
+from app.models import Organization, Account, User, UserAccount
+from app.routes.projects_routes import projects_bp
+from app.utils import generate_token
+
+SECRET = 'task-hierarchy-test-secret-32-bytes'
+
+
+def _task(frontend_id, name, parent_id=None):
+    return {'frontend_id': frontend_id, 'name': name, 'start_date': '2026-01-05T09:00:00Z', 'duration': 86400,
+            'parent_id': parent_id}
+
+
+class TaskHierarchyTestCase(unittest.TestCase):
+    """Depth-limited GET /projects/<id> and on-demand /projects/<id>/tasks/<task_id>/children."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config.update(SECRET_KEY=SECRET,
+                               SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.directory.name, 'app.db'))
+        db.init_app(self.app)
+        self.app.register_blueprint(projects_bp, url_prefix='/api/v1')
+        with self.app.app_context():
+            db.create_all(bind_key=None)
+            organization = Organization(name='Org')
+            db.session.add(organization)
+            db.session.flush()
+            account = Account(name='Acme', organization_id=organization.id)
+            user = User(email='pm@example.com', organization_id=organization.id)
+            db.session.add_all([account, user])
+            db.session.flush()
+            db.session.add(UserAccount(user_id=user.id, account_id=account.id, role='admin'))
+            db.session.commit()
+            self.account_id = account.id
+            self.headers = {'Authorization': f'Bearer {generate_token(user.id, user.email, SECRET)}'}
+        self.client = self.app.test_client()
+        # Plan -> Design -> Wireframes, Plan -> Budget; Launch has no children
+        self.project_id = self.create_project('Roadmap', [
+            _task('plan', 'Plan'), _task('design', 'Design', 'plan'), _task('wireframes', 'Wireframes', 'design'),
+            _task('budget', 'Budget', 'plan'), _task('launch', 'Launch')])
+        self.other_project_id = self.create_project('Other', [_task('x', 'Elsewhere')])
+        tasks = self.client.get(f'/api/v1/projects/{self.project_id}', headers=self.headers).get_json()['tasks']
+        self.ids = {task['name']: task['id'] for task in tasks}
+        other = self.client.get(f'/api/v1/projects/{self.other_project_id}', headers=self.headers).get_json()['tasks']
+        self.other_task_id = other[0]['id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all(bind_key=None)
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def create_project(self, name, tasks):
+        response = self.client.post('/api/v1/projects', headers=self.headers,
+                                    json={'name': name, 'account_id': self.account_id, 'tasks': tasks})
+        self.assertEqual(201, response.status_code, response.get_json())
+        return response.get_json()['project']['id']
+
+    def get(self, path, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.get(f'/api/v1/projects/{self.project_id}{path}?{query}', headers=self.headers)
+
+    def test_depth_limits_the_levels_returned(self):
+        tasks = {task['name']: task for task in self.get('', depth=1).get_json()['tasks']}
+        self.assertEqual({'Plan', 'Launch'}, set(tasks))
+        self.assertEqual((True, 2, []), (tasks['Plan']['hasChildren'], tasks['Plan']['childCount'], tasks['Plan']['children']))
+        self.assertEqual((False, 0), (tasks['Launch']['hasChildren'], tasks['Launch']['childCount']))
+
+        tasks = {task['name']: task for task in self.get('', depth=2).get_json()['tasks']}
+        self.assertEqual({'Plan', 'Launch', 'Design', 'Budget'}, set(tasks))
+        self.assertEqual(['Budget', 'Design'], sorted(child['name'] for child in tasks['Plan']['children']))
+        # Wireframes is not loaded, but Design still reports it
+        self.assertEqual((True, 1, []), (tasks['Design']['hasChildren'], tasks['Design']['childCount'], tasks['Design']['children']))
+        self.assertFalse(tasks['Budget']['hasChildren'])
+
+    def test_invalid_depth_is_rejected(self):
+        for depth in ('0', '-1', 'two'):
+            self.assertEqual(400, self.get('', depth=depth).status_code, depth)
+            self.assertEqual(400, self.get(f'/tasks/{self.ids["Plan"]}/children', depth=depth).status_code, depth)
+
+    def test_lod_overview_depth(self):
+        self.app.config['LOD_MAX_BUCKETS'] = 1
+        response = self.get('', lod='month', lod_depth='-1')
+        self.assertEqual(400, response.status_code)
+        self.assertEqual('lod_depth must be at least 0', response.get_json()['message'])
+        # Two top-level tasks cannot fit one bucket until the depth reaches 0
+        overview = self.get('', lod='month', lod_depth='2').get_json()
+        self.assertEqual(('year', 0), (overview['granularity'], overview['depth']))
+        self.assertEqual(5, overview['taskCount'])
+
+    def test_children_are_loaded_on_demand(self):
+        response = self.get(f'/tasks/{self.ids["Plan"]}/children')
+        self.assertEqual(200, response.status_code)
+        data = response.get_json()
+        self.assertEqual(self.ids['Plan'], data['taskId'])
+        self.assertEqual(['Budget', 'Design'], sorted(task['name'] for task in data['tasks']))
+
+        tasks = {task['name']: task for task in self.get(f'/tasks/{self.ids["Plan"]}/children', depth=2).get_json()['tasks']}
+        self.assertEqual({'Budget', 'Design', 'Wireframes'}, set(tasks))
+        self.assertEqual(['Wireframes'], [child['name'] for child in tasks['Design']['children']])
+        self.assertFalse(tasks['Wireframes']['hasChildren'])
+
+        self.assertEqual([], self.get(f'/tasks/{self.ids["Launch"]}/children').get_json()['tasks'])
+
+    def test_task_of_another_project_is_not_found(self):
+        self.assertEqual(404, self.get(f'/tasks/{self.other_task_id}/children').status_code)
+        self.assertEqual(404, self.get('/tasks/9999/children').status_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import gzip
+import unittest
+import zlib
+from flask import Flask, Response, jsonify
+from app import transport
+from app.transport import init_transport
+
+PREFLIGHT = {'Origin': 'https://app.example.com', 'Access-Control-Request-Method': 'PUT',
+             'Access-Control-Request-Headers': 'authorization, content-type'}
+
+
+def _make_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    init_transport(app)
+    app.before_request_count = 0
+
+    @app.before_request
+    def _count():
+        app.before_request_count += 1
+
+    @app.route('/projects', methods=['GET', 'PUT'])
+    def projects():
+        return jsonify([{'id': i, 'name': f'Project {i}', 'status': 'in_progress'} for i in range(200)])
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/events')
+    def events():
+        def stream():
+            try:
+                for i in range(3):
+                    yield f'id: {i}\nevent: change\ndata: {{"seq": {i}}}\n\n'
+            finally:
+                app.stream_closed = True
+        return Response(stream(), mimetype='text/event-stream')
+
+    return app
+
+
+class PreflightTestCase(unittest.TestCase):
+    def test_preflight_skips_the_flask_request_cycle(self):
+        app = _make_app(CORS_MAX_AGE=7200)
+        response = app.test_client().options('/projects', headers=PREFLIGHT)
+        self.assertEqual(204, response.status_code)
+        self.assertEqual('https://app.example.com', response.headers['Access-Control-Allow-Origin'])
+        self.assertIn('PUT', response.headers['Access-Control-Allow-Methods'])
+        self.assertEqual('authorization, content-type', response.headers['Access-Control-Allow-Headers'])
+        self.assertEqual('7200', response.headers['Access-Control-Max-Age'])
+        self.assertEqual(0, app.before_request_count)
+
+        # Plain OPTIONS and actual requests still go through Flask and flask-cors
+        client = app.test_client()
+        self.assertEqual(200, client.options('/projects').status_code)
+        response = client.get('/small', headers={'Origin': 'https://app.example.com'})
+        self.assertEqual('https://app.example.com', response.headers['Access-Control-Allow-Origin'])
+        self.assertEqual(2, app.before_request_count)
+
+    def test_only_listed_origins_take_the_fast_path(self):
+        app = _make_app(CORS_ORIGINS='https://app.example.com, https://admin.example.com')
+        client = app.test_client()
+        response = client.options('/projects', headers=PREFLIGHT)
+        self.assertEqual('https://app.example.com', response.headers['Access-Control-Allow-Origin'])
+        self.assertIn('Origin', response.headers['Vary'])
+
+        response = client.options('/projects', headers=dict(PREFLIGHT, Origin='https://evil.example.com'))
+        self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+        self.assertEqual(1, app.before_request_count)
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = _make_app(COMPRESSION_MIN_SIZE=1024)
+        self.client = self.app.test_client()
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get('/projects')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.client.get('/projects', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertEqual(len(response.data), int(response.headers['Content-Length']))
+        self.assertLess(len(response.data), len(plain.data) // 4)
+        self.assertEqual(plain.data, gzip.decompress(response.data))
+
+    def test_small_bodies_and_unsupported_encodings_are_sent_as_is(self):
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual({'ok': True}, response.get_json())
+        response = self.client.get('/projects', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @unittest.skipIf(transport.brotli is not None, 'brotli is installed')
+    def test_brotli_is_only_offered_when_installed(self):
+        response = self.client.get('/projects', headers={'Accept-Encoding': 'br'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        response = self.client.get('/projects', headers={'Accept-Encoding': 'br, gzip'})
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+
+    @unittest.skipIf(transport.brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred(self):
+        response = self.client.get('/projects', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual('br', response.headers['Content-Encoding'])
+        self.assertEqual(self.client.get('/projects').data, transport.brotli.decompress(response.data))
+
+    def test_streams_are_compressed_event_by_event(self):
+        response = self.client.get('/events', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertNotIn('Content-Length', response.headers)
+        decompressor = zlib.decompressobj(31)
+        chunks = iter(response.response)
+        # Every chunk is flushed, so each event can be decoded as soon as it arrives
+        self.assertEqual(b'id: 0\nevent: change\ndata: {"seq": 0}\n\n', decompressor.decompress(next(chunks)))
+        response.close()
+        self.assertTrue(self.app.stream_closed)
+
+
+if __name__ == '__main__':
+    unittest.main()